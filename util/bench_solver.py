@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""Time the solver's engines against each other on the puzzles in data/.
+
+Usage:
+    util/bench_solver.py                      # gp12 and etI, every engine
+    util/bench_solver.py J84 C110             # other grids
+    util/bench_solver.py gp12 --engines board # just one engine
+    util/bench_solver.py --budget 60 gp12     # a different uniqueness cap
+    util/bench_solver.py --all --budget 30    # every grid in data/
+    util/bench_solver.py --all --crossover    # scalar vs numpy local rules
+    util/bench_solver.py --directed gp12 etI  # uniqueness steered by the solution
+    util/bench_solver.py --search cdcl dtD    # uniqueness by clause learning
+    util/bench_solver.py --search restarts    # dives restarted on a Luby schedule
+    util/bench_solver.py --search portfolio   # branching strategies raced
+    util/bench_solver.py --display gp12       # its display puzzle as well
+    util/bench_solver.py --all --xor          # search nodes the parity rules save
+    util/bench_solver.py --all --calibrate    # this host's search nodes per second
+    util/bench_solver.py --all --memo         # what the propagation memo saves
+    util/bench_solver.py --all --lookahead    # probes the lookahead's economies save
+
+For each playable puzzle (with --display, each display puzzle too) and each
+engine, times the two questions the generator asks of slisolver:
+
+  deduce  solvable_by_deduction at depth 1, from the full clue set. cut_clues
+          asks this dozens of times per clue set, so it is most of the cost of
+          making a puzzle.
+  unique  solution_is_unique, as the data/ sweep asks it. Capped at --budget
+          seconds; a capped run is shown with a '>' and counts as not unique.
+          With --directed, in its directed mode: looking for a loop other
+          than the stored one, branching away from it first. With --search
+          cdcl, cdcl.solution_is_unique's clause-learning search instead; with
+          --search parallel, the search spread over every CPU; with --search
+          restarts, dives capped on a Luby schedule and restarted in a new
+          branching order; with --search portfolio, the strategies above
+          raced, one process each, with a tally of which won how often.
+  pairs   how much of those two was spent in apply_pair_rules, the costliest
+          rule family.
+
+Each engine's times are followed by its speedup over the first engine listed,
+normally 'mesh', the reference. Every engine must give the same answers, and a
+disagreement is reported on its own line, since a fast wrong answer is worse than
+useless.
+
+--crossover times something narrower instead: one pass of the vertex and clue
+rules over every vertex and clued face, from each grid's first puzzle's clues,
+scalar (SolverBoard) against vectorized (VectorBoard), to show at what size
+numpy starts to pay. slisolver.BULK_THRESHOLD is set from this.
+
+--xor also times something else: for each grid, the uniqueness search on the
+board with slisolver's parity equations (apply_xor_rules) and without, counting
+the search's branching nodes, to show what the equations save.
+
+--calibrate measures this host instead: the uniqueness search's nodes and
+propagation rounds per second, over each grid's puzzles and the same with every
+other clue dropped, which makes for more search. Use it to turn a time budget
+into a node_budget for solution_is_unique, whose outcome, unlike a time
+budget's, is the same on every machine.
+
+--memo runs deduce and unique on the board with its propagation memo and
+without (memo_size 0), showing the hits, misses and the two times, for sizing
+slisolver.PROPAGATION_MEMO.
+
+--lookahead counts deduce's suppositions (the board's `probes`) and times it,
+over each grid's puzzles and the same with a third of the clues dropped, where
+lookahead has more to do: with all of the lookahead's economies, then with each
+turned off in turn -- slisolver.LOOKAHEAD_CACHE (probe outcomes remembered) and
+BATCH_PROBES (every supposition run through the local rules at once first).
+
+Display puzzles are left out unless --display asks for them too, as rows
+named like gp12-d0: they are shown rather than played, so the default keeps to
+the puzzles a player meets. gp12-d0 once ran past any budget here, and
+`--display --search parallel gp12` is the acceptance case for
+solution_is_unique_parallel. Reporting only; writes nothing. Needs a python3
+carrying compas.
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from compas.datastructures import Mesh
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import cdcl  # noqa: E402  (needs the path set up first)
+import slisolver  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+
+DEFAULT_GRIDS = ['gp12', 'etI']
+
+# The uniqueness searches --search picks from.
+SEARCHES = {'dfs': slisolver.solution_is_unique, 'cdcl': cdcl.solution_is_unique,
+            'parallel': slisolver.solution_is_unique_parallel,
+            'restarts': slisolver.solution_is_unique_restarts,
+            'portfolio': slisolver.solution_is_unique_portfolio}
+# The searches that run in other processes, out of reach of clock_pair_rules.
+SPREAD = ('parallel', 'portfolio')
+
+
+def load(stem, key='puzzles'):
+    """(mesh, puzzles) for one grid, each puzzle as (clues, solution): its
+    playable puzzles, or with key='displayPuzzles' its display puzzles."""
+    grid = json.loads((DATA_DIR / f'{stem}.json').read_text())
+    mesh = Mesh.from_vertices_and_faces(grid['vertices'], grid['faces'])
+    data = json.loads((DATA_DIR / f'{stem}-puzzles.json').read_text())
+    puzzles = [([(face, n) for (face, n) in enumerate(p['clues']) if n != -1],
+                p['solution'])
+               for p in data.get(key, [])]
+    return (mesh, puzzles)
+
+
+def all_grids():
+    """The stem of every grid in data/ with a puzzles file, by edge count."""
+    stems = [path.name[:-len('-puzzles.json')]
+             for path in DATA_DIR.glob('*-puzzles.json')]
+    stems = [stem for stem in stems if (DATA_DIR / f'{stem}.json').exists()]
+
+    def num_edges(stem):
+        grid = json.loads((DATA_DIR / f'{stem}.json').read_text())
+        return sum(len(face) for face in grid['faces']) // 2
+
+    return sorted(stems, key=lambda stem: (num_edges(stem), stem))
+
+
+def timed(function, *args, **kwargs):
+    """(result, seconds) for one call."""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return (result, time.perf_counter() - start)
+
+
+def clock_pair_rules(solver, spent):
+    """Make the solver's pair rules add their running time to spent[0].
+
+    The mesh engine looks apply_pair_rules up in slisolver's namespace on every
+    round, so the wrapper goes there; the board's goes on the board itself.
+    Returns a function that puts things back.
+    """
+    owner = solver if isinstance(solver, slisolver.SolverBoard) else slisolver
+    original = owner.apply_pair_rules
+
+    def clocked(*args):
+        (result, secs) = timed(original, *args)
+        spent[0] += secs
+        return result
+
+    owner.apply_pair_rules = clocked
+    return lambda: setattr(owner, 'apply_pair_rules', original)
+
+
+def bench_puzzle(mesh, clues, solution, engines, budget, directed=False, search='dfs',
+                 wins=None):
+    """{engine: (deduced, deduce_secs, unique, unique_secs, pair_secs)} for one
+    puzzle. With search 'portfolio', each race's winner is counted in `wins`."""
+    is_unique = SEARCHES[search]
+    extra = {'directed': True} if directed else {}
+    if search == 'portfolio' and wins is not None:
+        extra['report'] = lambda name, _answer, _secs: wins.update([name])
+    results = {}
+    for name in engines:
+        solver = slisolver.ENGINES[name](mesh)
+        spent = [0.0]
+        # A clocked board can't be pickled for the other processes, which is
+        # also where its pair rules would run, out of sight.
+        unclock = (clock_pair_rules(solver, spent) if search not in SPREAD
+                   else lambda: None)
+        try:
+            (deduced, deduce_secs) = timed(slisolver.solvable_by_deduction,
+                                           solver, clues, len(clues), depth=1)
+            (unique, unique_secs) = timed(is_unique,
+                                          clues, len(clues), solution, solver, None,
+                                          time_budget=budget, **extra)
+        finally:
+            unclock()
+        results[name] = (deduced, deduce_secs, unique, unique_secs, spent[0])
+    return results
+
+
+def describe(results, engines, budget):
+    """One row's timing columns: each engine's two times, and its speedup."""
+    (_, base_deduce, _, base_unique, _) = results[engines[0]]
+    cells = []
+    for name in engines:
+        (_, deduce_secs, unique, unique_secs, pair_secs) = results[name]
+        capped = '>' if not unique and unique_secs >= budget else ' '
+        cells.append(f'{deduce_secs:7.2f} {capped}{unique_secs:7.2f} {pair_secs:7.2f}')
+        if name != engines[0]:
+            cells.append(f'x{base_deduce / max(deduce_secs, 1e-9):5.1f} '
+                         f'x{base_unique / max(unique_secs, 1e-9):5.1f}')
+    return '  '.join(cells)
+
+
+def local_pass_secs(board, reps):
+    """Average seconds for one vertex-and-clue-rule pass over every vertex and
+    clued face of the board, each pass rolled back before the next."""
+    vertices = set(range(len(board.vertex_edges)))
+    faces = set(board.clued_faces)
+    total = 0.0
+    for _ in range(reps):
+        mark = board.checkpoint()
+        start = time.perf_counter()
+        board._vertex_rules(vertices)
+        board._clue_rules(faces)
+        total += time.perf_counter() - start
+        board.rollback(mark)
+    return total / reps
+
+
+def crossover(grids, reps=200):
+    """Print, for each grid, one local pass's time on each engine."""
+    if 'numpy' not in slisolver.ENGINES:
+        sys.exit('--crossover needs numpy')
+    print(f'{"grid":<10} {"edges":>6} {"items":>6} {"scalar us":>10} {"numpy us":>10} '
+          f'{"speedup":>8}')
+    threshold = slisolver.BULK_THRESHOLD
+    slisolver.BULK_THRESHOLD = 0  # Every pass in bulk, however small.
+    try:
+        for stem in grids:
+            (mesh, puzzles) = load(stem)
+            if not puzzles:
+                continue
+            (clues, _solution) = puzzles[0]
+            secs = []
+            for engine in (slisolver.SolverBoard, slisolver.VectorBoard):
+                board = engine(mesh)
+                board.apply_clues(clues, len(clues))
+                secs.append(local_pass_secs(board, reps))
+            items = len(board.vertex_edges) + len(board.clued_faces)
+            print(f'{stem:<10} {len(board.edge_keys):>6} {items:>6} '
+                  f'{secs[0] * 1e6:>10.1f} {secs[1] * 1e6:>10.1f} '
+                  f'x{secs[0] / max(secs[1], 1e-9):>7.2f}')
+    finally:
+        slisolver.BULK_THRESHOLD = threshold
+
+
+def count_nodes(spent):
+    """Make the uniqueness search count its branching nodes in spent[0], as
+    clock_pair_rules counts time. Returns a function that puts things back."""
+    original = slisolver.select_edge_for_branching
+
+    def counted(mesh):
+        spent[0] += 1
+        return original(mesh)
+
+    slisolver.select_edge_for_branching = counted
+    return lambda: setattr(slisolver, 'select_edge_for_branching', original)
+
+
+def xor_savings(grids, budget):
+    """Print, for each grid, the uniqueness search's nodes and time over its
+    puzzles, with the parity equations and without."""
+    print(f'{"grid":<10} {"puzzles":>7} {"nodes":>8} {"secs":>7} {"no xor":>8} {"secs":>7} '
+          f'{"saved":>6}')
+    nodes = [0]
+    uncount = count_nodes(nodes)
+    try:
+        for stem in grids:
+            (mesh, puzzles) = load(stem)
+            if not puzzles:
+                continue
+            cells = []
+            for xor in (True, False):
+                slisolver.XOR_RULES = xor
+                nodes[0] = 0
+                secs = 0.0
+                for (clues, solution) in puzzles:
+                    board = slisolver.SolverBoard(mesh)
+                    secs += timed(slisolver.solution_is_unique, clues, len(clues), solution,
+                                  board, None, time_budget=budget)[1]
+                cells.append((nodes[0], secs))
+            (with_xor, without) = cells
+            print(f'{stem:<10} {len(puzzles):>7} {with_xor[0]:>8} {with_xor[1]:>7.2f} '
+                  f'{without[0]:>8} {without[1]:>7.2f} '
+                  f'{1 - with_xor[0] / max(without[0], 1):>6.0%}')
+    finally:
+        slisolver.XOR_RULES = True
+        uncount()
+
+
+def calibrate(grids, budget):
+    """Print, for each grid, the uniqueness search's nodes and propagation
+    rounds per second, and what --budget comes to in nodes overall."""
+    print(f'{"grid":<10} {"nodes":>8} {"rounds":>8} {"secs":>7} {"nodes/s":>8} {"rounds/s":>9}')
+    totals = [0, 0, 0.0]
+    for stem in grids:
+        (mesh, puzzles) = load(stem)
+        if not puzzles:
+            continue
+        board = slisolver.SolverBoard(mesh)
+        cells = [0, 0, 0.0]
+        for (clues, solution) in puzzles:
+            for some in (clues, clues[::2]):
+                stats = {}
+                cells[2] += timed(slisolver.solution_is_unique, some, len(some), solution,
+                                  board, None, time_budget=budget, stats=stats)[1]
+                cells[0] += stats['nodes']
+                cells[1] += stats['rounds']
+        print(f'{stem:<10} {cells[0]:>8} {cells[1]:>8} {cells[2]:>7.2f} '
+              f'{cells[0] / max(cells[2], 1e-9):>8.0f} {cells[1] / max(cells[2], 1e-9):>9.0f}')
+        totals = [total + cell for (total, cell) in zip(totals, cells)]
+    rate = totals[0] / max(totals[2], 1e-9)
+    print(f'{"total":<10} {totals[0]:>8} {totals[1]:>8} {totals[2]:>7.2f} {rate:>8.0f} '
+          f'{totals[1] / max(totals[2], 1e-9):>9.0f}')
+    print(f'a {budget:g} s budget is about node_budget={round(rate * budget)} on this host')
+
+
+def memo_savings(grids, budget):
+    """Print, for each grid, deduce and unique over its puzzles on the board
+    with the propagation memo and without, and how often the memo hit."""
+    print(f'{"grid":<10} {"hits":>8} {"misses":>8} {"kept":>6} {"secs":>7} {"no memo":>8} '
+          f'{"speedup":>8}')
+    for stem in grids:
+        (mesh, puzzles) = load(stem)
+        if not puzzles:
+            continue
+        cells = []
+        for size in (slisolver.PROPAGATION_MEMO, 0):
+            board = slisolver.SolverBoard(mesh)
+            board.memo_size = size
+            secs = 0.0
+            for (clues, solution) in puzzles:
+                secs += timed(slisolver.solvable_by_deduction, board, clues, len(clues))[1]
+                secs += timed(slisolver.solution_is_unique, clues, len(clues), solution,
+                              board, None, time_budget=budget)[1]
+            cells.append((board, secs))
+        ((board, secs), (_plain, plain_secs)) = cells
+        print(f'{stem:<10} {board.memo_hits:>8} {board.memo_misses:>8} {len(board.memo):>6} '
+              f'{secs:>7.2f} {plain_secs:>8.2f} x{plain_secs / max(secs, 1e-9):>7.2f}')
+
+
+# The lookahead's economies --lookahead switches off one at a time: the
+# slisolver flag that turns each off, and its column.
+ECONOMIES = {'LOOKAHEAD_CACHE': 'no cache', 'BATCH_PROBES': 'no batch'}
+
+
+def lookahead_savings(grids):
+    """Print, for each grid, deduce's probes and time over its puzzles with
+    every lookahead economy, and with each of ECONOMIES turned off."""
+    print(f'{"grid":<10} {"probes":>8} {"secs":>7}'
+          + ''.join(f' {label:>9} {"secs":>7}' for label in ECONOMIES.values()))
+    try:
+        for stem in grids:
+            (mesh, puzzles) = load(stem)
+            if not puzzles:
+                continue
+            cells = []
+            for off in (None, *ECONOMIES):
+                for flag in ECONOMIES:
+                    setattr(slisolver, flag, flag != off)
+                board = slisolver.SolverBoard(mesh)
+                secs = 0.0
+                for (clues, _solution) in puzzles:
+                    for num_clues in (len(clues) * 2 // 3, len(clues)):
+                        secs += timed(slisolver.solvable_by_deduction,
+                                      board, clues, num_clues)[1]
+                cells.append(f'{board.probes:>{8 if off is None else 9}} {secs:>7.2f}')
+            print(f'{stem:<10} ' + ' '.join(cells))
+    finally:
+        for flag in ECONOMIES:
+            setattr(slisolver, flag, True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('grids', nargs='*', default=DEFAULT_GRIDS,
+                        help=f'grid stems (default: {" ".join(DEFAULT_GRIDS)})')
+    parser.add_argument('--engines', nargs='+', default=list(slisolver.ENGINES),
+                        choices=list(slisolver.ENGINES),
+                        help='engines to compare, the first being the baseline')
+    parser.add_argument('--budget', type=float, default=120.0,
+                        help='seconds allowed per uniqueness check (default 120)')
+    parser.add_argument('--all', action='store_true',
+                        help='every grid in data/ that has puzzles, smallest first')
+    parser.add_argument('--crossover', action='store_true',
+                        help='time one local-rule pass, scalar against numpy')
+    parser.add_argument('--directed', action='store_true',
+                        help="check uniqueness in solution_is_unique's directed mode")
+    parser.add_argument('--search', default='dfs', choices=list(SEARCHES),
+                        help='the uniqueness search: backtracking (default), clause '
+                             'learning, backtracking on every CPU, restarting '
+                             'dives, or a race of branching strategies')
+    parser.add_argument('--display', action='store_true',
+                        help='time the display puzzles too')
+    parser.add_argument('--xor', action='store_true',
+                        help='count the search nodes the parity equations save')
+    parser.add_argument('--calibrate', action='store_true',
+                        help="measure this host's search nodes per second")
+    parser.add_argument('--memo', action='store_true',
+                        help='time the board with its propagation memo and without')
+    parser.add_argument('--lookahead', action='store_true',
+                        help="count the probes the lookahead's economies save")
+    args = parser.parse_args()
+    if args.all:
+        args.grids = all_grids()
+    if args.crossover:
+        crossover(args.grids)
+        return
+    if args.xor:
+        xor_savings(args.grids, args.budget)
+        return
+    if args.calibrate:
+        calibrate(args.grids, args.budget)
+        return
+    if args.memo:
+        memo_savings(args.grids, args.budget)
+        return
+    if args.lookahead:
+        lookahead_savings(args.grids)
+        return
+
+    # Two header lines: the engine over each group of columns, then the columns.
+    names = '  '.join(f'{name:^24}' + ('' if i == 0 else f'  {"vs " + args.engines[0]:^13}')
+                      for (i, name) in enumerate(args.engines))
+    columns = '  '.join(f'{"deduce":>7} {"unique":>8} {"pairs":>7}'
+                        + ('' if i == 0 else f'  {"deduce":>6} {"unique":>6}')
+                        for i in range(len(args.engines)))
+    print(f'{"":<12} {names}')
+    print(f'{"puzzle":<12} {columns}')
+    totals = {name: [0.0, 0.0, 0.0] for name in args.engines}
+    wins = Counter()
+    kinds = [('puzzles', '')] + ([('displayPuzzles', 'd')] if args.display else [])
+    for stem in args.grids:
+        for (key, tag) in kinds:
+            (mesh, puzzles) = load(stem, key)
+            for (i, (clues, solution)) in enumerate(puzzles):
+                label = f'{stem}-{tag}{i}'
+                results = bench_puzzle(mesh, clues, solution, args.engines, args.budget,
+                                       args.directed, args.search, wins)
+                print(f'{label:<12} {describe(results, args.engines, args.budget)}')
+                answers = {(r[0], r[2]) for r in results.values()}
+                if len(answers) > 1:
+                    print(f'  ENGINES DISAGREE on {label}: {results}')
+                for (name, (_, deduce_secs, _, unique_secs, pair_secs)) in results.items():
+                    totals[name][0] += deduce_secs
+                    totals[name][1] += unique_secs
+                    totals[name][2] += pair_secs
+    print(f'{"total":<12} '
+          + '  '.join(f'{name:>8} {deduce:7.2f}  {unique:7.2f} {pairs:7.2f}'
+                      for (name, (deduce, unique, pairs)) in totals.items()))
+    if wins:
+        print('won   ' + '  '.join(f'{name} {n}' for (name, n) in wins.most_common()))
+
+
+if __name__ == '__main__':
+    main()
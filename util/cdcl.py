@@ -0,0 +1,480 @@
+"""A clause-learning (CDCL) search for slitherlink uniqueness proofs.
+
+slisolver's solution_is_unique backtracks chronologically: when a branch dies it
+undoes the last guess and tries the other value, remembering nothing about why
+the branch died. On a solid where the same small contradiction can be reached
+under many unrelated guesses, it rediscovers that contradiction in every one of
+them. This module asks the same question a different way. It states the puzzle
+as clauses over the edges, and runs the textbook conflict-driven search over
+them:
+
+  - unit propagation over two watched literals per clause;
+  - on a conflict, resolution back to the first unique implication point, which
+    gives a LEARNED clause: a nogood that rules the cause out everywhere;
+  - a non-chronological backjump to the level where that clause asserts;
+  - activity-ordered decisions, saved phases, and restarts on a Luby schedule,
+    which learned clauses survive.
+
+Clauses state the local rules exactly: at a vertex, no edge filled alone and no
+three filled; at a clued face, no more and no fewer filled edges than the clue.
+The single-loop rule isn't local, so it is checked after each propagation and
+explained lazily: a closed loop with filled edges off it, or a chain whose
+closing edge is still open while other filled edges exist, yields the clause
+that says why, and it joins the learned ones. The pattern, color and pair rules
+aren't needed here -- they are consequences of the clauses, which learning
+finds as it needs them -- so the explanation for every deduction is always a
+clause.
+
+Literals are slisolver's: 2 * edge + 1 says the edge is filled, 2 * edge that it
+is ruled out, so a literal's negation is literal ^ 1. Edges are numbered as on a
+SolverBoard. No external solver: everything is here, in plain Python.
+"""
+import itertools
+import time
+
+from slisolver import FILLED, RULED_OUT, UNKNOWN, SolverBoard, edge_id, luby
+
+# Conflicts before the first restart; the Luby sequence scales it.
+RESTART_UNIT = 64
+
+# Learned clauses kept before the first clean-out, and how that cap grows.
+LEARNED_LIMIT = 2000
+LEARNED_GROWTH = 1.1
+
+# How often, in conflicts plus decisions, to look at the clock.
+CLOCK_INTERVAL = 256
+
+
+class BudgetExhausted(Exception):
+    """The search ran out of time, or nodes, before reaching an answer."""
+
+
+class ClauseSolver:
+    """The puzzle on one grid, as clauses, with a CDCL search over them.
+
+    Built from a mesh or a SolverBoard, for the topology only. apply_clues adds
+    a clue set's clauses; add_clause anything else, such as a clause blocking a
+    solution already found. solve() finds a model or proves there is none, and
+    can be called again after more clauses are added, keeping what it learned.
+
+    The position is `values`, a bytearray of slisolver's UNKNOWN, FILLED and
+    RULED_OUT by edge, so a literal is true when values[lit >> 1] is
+    2 - (lit & 1).
+    """
+
+    def __init__(self, mesh):
+        board = mesh if isinstance(mesh, SolverBoard) else SolverBoard(mesh)
+        self.face_index = board.face_index
+        self.edge_index = board.edge_index
+        self.edge_vertices = board.edge_vertices
+        self.vertex_pair_edge = board.vertex_pair_edge
+        self.face_edges = board.face_edges
+        num_edges = len(board.edge_keys)
+        self.num_edges = num_edges
+
+        self.values = bytearray(num_edges)
+        self.level = [0] * num_edges
+        self.reason = [None] * num_edges
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.clauses = []        # Lists of literals; None once deleted.
+        self.learned = []        # Indices into clauses of the learned ones.
+        self.watches = [[] for _ in range(2 * num_edges)]
+        self.activity = [0.0] * num_edges
+        self.bump = 1.0
+        self.phase = bytearray([RULED_OUT]) * num_edges
+        self.learned_limit = LEARNED_LIMIT
+        self.looped = True       # Whether the loop check is up to date.
+        self.unsatisfiable = False
+        self.conflicts = 0
+        self.decisions = 0
+
+        # Every vertex: no filled edge without a partner, and no three filled.
+        for edges in board.vertex_edges:
+            for e in edges:
+                self.add_clause([2 * e] + [2 * other + 1 for other in edges if other != e])
+            for triple in itertools.combinations(edges, 3):
+                self.add_clause([2 * e for e in triple])
+        # Some edge is filled: the loop isn't empty.
+        self.add_clause([2 * e + 1 for e in range(num_edges)])
+
+    # --- building ---
+
+    def apply_clues(self, clues, num_clues):
+        """Add the first num_clues of (face key, clue) as clauses: among a
+        face's n edges, every clue + 1 of them has one ruled out, and every
+        n - clue + 1 of them has one filled."""
+        for (fkey, clue) in itertools.islice(clues, num_clues):
+            edges = self.face_edges[self.face_index[fkey]]
+            if clue < len(edges):
+                for subset in itertools.combinations(edges, clue + 1):
+                    self.add_clause([2 * e for e in subset])
+            if clue > 0:
+                for subset in itertools.combinations(edges, len(edges) - clue + 1):
+                    self.add_clause([2 * e + 1 for e in subset])
+
+    def add_clause(self, lits):
+        """Add a clause at level 0. Unlike learned clauses, it stays for good."""
+        self._cancel_until(0)
+        lits = list(dict.fromkeys(lits))
+        if any(lit ^ 1 in lits for lit in lits):
+            return  # A tautology.
+        lits = [lit for lit in lits if self.values[lit >> 1] != 2 - ((lit ^ 1) & 1)]
+        if any(self.values[lit >> 1] == 2 - (lit & 1) for lit in lits):
+            return  # Already satisfied at level 0.
+        if not lits:
+            self.unsatisfiable = True
+        elif len(lits) == 1:
+            self._assign(lits[0], None)
+        else:
+            self._attach(lits)
+
+    def _attach(self, lits, learned=False):
+        """Store a clause, watching its first two literals, and return its index."""
+        index = len(self.clauses)
+        self.clauses.append(lits)
+        self.watches[lits[0]].append(index)
+        self.watches[lits[1]].append(index)
+        if learned:
+            self.learned.append(index)
+        return index
+
+    # --- the position ---
+
+    def _assign(self, lit, reason):
+        e = lit >> 1
+        self.values[e] = 2 - (lit & 1)
+        self.level[e] = len(self.trail_lim)
+        self.reason[e] = reason
+        self.trail.append(lit)
+        if lit & 1:
+            self.looped = False
+
+    def _cancel_until(self, level):
+        """Undo every assignment above `level`, saving each edge's phase."""
+        if len(self.trail_lim) <= level:
+            return
+        mark = self.trail_lim[level]
+        for lit in self.trail[mark:]:
+            e = lit >> 1
+            self.phase[e] = self.values[e]
+            self.values[e] = UNKNOWN
+            self.reason[e] = None
+        del self.trail[mark:]
+        del self.trail_lim[level:]
+        self.qhead = mark
+        self.looped = False
+
+    def _propagate(self):
+        """Unit propagation to a fixed point. Returns a conflicting clause's
+        index, or None."""
+        values = self.values
+        clauses = self.clauses
+        watches = self.watches
+        trail = self.trail
+        while self.qhead < len(trail):
+            false_lit = trail[self.qhead] ^ 1
+            self.qhead += 1
+            watching = watches[false_lit]
+            keep = []
+            conflict = None
+            i = 0
+            while i < len(watching):
+                index = watching[i]
+                i += 1
+                lits = clauses[index]
+                if lits is None:
+                    continue  # Deleted; drop the watch.
+                if lits[0] == false_lit:
+                    (lits[0], lits[1]) = (lits[1], false_lit)
+                first = lits[0]
+                if values[first >> 1] == 2 - (first & 1):
+                    keep.append(index)
+                    continue
+                for k in range(2, len(lits)):
+                    lit = lits[k]
+                    if values[lit >> 1] != 2 - (lit & 1 ^ 1):
+                        (lits[1], lits[k]) = (lit, false_lit)
+                        watches[lit].append(index)
+                        break
+                else:
+                    keep.append(index)
+                    if values[first >> 1] == UNKNOWN:
+                        self._assign(first, index)
+                    else:
+                        conflict = index
+                        keep.extend(watching[i:])
+                        break
+            watches[false_lit] = keep
+            if conflict is not None:
+                return conflict
+        return None
+
+    # --- the single-loop rule ---
+
+    def _loop_clauses(self):
+        """Clauses the filled edges break, or force, under the single-loop
+        rule: [] if none. Each is all false but for at most one literal."""
+        values = self.values
+        filled = [e for e in range(self.num_edges) if values[e] == FILLED]
+        links = {}
+        for e in filled:
+            (p, q) = self.edge_vertices[e]
+            links.setdefault(p, []).append((q, e))
+            links.setdefault(q, []).append((p, e))
+        on_chain = set()
+        chains = []
+        for (v, out) in links.items():
+            if len(out) == 1 and out[0][1] not in on_chain:
+                (edges, end) = self._walk(links, v)
+                on_chain.update(edges)
+                chains.append((v, end, edges))
+
+        loop = next((e for e in filled if e not in on_chain), None)
+        if loop is not None:
+            (edges, _) = self._walk(links, self.edge_vertices[loop][0], loop)
+            closed = [2 * e for e in edges]
+            if len(edges) < len(filled):
+                # A closed loop, and a filled edge off it.
+                other = next(e for e in filled if e not in set(edges))
+                return [closed + [2 * other]]
+            # The loop is the whole solution: nothing else may be filled.
+            return [closed + [2 * e] for e in range(self.num_edges) if values[e] == UNKNOWN]
+
+        clauses = []
+        for (p, q, edges) in chains:
+            closing = self.vertex_pair_edge.get((min(p, q), max(p, q)))
+            if closing is not None and values[closing] == UNKNOWN and len(edges) < len(filled):
+                # Closing this chain would leave filled edges off the loop.
+                other = next(e for e in filled if e not in set(edges))
+                clauses.append([2 * closing] + [2 * e for e in edges] + [2 * other])
+        return clauses
+
+    @staticmethod
+    def _walk(links, start, first=None):
+        """([edges], end vertex) following filled edges from `start`, until an
+        end or back at `start`. `first` picks the first edge, on a loop."""
+        edges = []
+        (prev_edge, v) = (None, start)
+        while True:
+            out = [(w, e) for (w, e) in links[v] if e != prev_edge]
+            if first is not None and not edges:
+                out = [(w, e) for (w, e) in out if e == first]
+            if not out:
+                return (edges, v)
+            (v, prev_edge) = out[0]
+            edges.append(prev_edge)
+            if v == start:
+                return (edges, v)
+
+    def _add_lazy(self, lits):
+        """Attach a clause found by the loop check, whose literals are all false
+        but perhaps one. Returns its index if it is in conflict, after backing
+        up to the level where it became so; else makes its unit and returns None."""
+        values = self.values
+        level = self.level
+        # Watch a true or unassigned literal, if any, then the latest false ones.
+        lits.sort(key=lambda lit: (values[lit >> 1] != 2 - ((lit ^ 1) & 1), level[lit >> 1]),
+                  reverse=True)
+        index = self._attach(lits, learned=True)
+        if values[lits[0] >> 1] == 2 - (lits[0] & 1):
+            return None  # Made true since the check, by an earlier clause.
+        if values[lits[0] >> 1] == UNKNOWN:
+            self._assign(lits[0], index)
+            return None
+        top = level[lits[0] >> 1]
+        if top < len(self.trail_lim):
+            self._cancel_until(top)
+        return index
+
+    # --- search ---
+
+    def _analyze(self, conflict):
+        """The first-UIP learned clause for a conflict, asserting literal first,
+        and the level to backjump to."""
+        seen = bytearray(self.num_edges)
+        learned = [None]
+        current = len(self.trail_lim)
+        pending = 0
+        lit = None
+        i = len(self.trail) - 1
+        lits = self.clauses[conflict]
+        while True:
+            for other in lits:
+                if other == lit:
+                    continue
+                e = other >> 1
+                if seen[e] or self.level[e] == 0:
+                    continue
+                seen[e] = 1
+                self._bump(e)
+                if self.level[e] == current:
+                    pending += 1
+                else:
+                    learned.append(other)
+            while not seen[self.trail[i] >> 1]:
+                i -= 1
+            lit = self.trail[i]
+            i -= 1
+            seen[lit >> 1] = 0
+            pending -= 1
+            if pending == 0:
+                break
+            lits = self.clauses[self.reason[lit >> 1]]
+        learned[0] = lit ^ 1
+        if len(learned) == 1:
+            return (learned, 0)
+        # Watch the latest-assigned of the rest second: it is what un-asserts.
+        top = max(range(1, len(learned)), key=lambda k: self.level[learned[k] >> 1])
+        (learned[1], learned[top]) = (learned[top], learned[1])
+        return (learned, self.level[learned[1] >> 1])
+
+    def _bump(self, e):
+        self.activity[e] += self.bump
+        if self.activity[e] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.bump *= 1e-100
+
+    def _decide(self):
+        """Assign the most active unknown edge its saved phase. False if every
+        edge is assigned."""
+        values = self.values
+        activity = self.activity
+        best = -1
+        best_activity = -1.0
+        for e in range(self.num_edges):
+            if values[e] == UNKNOWN and activity[e] > best_activity:
+                (best, best_activity) = (e, activity[e])
+        if best < 0:
+            return False
+        self.trail_lim.append(len(self.trail))
+        self._assign(2 * best + (self.phase[best] == FILLED), None)
+        self.decisions += 1
+        return True
+
+    def _reduce(self):
+        """Forget the older half of the learned clauses, except short ones and
+        any that is the reason for a current assignment."""
+        locked = {self.reason[lit >> 1] for lit in self.trail}
+        (old, young) = (self.learned[:len(self.learned) // 2], self.learned[len(self.learned) // 2:])
+        kept = []
+        for index in old:
+            if len(self.clauses[index]) > 3 and index not in locked:
+                self.clauses[index] = None
+            else:
+                kept.append(index)
+        self.learned = kept + young
+        self.learned_limit *= LEARNED_GROWTH
+
+    def solve(self, deadline=None, node_limit=None):
+        """Search for a model. Returns True with one in `values`, or False if
+        there is none. Raises BudgetExhausted if time.monotonic() passes
+        `deadline` first, or if decisions plus conflicts, counted over every
+        call, pass `node_limit`."""
+        if self.unsatisfiable:
+            return False
+        restarts = 0
+        budget = RESTART_UNIT * luby(1)
+        ticks = 0
+        while True:
+            if deadline is not None and ticks % CLOCK_INTERVAL == 0 \
+                    and time.monotonic() > deadline:
+                self._cancel_until(0)
+                raise BudgetExhausted()
+            if node_limit is not None and self.decisions + self.conflicts > node_limit:
+                self._cancel_until(0)
+                raise BudgetExhausted()
+            ticks += 1
+            conflict = self._propagate()
+            if conflict is None and not self.looped:
+                for lits in self._loop_clauses():
+                    conflict = self._add_lazy(lits)
+                    if conflict is not None:
+                        break
+                else:
+                    self.looped = True
+                if conflict is None:
+                    continue  # Propagate what the loop rule forced.
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.trail_lim:
+                    self.unsatisfiable = True
+                    return False
+                (learned, back) = self._analyze(conflict)
+                self._cancel_until(back)
+                if len(learned) == 1:
+                    self._assign(learned[0], None)
+                else:
+                    self._assign(learned[0], self._attach(learned, learned=True))
+                self.bump /= 0.95
+                budget -= 1
+            else:
+                if budget <= 0:
+                    restarts += 1
+                    budget = RESTART_UNIT * luby(restarts + 1)
+                    self._cancel_until(0)
+                    continue
+                if len(self.learned) > self.learned_limit:
+                    self._reduce()
+                if not self._decide():
+                    return True
+
+    def model(self):
+        """The filled edges of the model solve() just found."""
+        return [e for e in range(self.num_edges) if self.values[e] == FILLED]
+
+    def block(self, filled):
+        """Rule out one solution, given as its filled edges: some edge must
+        differ from it."""
+        filled = set(filled)
+        self.add_clause([2 * e if e in filled else 2 * e + 1 for e in range(self.num_edges)])
+
+
+def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None,
+                       directed=False, node_budget=None):
+    """slisolver.solution_is_unique, answered by clause learning rather than
+    chronological backtracking. Same arguments and the same answer: True only
+    if the clues admit exactly one loop, False if they admit more or none, or if
+    `time_budget` seconds ran out first, or `node_budget` decisions plus
+    conflicts (on each of the directed mode's two solvers).
+
+    Plain, it finds a solution, blocks it, and looks for another. Directed, it
+    checks that `solution` meets the clues, then looks only for a loop that
+    differs from it, so proving uniqueness is one refutation.
+    """
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    solver = ClauseSolver(mesh)
+    solver.apply_clues(clues, num_clues)
+    try:
+        if directed:
+            known = solution_edges(solver, solution)
+            if known is None:
+                return False
+            # The known loop must itself be a model of the clauses.
+            checker = ClauseSolver(mesh)
+            checker.apply_clues(clues, num_clues)
+            for e in range(solver.num_edges):
+                checker.add_clause([2 * e + 1 if e in known else 2 * e])
+            if not checker.solve(deadline, node_budget):
+                return False
+            solver.block(known)
+            return not solver.solve(deadline, node_budget)
+        if not solver.solve(deadline, node_budget):
+            return False
+        solver.block(solver.model())
+        return not solver.solve(deadline, node_budget)
+    except BudgetExhausted:
+        return False
+
+
+def solution_edges(solver, solution):
+    """The edge numbers of a stored solution (vertex keys round the loop), or
+    None if some step of it isn't an edge of the grid."""
+    edges = set()
+    for i in range(len(solution)):
+        e = solver.edge_index.get(edge_id((solution[i], solution[(i + 1) % len(solution)])))
+        if e is None:
+            return None
+        edges.add(e)
+    return edges if len(solution) >= 3 else None
@@ -5,6 +5,7 @@ Usage:
     util/genLoosePuzzle.py dtC                      # write data/dtC-puzzles.json
     util/genLoosePuzzle.py dtC --fraction 0.9       # more clues
     util/genLoosePuzzle.py dtC --seed 5 --force     # another try, overwriting
+    util/genLoosePuzzle.py dtC --nodes 20000        # a verdict any machine repeats
 
 Why this exists: genSliPuzzles.py insists on a clue set with a provably unique
 solution, and on the three all-triangle solids with very uneven vertex degrees
@@ -38,9 +39,9 @@ from pathlib import Path
 from compas.datastructures import Mesh
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
-from slisolver import (  # noqa: E402  (needs the path set up first)
-    apply_clues, is_valid_loop, propagate_constraints, solution_is_unique,
-    solvable_by_deduction,
+from cdcl import solution_is_unique  # noqa: E402  (needs the path set up first)
+from slisolver import (  # noqa: E402
+    apply_clues, is_valid_loop, propagate_constraints, solvable_by_deduction,
 )
 
 DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
@@ -215,6 +216,10 @@ def main():
     parser.add_argument('--budget', type=float, default=30.0,
                         help='seconds to spend on the bounded uniqueness check '
                              '(default 30; it is reported, never required)')
+    parser.add_argument('--nodes', type=int,
+                        help='also cap that check at this many search nodes, which, '
+                             'unlike seconds, gives the same verdict on any machine '
+                             '(see bench_solver.py --calibrate)')
     parser.add_argument('--survey', type=int, metavar='SEEDS',
                         help='try SEEDS solutions at several clue densities and '
                              'report how far deduction gets, writing nothing')
@@ -248,11 +253,14 @@ def main():
 
     # A bounded attempt at the question this script otherwise skips. Three
     # outcomes, and the middle one matters most: "not unique" means a hand solver
-    # may legitimately find a different loop than the one stored here.
+    # may legitimately find a different loop than the one stored here. Asked by
+    # clause learning (cdcl.py), which finishes on these solids where
+    # slisolver's backtracking search did not.
     unique = solution_is_unique(clues, len(clues), loop, mesh, None,
-                                time_budget=args.budget)
+                                time_budget=args.budget, node_budget=args.nodes)
     verdict = ('unique' if unique
-               else f'not proven unique within {args.budget:g}s')
+               else f'not proven unique within {args.budget:g}s'
+               + ('' if args.nodes is None else f' or {args.nodes} nodes'))
 
     # No "displayPuzzles" key at all: an empty list would promise the title
     # screen a loop that isn't there (see docs/json-format.md, and the test in
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """Generate Slitherlink3D puzzles (in JSON) for a given grid (input from JSON).
 Usage: util/genSliPuzzles.py [--quiet|--verbose] [--display=N]
-           [--existing=FILE] myGrid.json [numPuzzles]
+           [--existing=FILE] [--engine=NAME] [--orderings=N] [--workers=N]
+           [--placement=NAME] myGrid.json [numPuzzles]
 Output is written to stdout; diagnostic/progress messages go to stderr.
 --quiet keeps only errors, warnings and the outcome; --verbose adds per-edge
 detail. See VERBOSITY.
@@ -11,8 +12,15 @@ screen, never handed to a player. See generate_puzzles.
 is how puzzles are added to a grid without churning the ones people may have
 bookmarked. Both counts then mean "this many MORE", and --display defaults to 0.
 See load_existing_puzzles.
+--engine=NAME picks which of slisolver.ENGINES clue cutting runs on; they differ
+only in speed. See cut_clues.
+--orderings=N cuts N random clue orderings per puzzle rather than 5, keeping the
+shortest; --workers=N cuts them in N processes rather than one per CPU. See
+generate_minimal_clueset.
+--placement=stalls places each clue where deduction stalls, rather than cutting
+random orderings. See place_clues.
 For JSON format specifications, see docs/json-format.md."""
-import itertools, json, random, sys, math
+import hashlib, itertools, json, os, random, sys, math, time
 from collections import Counter
 
 import matplotlib.pyplot as plt
@@ -43,6 +51,18 @@ num_puzzles_wanted: int = 1
 num_display_wanted: int = 1
 # Path given by --existing=FILE, whose puzzles are kept as-is; None otherwise.
 existing_puzzles_path: str|None = None
+# Which of slisolver.ENGINES cut_clues asks (--engine=NAME). They all reach the
+# same answers; this only decides how fast.
+solver_engine: str = 'board'
+# How many random clue orderings generate_minimal_clueset cuts, keeping the
+# shortest (--orderings=N), and how many processes cut them at once
+# (--workers=N; None is one per CPU).
+clue_orderings: int = 5
+cut_workers: int|None = None
+# How generate_minimal_clueset picks its clues (--placement=NAME): 'orderings'
+# cuts random orderings as above; 'stalls' places each clue where deduction
+# stalled instead (see place_clues).
+clue_placement: str = 'orderings'
 # Was --display given explicitly? Only so that --existing can lower the DEFAULT
 # without overriding a number the caller actually asked for.
 display_count_given: bool = False
@@ -53,6 +73,10 @@ puzzles_output: dict = {}
 # managed to produce any -- an absent key means the title screen shows that
 # grid's clues without a loop. See docs/json-format.md.
 display_puzzles: list = []
+# The canonical hash of every puzzle kept so far, playable and display alike,
+# filed under its clue census: what already_generated looks a candidate up in.
+# keep_puzzle adds to it in step with the two lists above.
+kept_by_census: dict = {}
 
 grid_vertices: list|None = None
 num_vertices: int = 0
@@ -78,6 +102,12 @@ poly: Poly3DCollection|None = None
 coloring = None
 # The solid's symmetries, computed on first use by face_symmetries().
 symmetries_cache = None
+# The slisolver.Solver cut_clues asks, with the mesh and engine it was built
+# for; see grid_solver.
+solver_cache = None
+# The process pool generate_minimal_clueset cuts orderings in, with what it was
+# started for; see cutting_pool.
+pool_cache = None
 # Symbols for our colors, so that we don't risk typos.
 red = "red"
 blue = "blue"
@@ -97,6 +127,36 @@ SOLVER_TIME_BUDGET = 20.0
 # This is the difficulty dial: see cut_clues.
 LOOKAHEAD_DEPTH = 1
 
+# Stop cutting a clue ordering after this many seconds, once another ordering
+# has already been cut: it is a straggler, and the shorter prefix it might still
+# find isn't worth holding up the puzzle for. The first ordering to finish is
+# never cut short, so there is always an answer if one is to be had. The budget
+# is checked between solver calls, not during one: a straggler stops at the end
+# of the deduction it is in, which on the larger grids can run some seconds
+# past the budget, rather than being interrupted.
+ORDERING_TIME_BUDGET = 60.0
+
+# How cut_clues looks for the shortest deducible prefix: False binary-searches
+# it, True adds clues one at a time until the position is deduced. Both ask a
+# slisolver.PrefixDeduction, which starts each prefix from the longest one found
+# wanting, and both find the same prefix. The binary search is the faster: an
+# under-clued prefix costs a full lookahead round whether or not it is
+# warm-started, and adding clues one by one asks every one of them.
+CUT_LINEARLY = False
+
+# Whether generate_minimal_clueset then drops the clues of a cut prefix that
+# the rest can do without (prune_clues). A shortest prefix keeps whatever came
+# early in its ordering; pruning costs a check per clue it keeps, each only
+# re-deducing what the clue left out can have justified. On by default as a
+# deliberate trade: about 2.5x the generation time for 6-30% fewer clues (see
+# docs/generating-puzzles.md, Phase B).
+PRUNE_CLUES = True
+
+# What fraction of a random ordering's clues place_clues starts from, before
+# placing the rest where deduction stalls. Starting from none costs a step per
+# clue on positions too open for any placement to matter much.
+STALL_START = 0.2
+
 # How many times to start over with fresh regions when a solution turns out to
 # admit no deductively-solvable clue set, before giving up on that puzzle.
 MAX_REGION_ATTEMPTS = 15
@@ -331,13 +391,21 @@ def load_grid_file():
 def usage():
     """Print usage message and exit."""
     log("Usage: genSliPuzzles.py [--quiet|--verbose] [--display=N] "
-        "[--existing=FILE] myGrid.json [numPuzzles]", level=0)
+        "[--existing=FILE] [--engine=NAME] [--orderings=N] [--workers=N]\n"
+        "           [--placement=NAME] myGrid.json [numPuzzles]", level=0)
     log("  -q, --quiet      only errors, warnings and the outcome of the run", level=0)
     log("  -v, --verbose    add per-edge/per-face detail (very wordy)", level=0)
     log("  --display=N      also generate N display-only puzzles (default 1, "
         "or 0 with --existing)", level=0)
     log("  --existing=FILE  keep everything already in FILE; both counts then "
         "mean how many MORE to generate", level=0)
+    log(f"  --engine=NAME    solver engine for clue cutting: "
+        f"{', '.join(slisolver.ENGINES)} (default board)", level=0)
+    log(f"  --orderings=N    clue orderings to cut per puzzle, keeping the "
+        f"shortest (default {clue_orderings})", level=0)
+    log("  --workers=N      processes to cut them in (default one per CPU)", level=0)
+    log("  --placement=NAME how to pick clues: orderings (cut random orderings, "
+        "the default) or stalls (add each where deduction stalls)", level=0)
     sys.exit(1)
 
 
@@ -347,6 +415,19 @@ def option_value(arg, name):
     return arg[len(prefix):] if arg.startswith(prefix) else None
 
 
+def positive_count(value, name):
+    """--name=value's value as a number of at least 1, or usage() if it isn't."""
+    try:
+        count = int(value)
+    except ValueError:
+        log(f"Error: --{name} wants a number, not '{value}'.", level=0)
+        usage()  # exits
+    if count < 1:
+        log(f"Error: --{name} must be at least 1.", level=0)
+        usage()  # exits
+    return count
+
+
 def process_args():
     """Process command-line arguments.
 
@@ -360,7 +441,8 @@ def process_args():
     add another display puzzle on every run.
     """
     global num_puzzles_wanted, num_display_wanted, existing_puzzles_path
-    global display_count_given, grid_path, VERBOSITY
+    global display_count_given, grid_path, solver_engine, VERBOSITY
+    global clue_orderings, cut_workers, clue_placement
     positional = []
     for arg in sys.argv[1:]:
         if arg in ("-q", "--quiet"):
@@ -379,6 +461,20 @@ def process_args():
             display_count_given = True
         elif (value := option_value(arg, "existing")) is not None:
             existing_puzzles_path = value
+        elif (value := option_value(arg, "engine")) is not None:
+            if value not in slisolver.ENGINES:
+                log(f"Error: no solver engine '{value}' here.", level=0)
+                usage()  # exits
+            solver_engine = value
+        elif (value := option_value(arg, "orderings")) is not None:
+            clue_orderings = positive_count(value, "orderings")
+        elif (value := option_value(arg, "workers")) is not None:
+            cut_workers = positive_count(value, "workers")
+        elif (value := option_value(arg, "placement")) is not None:
+            if value not in ("orderings", "stalls"):
+                log(f"Error: no clue placement '{value}' here.", level=0)
+                usage()  # exits
+            clue_placement = value
         elif arg.startswith("-"):
             log(f"Error: unrecognized option '{arg}'.", level=0)
             usage()  # exits
@@ -401,8 +497,9 @@ def load_existing_puzzles():
     through as they stand -- playable and display alike -- and both count as
     already generated, so anything produced this run is distinct from them (up to
     rotation and reflection; see already_generated). The kept puzzles come out
-    byte-identical, so nobody's bookmarked ?puzzle= number moves, and a new
-    display loop can't be the answer to a playable puzzle.
+    unchanged -- bar a "canonical" hash added to any that lack one -- so nobody's
+    bookmarked ?puzzle= number moves, and a new display loop can't be the answer
+    to a playable puzzle.
 
     Display puzzles were once DISCARDED here, on the grounds that asking for
     display puzzles is a request to make new ones. That made the two lists behave
@@ -437,9 +534,15 @@ def load_existing_puzzles():
         sys.exit(1)
 
     kept = existing.get("puzzles", [])
-    puzzles_output["puzzles"].extend(kept)
     kept_display = existing.get("displayPuzzles", [])
-    display_puzzles.extend(kept_display)
+    # keep_puzzle also hashes whatever the file didn't come with -- it predates
+    # the field, or was written by hand -- so that the file we write has a
+    # "canonical" for every puzzle, and the next top-up of it has nothing to
+    # recompute.
+    for puzzle in kept:
+        keep_puzzle(puzzle)
+    for puzzle in kept_display:
+        keep_puzzle(puzzle, display=True)
     log(f"Keeping {len(kept)} existing puzzle(s) and {len(kept_display)} display "
         f"puzzle(s) from {existing_puzzles_path}.")
 
@@ -1163,7 +1266,7 @@ def clues_by_face(clues_in, num_clues_to_use, num_faces):
     return clues_out
 
 
-def generate_minimal_clueset(mesh) -> list[int]:
+def generate_minimal_clueset(mesh, orderings=None, workers=None) -> list[int]:
     """Using established solution, generate a fairly minimal set of clues that fit only that solution.
 
     In some cases this may not be possible, so the return value may be None.
@@ -1172,6 +1275,20 @@ def generate_minimal_clueset(mesh) -> list[int]:
     (fkeys). The values in the list are the clues to be displayed on each face, i.e.,
     how many edges of each face that form part of the solution loop. Missing values at the
     end of the list, or -1, mean that no number should be displayed on those faces.
+
+    Cuts `orderings` random orderings of the clues (default clue_orderings), in
+    `workers` processes (default cut_workers), and keeps the one that needs
+    fewest. Each ordering only looks for a prefix shorter than the best found so
+    far, which workers share, and one still going ORDERING_TIME_BUDGET seconds
+    after it started, once another has finished, is given up. The first of the
+    shortest wins, however many processes cut them, so a fixed seed gives the
+    same clues either way -- unless the time budget gave up on an ordering in
+    one run and not the other. With PRUNE_CLUES, the winner's
+    prefix is then pruned of whatever clues in it the rest can do without: see
+    prune_clues.
+
+    That is for clue_placement 'orderings'; under 'stalls', place_clues picks
+    the clues instead, once, and `orderings` and `workers` don't apply.
     """
     # cut_clues() could fail, not because there is no set of clues
     # that yields a unique solution, but because of the ordering... right?
@@ -1183,24 +1300,208 @@ def generate_minimal_clueset(mesh) -> list[int]:
     # Track the BEST ordering separately so we don't return clues from
     # the last iteration's ordering (which might not be the best).
     num_faces = mesh.number_of_faces()
+    if clue_placement == 'stalls':
+        placed = place_clues(mesh)
+        return None if placed is None else clues_by_face(placed, len(placed), num_faces)
+
+    orderings = clue_orderings if orderings is None else orderings
+    workers = (cut_workers or os.cpu_count() or 1) if workers is None else workers
+    # All drawn here, from the one random stream, before any is cut: so the
+    # orderings are the same however many processes cut them, and reproducible
+    # under a fixed seed, without a worker drawing anything.
+    face_orderings = [random_face_ordering(mesh) for _ in range(orderings)]
     min_needed = num_faces + 1   # sentinel: no successful ordering seen yet
     best_face_clues = None
-    # TODO: Start these in separate threads for parallelism, and cancel if they take too long.
-    for i in range(5):
-        face_clues = random_face_ordering(mesh)
-        num_needed = cut_clues(mesh, face_clues)
-        # cut_clues returns None when no prefix of this ordering yields a
-        # unique solution; skip such orderings.
-        if num_needed is not None and num_needed < min_needed:
-            min_needed = num_needed
-            best_face_clues = face_clues
+    # The prefixes of the winner its cut found wanting; see below.
+    best_failed = []
+
+    if workers <= 1 or orderings <= 1:
+        for face_clues in face_orderings:
+            # cut_clues, keeping the PrefixDeduction to see what failed.
+            solvable = grid_solver(mesh).prefixes(face_clues, depth=LOOKAHEAD_DEPTH)
+            num_needed = shortest_deducible_prefix(
+                solvable, to_beat=lambda: min_needed,
+                deadline=time.monotonic() + ORDERING_TIME_BUDGET)
+            # None when no prefix of this ordering beats the best so far; skip
+            # such orderings.
+            if num_needed is not None:
+                (min_needed, best_face_clues) = (num_needed, face_clues)
+                best_failed = failed_prefixes(solvable)
+    else:
+        (pool, bound) = cutting_pool(mesh, min(workers, orderings))
+        bound.value = min_needed
+        try:
+            cuts = [pool.submit(_cut_in_worker, face_clues)
+                    for face_clues in face_orderings]
+            # Taken in ordering order, not as they finish, and the workers
+            # report ties with the best so far (see _cut_in_worker): so the
+            # winner is the first of the shortest, as in one process, not
+            # whichever of them happened to finish first.
+            for (face_clues, future) in zip(face_orderings, cuts):
+                (num_needed, failed) = future.result()
+                if num_needed is not None and num_needed < min_needed:
+                    (min_needed, best_face_clues, best_failed) = (num_needed, face_clues,
+                                                                  failed)
+        except BaseException:
+            # A cut still running would go on to lower the bound under the next
+            # call's feet, so the pool goes too.
+            stop_cutting_pool()
+            raise
 
     if best_face_clues is None:
         return None   # No ordering produced a uniquely-solvable clue set.
 
+    if PRUNE_CLUES:
+        # The winner's own PrefixDeduction is gone -- the orderings cut after
+        # it started the board afresh, and a worker's never leaves its process
+        # -- so its positions are deduced again, for the prefixes that failed,
+        # for prune_clues to start from: a probe each, and no more.
+        solvable = grid_solver(mesh).prefixes(best_face_clues, depth=LOOKAHEAD_DEPTH)
+        for n in best_failed:
+            solvable(n)
+        best_face_clues = [best_face_clues[i] for i in prune_clues(solvable, min_needed)]
+        min_needed = len(best_face_clues)
     return clues_by_face(best_face_clues, min_needed, num_faces)
 
 
+def cutting_pool(mesh, workers):
+    """(pool, bound): the pool of `workers` processes generate_minimal_clueset
+    cuts orderings in, and the length to beat they share, started on first use.
+
+    Starting a pool starts its processes and sends each the grid's Solver,
+    which on the small grids, where a cut takes milliseconds, costs more than
+    cutting in parallel saves. So one pool serves the whole run -- every region
+    attempt of every puzzle -- rather than one per call. It can, because
+    nothing a worker holds depends on the solution: the clues come with each
+    ordering. It is started afresh only if the Solver, the number of workers
+    or a setting the workers copy (see _start_cutter) has changed.
+    """
+    global pool_cache
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    key = (grid_solver(mesh), workers, LOOKAHEAD_DEPTH, CUT_LINEARLY, VERBOSITY)
+    if (pool_cache is None or pool_cache[0][0] is not key[0]
+            or pool_cache[0][1:] != key[1:]):
+        stop_cutting_pool()
+        bound = multiprocessing.Value('i', 0)
+        pool = ProcessPoolExecutor(workers, initializer=_start_cutter,
+                                   initargs=(key[0], bound) + key[2:])
+        pool_cache = (key, pool, bound)
+    return pool_cache[1:]
+
+
+def stop_cutting_pool():
+    """Shut down cutting_pool's processes, if it has any."""
+    global pool_cache
+    if pool_cache is not None:
+        pool_cache[1].shutdown(cancel_futures=True)
+        pool_cache = None
+
+
+# A cutting worker's Solver and the shared length to beat, set once when the
+# worker starts, so that each ordering sends only its clues.
+_cutter_solver = None
+_cutter_bound = None
+
+
+def _start_cutter(solver, bound, depth, linearly, verbosity):
+    """Initializer for generate_minimal_clueset's workers. The settings cut_clues
+    reads come along too, since a worker that doesn't fork starts without them."""
+    global _cutter_solver, _cutter_bound, LOOKAHEAD_DEPTH, CUT_LINEARLY, VERBOSITY
+    (_cutter_solver, _cutter_bound) = (solver, bound)
+    (LOOKAHEAD_DEPTH, CUT_LINEARLY, VERBOSITY) = (depth, linearly, verbosity)
+
+
+def _cut_in_worker(face_clues):
+    """cut_clues for one ordering in a worker, sharing what it finds; with the
+    failed_prefixes of its cut.
+
+    It looks for a prefix no LONGER than the best so far, where one process
+    looks for a shorter one: which ordering of the shortest finishes first is
+    down to timing, and an earlier one that merely ties the bound must still
+    say so, for generate_minimal_clueset to prefer it."""
+    bound = _cutter_bound
+    solvable = _cutter_solver.prefixes(face_clues, depth=LOOKAHEAD_DEPTH)
+    num_needed = shortest_deducible_prefix(solvable, to_beat=lambda: bound.value + 1,
+                                           deadline=time.monotonic() + ORDERING_TIME_BUDGET)
+    if num_needed is not None:
+        with bound.get_lock():
+            bound.value = min(bound.value, num_needed)
+    return (num_needed, failed_prefixes(solvable))
+
+
+def failed_prefixes(solvable) -> list[int]:
+    """The lengths of the prefixes this slisolver.PrefixDeduction found
+    wanting and kept the positions of, shortest first: asking it again for
+    each, in that order, rebuilds them."""
+    return [n for (n, _) in solvable.bases[1:]]
+
+
+def place_clues(mesh, start=None) -> list[tuple]|None:
+    """Clues for the established solution, each placed where deduction stalls:
+    the (face, num_walls) pairs chosen, pruned if PRUNE_CLUES; None if even
+    every clue random_face_ordering offers doesn't make it deducible.
+
+    Starts from the first `start` clues of a random ordering (default
+    STALL_START of them), then repeats: deduce as far as LOOKAHEAD_DEPTH
+    allows, and where that stalls, add a clue in the largest undetermined
+    region -- faces joined by the edges still unknown, measured in those edges
+    -- on the face there with the most unknown edges, the first in the ordering
+    of those tied. A random prefix spends clues wherever the ordering happens
+    to put them; this puts each one where the puzzle is most open.
+
+    Every step is a slisolver.PrefixDeduction call with one more clue, so it
+    starts from where the last one stalled; and prune_clues afterwards starts
+    each check from the step before the clue it leaves out.
+    """
+    ordering = random_face_ordering(mesh)
+    start = round(len(ordering) * STALL_START) if start is None else start
+    clues = ordering[:start]
+    unused = ordering[start:]
+    face_edges = {fkey: [slisolver.edge_id(ekey) for ekey in mesh.face_halfedges(fkey)]
+                  for fkey in mesh.faces()}
+    solvable = grid_solver(mesh).prefixes(clues, depth=LOOKAHEAD_DEPTH)
+    while not solvable(len(clues)):
+        if not unused:
+            return None
+        unknown = slisolver.unknown_edges(solvable.mesh)
+        # A face in the largest region that has a clue to give, if any region
+        # has one; otherwise whichever clue comes next.
+        chosen = unused[0]
+        for region in undetermined_regions(face_edges, unknown):
+            offered = [clue for clue in unused if clue[0] in region]
+            if offered:
+                chosen = max(offered, key=lambda clue: sum(edge in unknown
+                                                           for edge in face_edges[clue[0]]))
+                break
+        log(f"Deduction stalled with {len(clues)} clues; adding {chosen}.", level=2)
+        unused.remove(chosen)
+        clues.append(chosen)
+    kept = prune_clues(solvable, len(clues)) if PRUNE_CLUES else range(len(clues))
+    return [clues[i] for i in kept]
+
+
+def undetermined_regions(face_edges, unknown) -> list[set]:
+    """The faces with an unknown edge, grouped into regions: two faces are in
+    one region if a chain of unknown edges' faces joins them. Largest first, by
+    unknown edges; `face_edges` maps each face to its edge_id keys."""
+    edge_faces = {}
+    for (fkey, edges) in face_edges.items():
+        for edge in edges:
+            if edge in unknown:
+                edge_faces.setdefault(edge, []).append(fkey)
+    graph = nx.Graph()
+    for faces in edge_faces.values():
+        graph.add_nodes_from(faces)
+        graph.add_edges_from(itertools.pairwise(faces))
+
+    def size(region):
+        return len({edge for fkey in region for edge in face_edges[fkey] if edge in unknown})
+
+    return sorted(nx.connected_components(graph), key=size, reverse=True)
+
+
 def min_prefix_satisfying(predicate, n_total, initial_guess) -> int|None:
     """Binary-search for the smallest n in [1, n_total] such that predicate(n) is True.
 
@@ -1245,7 +1546,17 @@ def min_prefix_satisfying(predicate, n_total, initial_guess) -> int|None:
         n = (min_n + max_n) // 2
 
 
-def cut_clues(mesh, clues: list[tuple]) -> int|None:
+def first_prefix_satisfying(predicate, n_total) -> int|None:
+    """The smallest n in [1, n_total] such that predicate(n) is True, asking
+    n = 1, 2, 3... in turn; None if there is none.
+
+    min_prefix_satisfying's answer, for a predicate that can make each call
+    cheap by building on the one before it. Pure, like min_prefix_satisfying.
+    """
+    return next((n for n in range(1, n_total + 1) if predicate(n)), None)
+
+
+def cut_clues(mesh, clues: list[tuple], to_beat=None, deadline=None) -> int|None:
     """Given a list of (face, clue) pairs, find the shortest prefix that makes
     a good puzzle. Returns None if no prefix does.
 
@@ -1261,19 +1572,103 @@ def cut_clues(mesh, clues: list[tuple]) -> int|None:
     Requiring deductive solvability subsumes uniqueness, so nothing is lost: a
     position that sound rules determine completely admits no other solution.
     It does mean more clues than before -- that is the point.
+
+    For generate_minimal_clueset, which only wants a prefix shorter than the
+    best another ordering found: `to_beat`, if given, is called for that
+    length, and no prefix at least as long is asked about -- if the shortest
+    is one of them, the answer is None. It is asked afresh each time, since in
+    a worker process another may shorten it meanwhile. And once time passes
+    `deadline` (a time.monotonic() value) with a length to beat, the answer
+    is None as well.
     """
     # We now have all the clues, in a random order. We just need to determine how many
-    # of them are needed.
+    # of them are needed. Every probe asks on solver_engine -- by default the
+    # array-backed one, which reaches the same answers as the mesh several times
+    # faster, and leaves the mesh alone.
+    # A prefix starts from what the longest one found wanting deduced, rather
+    # than from a blank board: see slisolver.PrefixDeduction.
+    return shortest_deducible_prefix(grid_solver(mesh).prefixes(clues, depth=LOOKAHEAD_DEPTH),
+                                     to_beat, deadline)
+
+
+def shortest_deducible_prefix(solvable, to_beat=None, deadline=None) -> int|None:
+    """cut_clues, asking this slisolver.PrefixDeduction of the clues."""
+    clues = solvable.clues
+    out_of_time = False
+
     def prefix_is_solvable_by_deduction(num_clues):
-        return slisolver.solvable_by_deduction(mesh, clues, num_clues,
-                                               depth=LOOKAHEAD_DEPTH)
+        # A prefix that couldn't beat to_beat anyway is taken as solvable, as
+        # is every prefix once time is up: that only sends the search lower,
+        # where any prefix that could beat it would be, and it ends without
+        # another solver call. What it ends at is then not an answer.
+        nonlocal out_of_time
+        bound = None if to_beat is None else to_beat()
+        if bound is not None and num_clues >= bound:
+            return True
+        if (deadline is not None and bound is not None and bound <= len(clues)
+                and time.monotonic() > deadline):
+            out_of_time = True
+            return True
+        return solvable(num_clues)
 
     # Search over the clues we actually have, which may be fewer than
     # num_faces now that random_face_ordering drops deficit-0 faces.
     # Deductive solvability needs more clues than uniqueness did, so start
-    # probing higher up than the old 30% guess.
-    return min_prefix_satisfying(prefix_is_solvable_by_deduction, len(clues),
-                                 round(len(clues) * 0.6))
+    # probing higher up than the old 30% guess. With a length to beat, start
+    # just below it instead: if that prefix isn't solvable, no shorter one is,
+    # and one probe of a well-clued prefix -- a cheap one -- has settled it.
+    n_total = len(clues)
+    initial_guess = round(n_total * 0.6)
+    if to_beat is not None and (bound := to_beat()) is not None and bound <= n_total:
+        n_total = initial_guess = bound - 1
+    if CUT_LINEARLY:
+        num_needed = first_prefix_satisfying(prefix_is_solvable_by_deduction, n_total)
+    else:
+        num_needed = min_prefix_satisfying(prefix_is_solvable_by_deduction, n_total,
+                                           initial_guess)
+    if num_needed is None or out_of_time:
+        return None
+    if to_beat is not None and (bound := to_beat()) is not None and num_needed >= bound:
+        return None
+    return num_needed
+
+
+def prune_clues(solvable, num_clues) -> list[int]:
+    """The indices of the clues to keep of the first num_clues, a prefix
+    solvable by deduction: each in turn is left out if the rest are still
+    solvable without it.
+
+    A shortest prefix keeps whatever happened to come early in the ordering,
+    needed or not; this drops those, which a shorter prefix can't. What is left
+    is minimal: leaving out any one clue more would take deduction short.
+
+    `solvable` is the slisolver.PrefixDeduction the prefix was cut with, and
+    the clues are tried last first, so that each check retracts only what was
+    deduced since the clue went in (see PrefixDeduction.keeping). The last
+    clue of the prefix needs no check: without it, the prefix was one too short.
+    """
+    kept = list(range(num_clues))
+    for i in reversed(range(num_clues - 1)):
+        without = [k for k in kept if k != i]
+        if solvable.keeping(without):
+            kept = without
+    return kept
+
+
+def grid_solver(mesh) -> slisolver.Solver:
+    """The Solver for this mesh on solver_engine, built on first use.
+
+    Every cut_clues call used to build its own board, indexing the mesh's
+    topology afresh for each of the orderings generate_minimal_clueset tries
+    and each puzzle after that. The topology never changes, so now it is
+    indexed once per grid, and the board's propagation memo carries over from
+    one call to the next.
+    """
+    global solver_cache
+    if (solver_cache is None or solver_cache[0] is not mesh
+            or solver_cache[1] != solver_engine):
+        solver_cache = (mesh, solver_engine, slisolver.Solver(mesh, solver_engine))
+    return solver_cache[2]
 
 
 def face_symmetries():
@@ -1285,8 +1680,7 @@ def face_symmetries():
     from a different angle, however different their clue lists look.
 
     Computed on demand and cached: it costs up to a couple of seconds on the
-    larger solids, and a run that never sees a candidate duplicate never needs
-    it at all.
+    larger solids, which every run now pays once, for the first canonical_hash.
 
     A sanity check worth knowing: for every grid in data/ the group order this
     produces matches the solid's known symmetry group -- 24 for the
@@ -1331,22 +1725,68 @@ def same_puzzle_up_to_symmetry(clues_a, clues_b):
                for sigma in face_symmetries())
 
 
-def puzzles_so_far():
-    """Every puzzle this run has kept, playable and display-only alike.
+def canonical_hash(clues):
+    """A name for the puzzle that doesn't depend on which way up the solid is.
 
-    Both lists, so that a display puzzle isn't a copy of a playable one: it would
-    be an odd thing to put on the title screen, since the point of it is to show
-    something other than the puzzles on offer. (Also the reason display puzzles
-    are generated last: see generate_puzzles.)
+    Every symmetry carries the clue list to an image of itself; the
+    lexicographically smallest of those images is the same whichever image we
+    started from, so two puzzles share it exactly when one is the other turned
+    around. Hashing it gives a short string to store and look up: that makes
+    spotting a repeat a set lookup, where comparing against each kept puzzle
+    took a scan over the whole symmetry group per puzzle.
+
+    The hash is the first 16 hex digits (64 bits) of a SHA-256, which is ample:
+    no grid keeps more than a few dozen puzzles. A list shorter than the solid
+    has faces is padded with -1 first, as the puzzle format allows, so that
+    trailing blanks don't give one puzzle two names.
+    """
+    clues = list(clues) + [-1] * (mesh.number_of_faces() - len(clues))
+    images = []
+    for sigma in face_symmetries():
+        image = [-1] * len(clues)
+        for fkey, clue in enumerate(clues):
+            image[sigma[fkey]] = clue
+        images.append(image)
+    canonical = min(images)
+    return hashlib.sha256(json.dumps(canonical).encode()).hexdigest()[:16]
+
+
+def puzzle_canonical(puzzle):
+    """The puzzle's canonical_hash, worked out and stored on it if it lacks one.
+
+    Stored in the puzzle itself so it goes out in the puzzles file, and an
+    --existing run reads it back rather than hashing again. A stored hash is
+    trusted: anyone hand-editing the clues should delete it along with them.
+    """
+    if "canonical" not in puzzle:
+        puzzle["canonical"] = canonical_hash(puzzle["clues"])
+    return puzzle["canonical"]
+
+
+def census_key(clues):
+    """clue_census in a form that can key a dict."""
+    return frozenset(clue_census(clues).items())
+
+
+def keep_puzzle(puzzle, display=False):
+    """Add a puzzle to the playable list, or to display_puzzles, and file its
+    canonical hash in kept_by_census.
+
+    Both lists go into the one index, so that a display puzzle isn't a copy of a
+    playable one: it would be an odd thing to put on the title screen, since the
+    point of it is to show something other than the puzzles on offer. (Also the
+    reason display puzzles are generated last: see generate_puzzles.)
 
     Two puzzles can still share a LOOP while differing in clues, and that's
     allowed: nothing on screen tells the player the loops match, so it gives
     nothing away.
     """
-    return puzzles_output["puzzles"] + display_puzzles
+    (display_puzzles if display else puzzles_output["puzzles"]).append(puzzle)
+    kept_by_census.setdefault(census_key(puzzle["clues"]), set()).add(
+        puzzle_canonical(puzzle))
 
 
-def already_generated(clues):
+def already_generated(clues, canonical=None):
     """Have we already produced this puzzle, up to rotation and reflection?
 
     Comparing clue lists face by face isn't enough: the player can turn the
@@ -1357,14 +1797,18 @@ def already_generated(clues):
 
     Only clues are compared, never solutions: each puzzle we keep is uniquely
     solvable, so matching clues imply matching solutions.
+
+    So the check is a lookup of the canonical hash (see canonical_hash) in
+    kept_by_census; the caller may pass the hash in if it has already computed
+    it. The census goes first all the same: when no kept puzzle shares it,
+    there is nothing to hash at all.
     """
-    census = clue_census(clues)
-    for puzzle in puzzles_so_far():
-        if clue_census(puzzle["clues"]) != census:
-            continue   # Cheap: no symmetry could relate these two.
-        if same_puzzle_up_to_symmetry(puzzle["clues"], clues):
-            return True
-    return False
+    hashes = kept_by_census.get(census_key(clues))
+    if not hashes:
+        return False   # Cheap: no symmetry could relate this to any of them.
+    if canonical is None:
+        canonical = canonical_hash(clues)
+    return canonical in hashes
 
 
 def generate_puzzle(i, display=False):
@@ -1426,7 +1870,8 @@ def generate_puzzle(i, display=False):
             f"{'succeeded' if clues else 'failed'}")
         # If we couldn't generate proper clues for this puzzle, start over from scratch.
 
-        if clues and already_generated(clues):
+        canonical = canonical_hash(clues) if clues else None
+        if clues and already_generated(clues, canonical):
             # Small grids have few distinct puzzles -- the tetrahedron has
             # exactly ONE, since the loop is always some face's boundary and
             # every face is equivalent to every other -- so drawing each puzzle
@@ -1441,8 +1886,8 @@ def generate_puzzle(i, display=False):
             clues = None
             continue
 
-    puzzle = { "clues": clues, "solution": solution }
-    (display_puzzles if display else puzzles_output["puzzles"]).append(puzzle)
+    puzzle = { "clues": clues, "solution": solution, "canonical": canonical }
+    keep_puzzle(puzzle, display)
 
     plt.show()
     return True
@@ -1512,6 +1957,8 @@ def main():
             f"{len(puzzles_output['puzzles'])} puzzle(s) and "
             f"{len(display_puzzles)} display puzzle(s) completed so far.",
             level=0)
+    finally:
+        stop_cutting_pool()
     output_puzzles()
 
 
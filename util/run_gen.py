@@ -20,12 +20,12 @@ detail. Note that --quiet still lets errors through, so it is a better
 way to keep a batch run's output manageable than redirecting stderr to
 /dev/null, which hides real failures too.
 
---display=N and --existing=FILE are passed through as well; see the
-generator's own docstring for what they do. In short, --existing keeps
-everything in that file and both counts become "how many MORE", so adding
-a display puzzle to a grid that already has puzzles is this (via a
-temporary file, since the shell would truncate the input before the
-generator reads it):
+--display=N, --existing=FILE, --engine=NAME, --orderings=N, --workers=N and
+--placement=HOW are passed through as well; see the generator's own
+docstring for what they do. In short, --existing keeps everything in that
+file and both counts become "how many MORE", so adding a display puzzle to
+a grid that already has puzzles is this (via a temporary file, since the
+shell would truncate the input before the generator reads it):
 
     util/run_gen.py -q --display=1 --existing=data/aC-puzzles.json \\
         data/aC.json 0 600 > /tmp/aC.json && mv /tmp/aC.json data/aC-puzzles.json
@@ -60,7 +60,8 @@ GRACE_SECONDS = 15
 
 def usage():
     print("Usage: util/run_gen.py [--quiet|--verbose] [--display=N] "
-          "[--existing=FILE] <grid.json> [num_puzzles] [timeout_seconds]",
+          "[--existing=FILE] [--engine=NAME] [--orderings=N] [--workers=N] "
+          "[--placement=HOW] <grid.json> [num_puzzles] [timeout_seconds]",
           file=sys.stderr)
     print("  -q, --quiet      only errors, warnings and the outcome of the run",
           file=sys.stderr)
@@ -70,6 +71,14 @@ def usage():
           file=sys.stderr)
     print("  --existing=FILE  keep the puzzles already in FILE",
           file=sys.stderr)
+    print("  --engine=NAME    the solver engine the generator cuts clues with",
+          file=sys.stderr)
+    print("  --orderings=N    cut N random clue orderings per puzzle, keep the shortest",
+          file=sys.stderr)
+    print("  --workers=N      cut the orderings in N processes",
+          file=sys.stderr)
+    print("  --placement=HOW  'orderings' (the default) or 'stalls'",
+          file=sys.stderr)
     sys.exit(1)
 
 
@@ -80,7 +89,8 @@ def main():
     positional = []
     for arg in sys.argv[1:]:
         if (arg in ("-q", "--quiet", "-v", "--verbose")
-                or arg.startswith(("--display=", "--existing="))):
+                or arg.startswith(("--display=", "--existing=", "--engine=",
+                                "--orderings=", "--workers=", "--placement="))):
             # Passed through to the generator, which parses them; this wrapper
             # only needs to know they aren't its own positional arguments.
             flags.append(arg)
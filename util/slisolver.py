@@ -1,17 +1,26 @@
 """Slitherlink puzzle solver."""
 import itertools
+import random
 import time
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Only VectorBoard needs it; see ENGINES.
 # import networkx as nx
 # from compas.datastructures import Mesh
 
-def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None):
+def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None,
+                       directed=False, branching=None, node_budget=None, stats=None):
     """Return True if given solution is the only possible one for given clues.
 
     Args:
         clues: List of (face, num_walls) tuples representing the clues
         num_clues: How many clues from the list to use
         solution: The known solution (list of vertex indices forming a loop)
-        mesh: COMPAS Mesh representing the grid
+        mesh: COMPAS Mesh representing the grid, or a SolverBoard built from
+            one, which runs the same search on the array-backed engine
         dualG: NetworkX dual graph with nodes for faces (may not be needed)
         time_budget: Optional maximum number of seconds to spend searching.
             If the search exceeds it, give up and return False ("not proven
@@ -21,6 +30,27 @@ def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None
             generation: a False can only make the generator use more clues
             (or discard the region); uniqueness is never claimed without a
             completed search.
+        directed: Ask "is there a valid loop other than `solution`?" rather
+            than counting loops until two turn up. The search branches on
+            each edge's value OPPOSITE to the known solution's first, so a
+            second solution, if there is one, tends to surface in the first
+            few dives, and a leaf counts only if at least one edge differs
+            from the known loop. Proving uniqueness is then one exhausted
+            search that never has to find the known answer on the way. It
+            trusts `solution` only after checking it: a loop that isn't on
+            the grid, or doesn't meet the clues, gives False.
+        branching: The function that picks the edge to branch on, given
+            `mesh`; default select_edge_for_branching. BRANCHING names the
+            others, which take a SolverBoard, by what makes them; see
+            solution_is_unique_portfolio.
+        node_budget: Optional maximum number of search nodes, each one
+            propagation and at most one branch. Exceeding it is treated as
+            an exhausted time_budget is, but unlike seconds, nodes come out
+            the same on every machine however loaded, so a clue set passes
+            or fails alike everywhere. `bench_solver.py --calibrate` reports
+            this host's nodes per second, to translate one into the other.
+        stats: Optional dict, in which 'nodes' is set to the nodes searched,
+            and on a SolverBoard 'rounds' to the propagation rounds run.
 
     Returns:
         True if there is exactly one solution; False if multiple solutions
@@ -28,10 +58,12 @@ def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None
     """
     deadline = None if time_budget is None else time.monotonic() + time_budget
     budget_exhausted = [False]  # mutable so dfs_search can set it
+    branching = select_edge_for_branching if branching is None else branching
+    nodes = [0]
+    rounds = mesh.rounds if isinstance(mesh, SolverBoard) else None
 
     # Initialize edge states
-    for ekey in mesh.edges():
-        mesh.edge_attribute(ekey, 'guess', 'unknown')
+    reset_guesses(mesh)
 
     # Apply the clues to the mesh
     apply_clues(clues, num_clues, mesh)
@@ -39,6 +71,14 @@ def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None
     # Counter to track how many solutions we've found
     solutions_found = [0]  # Use list so it's mutable in nested function
 
+    known = None
+    if directed:
+        known = known_guesses(mesh, solution)
+        if known is None or not fits_clues(mesh, clues, num_clues, known):
+            return False
+        # The known loop is a solution; the search looks for another.
+        solutions_found[0] = 1
+
     def dfs_search(depth=0):
         """Depth-first search for solutions with constraint propagation.
 
@@ -48,6 +88,10 @@ def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None
         if deadline is not None and time.monotonic() > deadline:
             budget_exhausted[0] = True
             return False  # Abort the entire search.
+        nodes[0] += 1
+        if node_budget is not None and nodes[0] > node_budget:
+            budget_exhausted[0] = True
+            return False
 
         # Apply deterministic inference rules until no more progress
         contradiction = not propagate_constraints(mesh, clues, num_clues)
@@ -58,9 +102,8 @@ def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None
 
         # If all edges are determined, this branch is terminal.
         if is_complete_solution(mesh):
-            if is_valid_loop(mesh):
-                # TODO: check whether this solution is identical to the known one,
-                # and if not, we've found multiple solutions, so abort.
+            # In directed mode, the known loop itself was counted up front.
+            if is_valid_loop(mesh) and (known is None or not matches(mesh, known)):
                 solutions_found[0] += 1
                 if solutions_found[0] > 1:
                     # Found multiple solutions; abort search.
@@ -69,7 +112,7 @@ def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None
             return True
 
         # Choose an edge to guess on
-        edge_to_guess = select_edge_for_branching(mesh)
+        edge_to_guess = branching(mesh)
 
         if edge_to_guess is None:
             # No edges left to guess on but solution incomplete - contradiction
@@ -78,11 +121,16 @@ def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None
         # Save current state
         outer_state = save_state(mesh)
 
-        # Try both possibilities for this edge
-        for guess_value in ['filledIn', 'ruledOut']:
+        # Try both possibilities for this edge; directed, the one the known
+        # solution doesn't take first.
+        if known is None:
+            guess_values = ['filledIn', 'ruledOut']
+        else:
+            guess_values = [OPPOSITE_GUESS[known[edge_to_guess]], known[edge_to_guess]]
+        for guess_value in guess_values:
 
             # Make the guess
-            mesh.edge_attribute(edge_to_guess, 'guess', guess_value)
+            set_guess(mesh, edge_to_guess, guess_value)
 
             # Recursively search
             should_continue = dfs_search(depth + 1)
@@ -98,6 +146,10 @@ def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None
 
     # Start the search
     dfs_search()
+    if stats is not None:
+        stats['nodes'] = nodes[0]
+        if rounds is not None:
+            stats['rounds'] = mesh.rounds - rounds
 
     # Return True if exactly one solution was found. An exhausted time
     # budget means the search was incomplete, so uniqueness is unproven
@@ -105,12 +157,472 @@ def solution_is_unique(clues, num_clues, solution, mesh, dualG, time_budget=None
     return solutions_found[0] == 1 and not budget_exhausted[0]
 
 
+# How many nodes a piece of the parallel search explores before handing back
+# what it hasn't, so that idle workers get a share of a big subtree.
+SPLIT_NODES = 500
+
+
+def solution_is_unique_parallel(clues, num_clues, solution, mesh, dualG, time_budget=None,
+                                workers=None):
+    """solution_is_unique, with the search spread over `workers` processes
+    (default: one per CPU). Same arguments, same answer.
+
+    The search tree is split as it goes, not up front. Each piece of it -- a
+    list of decisions from the root -- is searched depth first for SPLIT_NODES
+    nodes; whatever it hasn't finished by then it hands back as new pieces: the
+    untried branch at each level of its stack, and the node it was at. That is
+    work stealing from the shallow end, where the big subtrees are, and it
+    keeps every worker busy however lopsided the tree. The first piece runs
+    here, so a search small enough to finish in it never starts a process.
+
+    Solutions found are summed across pieces; the moment there are two, or
+    time runs out, every worker is told to stop and the rest are cancelled.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    import multiprocessing
+
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    board = mesh if isinstance(mesh, SolverBoard) else SolverBoard(mesh)
+    board.reset()
+    board.apply_clues(clues, num_clues)
+
+    (found, pieces, out_of_time) = search_piece(board, [], deadline)
+    if out_of_time:
+        return False
+    if found > 1 or not pieces:
+        return found == 1
+
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(workers, initializer=_start_worker,
+                             initargs=(board, stop)) as pool:
+        def submit(piece):
+            secs = None if deadline is None else deadline - time.monotonic()
+            return pool.submit(_search_piece_in_worker, piece, secs)
+
+        pending = {submit(piece) for piece in pieces}
+        while pending and found < 2 and not out_of_time:
+            secs = None if deadline is None else max(0.0, deadline - time.monotonic())
+            (done, pending) = wait(pending, timeout=secs, return_when=FIRST_COMPLETED)
+            if not done:
+                out_of_time = True
+            for future in done:
+                (more, pieces, timed_out) = future.result()
+                found += more
+                out_of_time = out_of_time or timed_out
+                pending.update(submit(piece) for piece in pieces)
+        stop.set()
+        for future in pending:
+            future.cancel()
+    return found == 1 and not out_of_time
+
+
+def search_piece(board, decisions, deadline, stop=None, node_limit=None):
+    """Search the subtree below `decisions`, a list of (edge, state) from the
+    root, on a board with the clues applied. Returns (solutions found, capped
+    at 2; the pieces left unsearched; whether time ran out).
+
+    Stops after node_limit nodes (default SPLIT_NODES) and hands back the rest;
+    or when `stop`, a multiprocessing.Event, is set, handing back nothing.
+    """
+    node_limit = SPLIT_NODES if node_limit is None else node_limit
+    board.reset()
+    for (e, state) in decisions:
+        board.assign(e, state)
+    path = list(decisions)
+    # One (mark, edge) per branching level whose second value is untried.
+    stack = []
+    found = 0
+    nodes = 0
+    while True:
+        nodes += 1
+        if deadline is not None and time.monotonic() > deadline:
+            return (found, [], True)
+        if stop is not None and nodes % 64 == 0 and stop.is_set():
+            return (found, [], False)
+        if nodes > node_limit:
+            # Hand back the node we're at, and each untried branch above it.
+            pieces = [path[:len(decisions) + depth] + [(e, RULED_OUT)]
+                      for (depth, (_mark, e)) in enumerate(stack) if e is not None]
+            return (found, pieces + [list(path)], False)
+
+        dead = not board.propagate_constraints()
+        if not dead and board.is_complete_solution():
+            if board.is_valid_loop():
+                found += 1
+                if found > 1:
+                    return (found, [], False)
+            dead = True
+        if not dead:
+            e = board.select_edge_for_branching()
+            if e is None:
+                dead = True
+        if not dead:
+            stack.append((board.checkpoint(), e))
+            board.assign(e, FILLED)
+            path.append((e, FILLED))
+            continue
+
+        # Back up to the deepest level with a branch untried, and take it.
+        while stack and stack[-1][1] is None:
+            stack.pop()
+            path.pop()
+        if not stack:
+            return (found, [], False)
+        (mark, e) = stack[-1]
+        stack[-1] = (mark, None)
+        board.rollback(mark)
+        board.assign(e, RULED_OUT)
+        path[-1] = (e, RULED_OUT)
+
+
+# A worker process's board and stop signal, set once when the worker starts,
+# so that each piece sends only its decisions.
+_worker_board = None
+_worker_stop = None
+
+
+def _start_worker(board, stop):
+    global _worker_board, _worker_stop
+    (_worker_board, _worker_stop) = (board, stop)
+
+
+def _search_piece_in_worker(decisions, secs):
+    deadline = None if secs is None else time.monotonic() + secs
+    return search_piece(_worker_board, decisions, deadline, _worker_stop)
+
+
+# How often solution_is_unique_portfolio looks up from the results queue to
+# check that its racers are still running.
+RACE_POLL_SECONDS = 0.1
+
+
+def solution_is_unique_portfolio(clues, num_clues, solution, mesh, dualG, time_budget=None,
+                                 strategies=None, report=None):
+    """solution_is_unique, raced: one process per branching strategy, each
+    running the whole search, and the first conclusive answer wins.
+
+    No one branching heuristic is best (see select_edge_for_branching), but
+    the instances that run into the time budget are mostly pathological for
+    a particular order of branching, not for every order. Racing several
+    orders spends the CPUs on diversity rather than on a longer budget.
+
+    An answer is conclusive if it is True, or False from a search that
+    finished -- two loops found -- rather than one that ran out of time. If
+    no strategy is conclusive by the deadline, the answer is False, as for
+    solution_is_unique; likewise if every racer reports, or dies, without a
+    conclusive answer. The losers are terminated.
+
+    Args:
+        strategies: Names from BRANCHING, 'restarts' for
+            solution_is_unique_restarts, or 'cdcl' for cdcl.py's clause
+            learning search; default all of them.
+        report: Called as report(strategy, answer, seconds) with the winner,
+            if there is one: how a caller finds out which strategy won.
+    """
+    import multiprocessing
+    import queue
+
+    strategies = list(BRANCHING) + ['restarts', 'cdcl'] if strategies is None else strategies
+    started = time.monotonic()
+    deadline = None if time_budget is None else started + time_budget
+    board = mesh if isinstance(mesh, SolverBoard) else SolverBoard(mesh)
+    results = multiprocessing.Queue()
+    racers = [multiprocessing.Process(target=_race, daemon=True,
+                                      args=(name, clues, num_clues, solution, board,
+                                            time_budget, results))
+              for name in strategies]
+    for racer in racers:
+        racer.start()
+    try:
+        # Polled rather than waited on, so that a racer which dies without
+        # reporting -- killed, say -- can't leave this waiting forever when there
+        # is no time budget to run out.
+        reported = 0
+        while reported < len(racers):
+            secs = RACE_POLL_SECONDS
+            if deadline is not None:
+                secs = min(secs, deadline - time.monotonic())
+                if secs <= 0:
+                    break
+            all_gone = not any(racer.is_alive() for racer in racers)
+            try:
+                (name, answer, conclusive) = results.get(timeout=secs)
+            except queue.Empty:
+                if all_gone:
+                    break   # Every racer has exited, and nothing more is coming.
+                continue
+            reported += 1
+            if conclusive:
+                if report is not None:
+                    report(name, answer, time.monotonic() - started)
+                return answer
+        return False
+    finally:
+        for racer in racers:
+            racer.terminate()
+        for racer in racers:
+            racer.join()
+
+
+def _race(name, clues, num_clues, solution, board, time_budget, results):
+    """One racer of solution_is_unique_portfolio: put (name, answer, whether
+    the answer is conclusive) on the `results` queue."""
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    try:
+        if name == 'cdcl':
+            from cdcl import solution_is_unique as search
+            answer = search(clues, num_clues, solution, board, None, time_budget)
+        elif name == 'restarts':
+            answer = solution_is_unique_restarts(clues, num_clues, solution, board, None,
+                                                 time_budget)
+        else:
+            answer = solution_is_unique(clues, num_clues, solution, board, None, time_budget,
+                                        branching=BRANCHING[name]())
+    except BaseException:
+        # Report an inconclusive answer, so the race needn't wait on this one,
+        # and still let the traceback out where someone will see it.
+        results.put((name, False, False))
+        raise
+    results.put((name, answer, answer or deadline is None or time.monotonic() < deadline))
+
+
+# Fixed points a SolverBoard's propagation memo keeps, least recently used
+# first out; 0 turns the memo off. On a 210-edge grid an entry is at most a
+# few kilobytes, so this bounds it at a few tens of megabytes.
+PROPAGATION_MEMO = 4096
+
+# Whether the board's propagate_with_lookahead skips suppositions whose outcome
+# it already knows and tries a deduction's neighbors first. Off, it is the plain
+# round of every unknown edge; for measuring what that saves.
+LOOKAHEAD_CACHE = True
+
+# Whether propagate_with_lookahead, when both of an edge's suppositions survive,
+# keeps what the two agree on. Off only to measure what that adds.
+COMMON_CONSEQUENCES = True
+
+# Whether the board's propagate_with_lookahead first runs every supposition at
+# once through the local rules, bit-sliced (SolverBoard.batch_probe), and keeps
+# what that settles before probing one supposition at a time.
+BATCH_PROBES = True
+
+# Nodes in the first dive of solution_is_unique_restarts; the Luby sequence
+# scales it for the dives after.
+RESTART_NODES = 100
+
+
+def luby(i):
+    """The i-th term (from 1) of the Luby sequence 1 1 2 1 1 2 4 1 1 2 ...,
+    the restart schedule that is within a log factor of optimal for any
+    run-time distribution."""
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+def solution_is_unique_restarts(clues, num_clues, solution, mesh, dualG, time_budget=None,
+                                seed=0, node_budget=None, stats=None):
+    """solution_is_unique, as a series of dives that each give up after a
+    node budget and restart with a different branching order. Same arguments
+    and answer, node_budget and stats counting the nodes of every dive; `seed`
+    seeds the orders.
+
+    A heavy-tailed search is usually one that made a bad early choice and is
+    paying for it in a huge subtree; a restart with the edges in another order
+    gets another chance at a good one. Dive i may visit RESTART_NODES *
+    luby(i) nodes. The first branches in mesh order, as solution_is_unique
+    does; each one after on the unknown edge nearest a random vertex, which
+    keeps the search local, as mesh order is, about a new centre.
+
+    Nothing a dive finishes is searched again. Every loop it finds is kept,
+    and counted once however often it turns up. And each subtree it has
+    finished -- the first branch at each level of its stack, when it gives
+    up -- is kept as a nogood: a set of decisions with every loop below them
+    found. A later dive prunes any position that contains one, and forces
+    the last decision's opposite when it contains all but that one, so a
+    nogood of one decision is a fact at the root. Since the budgets grow
+    without bound, a dive eventually finishes.
+    """
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    board = mesh if isinstance(mesh, SolverBoard) else SolverBoard(mesh)
+    board.reset()
+    board.apply_clues(clues, num_clues)
+    rng = random.Random(seed)
+    loops = set()
+    nogoods = []
+    rounds = board.rounds
+    spent = 0
+    for i in itertools.count(1):
+        order = None if i == 1 else _order_about(board, rng.randrange(len(board.vertex_edges)))
+        node_limit = RESTART_NODES * luby(i)
+        if node_budget is not None:
+            node_limit = min(node_limit, node_budget - spent)
+        (outcome, nodes) = _dive(board, order, nogoods, loops, node_limit, deadline)
+        spent += nodes
+        if outcome is None and node_budget is not None and spent >= node_budget:
+            outcome = False
+        if outcome is not None:
+            if stats is not None:
+                stats['nodes'] = spent
+                stats['rounds'] = board.rounds - rounds
+            return outcome and len(loops) == 1
+
+
+def _order_about(board, start):
+    """Every edge, nearest the vertex `start` first, by breadth first search."""
+    order = []
+    seen = {start}
+    frontier = [start]
+    placed = set()
+    while frontier:
+        reached = []
+        for v in frontier:
+            for e in board.vertex_edges[v]:
+                if e not in placed:
+                    placed.add(e)
+                    order.append(e)
+                for w in board.edge_vertices[e]:
+                    if w not in seen:
+                        seen.add(w)
+                        reached.append(w)
+        frontier = reached
+    return order
+
+
+def _dive(board, order, nogoods, loops, node_limit, deadline):
+    """One dive of solution_is_unique_restarts, branching on the first unknown
+    edge in `order` (or mesh order, if None). Adds what it finds to `loops`
+    and what it finishes to `nogoods`. Returns (outcome, nodes searched),
+    where the outcome is True if the search is over, having finished or found
+    two loops; False if time ran out; None to restart, after node_limit
+    nodes."""
+    board.reset()
+    path = []
+    # One (mark, edge) per branching level; edge None once its first branch,
+    # filled, is finished and the second is being searched.
+    stack = []
+    nodes = 0
+    while True:
+        if deadline is not None and time.monotonic() > deadline:
+            return (False, nodes)
+        if nodes >= node_limit:
+            for (depth, (_mark, e)) in enumerate(stack):
+                if e is None:
+                    nogoods.append(path[:depth] + [(path[depth][0], FILLED)])
+            return (None, nodes)
+        nodes += 1
+
+        dead = not _propagate_with_nogoods(board, nogoods)
+        if not dead and board.is_complete_solution():
+            if board.is_valid_loop():
+                loops.add(frozenset(e for (e, state) in enumerate(board.guesses)
+                                    if state == FILLED))
+                if len(loops) > 1:
+                    return (True, nodes)
+            dead = True
+        if not dead:
+            guesses = board.guesses
+            if order is None:
+                e = board.select_edge_for_branching()
+            else:
+                e = next((e for e in order if guesses[e] == UNKNOWN), None)
+            if e is None:
+                dead = True
+        if not dead:
+            stack.append((board.checkpoint(), e))
+            board.assign(e, FILLED)
+            path.append((e, FILLED))
+            continue
+
+        while stack and stack[-1][1] is None:
+            stack.pop()
+            path.pop()
+        if not stack:
+            return (True, nodes)
+        (mark, e) = stack[-1]
+        stack[-1] = (mark, None)
+        board.rollback(mark)
+        board.assign(e, RULED_OUT)
+        path[-1] = (e, RULED_OUT)
+
+
+def _propagate_with_nogoods(board, nogoods):
+    """propagate_constraints, with each nogood as a rule: False if the board
+    holds every decision of one; if all but one, with that one unknown, the
+    opposite of that one."""
+    guesses = board.guesses
+    while True:
+        if not board.propagate_constraints():
+            return False
+        forced = False
+        for nogood in nogoods:
+            unknown = None
+            for (e, state) in nogood:
+                if guesses[e] == state:
+                    continue
+                if guesses[e] != UNKNOWN or unknown is not None:
+                    break
+                unknown = (e, state)
+            else:
+                if unknown is None:
+                    return False
+                (e, state) = unknown
+                board.assign(e, 3 - state)
+                forced = True
+        if not forced:
+            return True
+
+
+def known_guesses(mesh, solution):
+    """Each edge's guess in a known solution, as {edge: 'filledIn' or
+    'ruledOut'}, keyed the way select_edge_for_branching names edges (so by
+    index on a SolverBoard). `solution` is the stored form: vertex keys in
+    order round the loop. None if it isn't a loop on this grid at all.
+    """
+    loop = {edge_id((solution[i], solution[(i + 1) % len(solution)]))
+            for i in range(len(solution))}
+    if isinstance(mesh, SolverBoard):
+        ekeys = enumerate(mesh.edge_keys)
+    else:
+        ekeys = ((ekey, ekey) for ekey in mesh.edges())
+    known = {key: 'filledIn' if edge_id(ekey) in loop else 'ruledOut'
+             for (key, ekey) in ekeys}
+    on_grid = sum(1 for guess in known.values() if guess == 'filledIn')
+    return known if len(solution) >= 3 and on_grid == len(loop) else None
+
+
+def fits_clues(mesh, clues, num_clues, known):
+    """Whether the position `known` (from known_guesses) is a single loop that
+    the rules find no fault with, given these clues. Leaves the edges as found.
+    """
+    saved = save_state(mesh)
+    for (ekey, guess) in known.items():
+        set_guess(mesh, ekey, guess)
+    fits = is_valid_loop(mesh) and propagate_constraints(mesh, clues, num_clues)
+    restore_state(mesh, saved)
+    return fits
+
+
+def matches(mesh, known):
+    """Whether every edge's guess is the one in `known`."""
+    if isinstance(mesh, SolverBoard):
+        return all(GUESS_NAMES[state] == known[e] for (e, state) in enumerate(mesh.guesses))
+    return all(mesh.edge_attribute(ekey, 'guess') == guess for (ekey, guess) in known.items())
+
+
 def apply_clues(clues, num_clues, mesh):
     """Apply the given clues to the mesh by setting face clue values.
 
     Remember that the 'clue' attribute, when present, is the same as
     the 'num_walls' attribute, but 'num_walls' is present on all faces,
-    whereas 'clue' is only present on faces with clues."""
+    whereas 'clue' is only present on faces with clues.
+
+    On a SolverBoard the clues go into the board's own `clues` list instead."""
+    if isinstance(mesh, SolverBoard):
+        mesh.apply_clues(clues, num_clues)
+        return
+
     # Initialize all faces with no clue.
     for fkey in mesh.faces():
         mesh.unset_face_attribute(fkey, 'clue')
@@ -124,10 +636,10 @@ def propagate_constraints(mesh, clues, num_clues):
     """Apply deterministic inference rules until no more progress can be made.
 
     Alternates apply_vertex_rules, apply_clue_rules, apply_pattern_rules,
-    apply_color_rules and apply_pair_rules in a fixed-point loop, cheapest
-    first: each family runs only once every cheaper one has stalled, and any
-    deduction sends us back to the cheap rules. Bails on the first contradiction
-    from any family.
+    apply_color_rules, apply_xor_rules, apply_loop_rules and apply_pair_rules
+    in a fixed-point loop, cheapest first: each family runs only once every
+    cheaper one has stalled, and any deduction sends us back to the cheap rules.
+    Bails on the first contradiction from any family.
 
     Each pass either changes at least one edge or returns. Since the
     set of edge states is finite and rules only refine 'unknown' edges
@@ -138,8 +650,14 @@ def propagate_constraints(mesh, clues, num_clues):
     in face attributes set earlier by apply_clues. They're kept in the
     signature for compatibility with the calling site.
 
+    Given a SolverBoard instead of a mesh, runs the board's copy of the same
+    loop.
+
     Returns False if a contradiction is detected, True otherwise.
     """
+    if isinstance(mesh, SolverBoard):
+        return mesh.propagate_constraints()
+
     while True:
         # The cheap, local rules first, run to their own fixed point.
         (ok, changed_v) = apply_vertex_rules(mesh)
@@ -158,13 +676,32 @@ def propagate_constraints(mesh, clues, num_clues):
         # which rebuilds a union-find over all the faces. Measured: running it
         # every round instead made uniqueness checks 25-40% slower, because it
         # rarely finds anything the local rules haven't already, and when it
-        # does the local rules usually take it from there.
+        # does the local rules usually take it from there. (SolverBoard keeps
+        # its coloring up to date as edges change instead, so it can afford to
+        # run coloring every round.)
         (ok, changed_col) = apply_color_rules(mesh)
         if not ok:
             return False
         if changed_col:
             continue  # Back to the cheap rules with the new facts.
 
+        # The parity equations: an elimination over the whole board, dearer
+        # than coloring, which on a closed solid they subsume.
+        if XOR_RULES:
+            (ok, changed_xor) = apply_xor_rules(mesh)
+            if not ok:
+                return False
+            if changed_xor:
+                continue
+
+        # The single-loop rule: another whole-board walk, about as dear as
+        # coloring, and after it for the same reason.
+        (ok, changed_loop) = apply_loop_rules(mesh)
+        if not ok:
+            return False
+        if changed_loop:
+            continue
+
         # Coloring has stalled too. Edge-pair reasoning is the most expensive
         # family (it builds two stores and then tests each constrained edge both
         # ways), so it goes last, for the same reason coloring goes after the
@@ -406,6 +943,243 @@ def apply_color_rules(mesh):
     return True, changed
 
 
+def apply_loop_rules(mesh):
+    """Apply the single-loop rule: the filled edges must end up as ONE loop.
+
+    The other families only ever look at one vertex or face, or at how faces and
+    edges relate, so none of them knows that a solution has exactly one loop --
+    is_valid_loop checks that, but only once every edge is decided. This is the
+    rule a player uses all the time: "filling that would close the loop early,
+    so it must be empty".
+
+    The filled edges form chains, each with two dangling ends (the vertex rule
+    stops anything branching). So:
+
+        a chain's two ends joined by an unknown edge -> rule it out, if there
+            are filled edges off the chain (closing it would leave them out of
+            the loop), or if the loop it would close misses a clue
+        a closed loop with filled edges off it -> contradiction
+        a closed loop that is all of the filled edges -> it is the solution,
+            so every other edge is ruled out (the clue rule then checks it)
+
+    Built from scratch each call, like apply_color_rules. Returns (ok, changed)
+    -- same convention as the other rule families.
+    """
+    adj = {}
+    for ekey in mesh.edges():
+        if mesh.edge_attribute(ekey, 'guess') == 'filledIn':
+            (u, v) = ekey
+            adj.setdefault(u, []).append(v)
+            adj.setdefault(v, []).append(u)
+    if not adj:
+        return (True, False)
+    if any(len(nbrs) > 2 for nbrs in adj.values()):
+        return (False, False)  # A branch; the vertex rule says as much.
+    total = sum(len(nbrs) for nbrs in adj.values()) // 2
+
+    changed = False
+    seen = set()
+    for start in adj:
+        if start in seen:
+            continue
+        # Walk the component, collecting its vertices and its dangling ends.
+        component = [start]
+        seen.add(start)
+        i = 0
+        while i < len(component):
+            for nbr in adj[component[i]]:
+                if nbr not in seen:
+                    seen.add(nbr)
+                    component.append(nbr)
+            i += 1
+        ends = [v for v in component if len(adj[v]) == 1]
+        num_edges = sum(len(adj[v]) for v in component) // 2
+
+        if not ends:
+            # A closed loop. Either it is everything, or it is a dead end.
+            if num_edges < total:
+                return (False, changed)
+            unknown = [ekey for ekey in mesh.edges()
+                       if mesh.edge_attribute(ekey, 'guess') == 'unknown']
+            (ok, did) = _set_edges(mesh, unknown, 'ruledOut')
+            return (ok, changed or did)
+
+        (p, q) = ends
+        if not mesh.has_edge((p, q)):
+            continue
+        if mesh.edge_attribute((p, q), 'guess') != 'unknown':
+            continue
+        if num_edges < total or not closing_meets_clues(mesh, (p, q)):
+            mesh.edge_attribute((p, q), 'guess', 'ruledOut')
+            changed = True
+
+    return (True, changed)
+
+
+def closing_meets_clues(mesh, ekey):
+    """Would filling this edge, and nothing else, satisfy every clue? Asked of
+    the edge that would close the only chain into a loop, which would then be
+    the whole solution."""
+    closing_faces = set(mesh.edge_faces(ekey))
+    for fkey in mesh.faces():
+        clue = mesh.face_attribute(fkey, 'clue')
+        if clue is None:
+            continue
+        filled = sum(1 for e in mesh.face_halfedges(fkey)
+                     if mesh.edge_attribute(e, 'guess') == 'filledIn')
+        if filled + (fkey in closing_faces) != clue:
+            return False
+    return True
+
+
+# --- Parity as linear algebra ---
+#
+# Two parity facts hold in every solution: each vertex has an even number of
+# filled edges (0 or 2), and each clued face has as many as its clue, so the
+# clue's parity. Each is a linear equation over GF(2), with the edges as
+# variables: the XOR of some edges equals 0 or 1. The coloring and the edge
+# pairs capture such facts two at a time; a system of them, kept in reduced
+# echelon form, captures all their sums too -- "the edges leaving this region
+# number an even count" for every region at once -- and answers which single
+# edges and which pairs of edges it pins down.
+#
+# A row is an int: bit e for each unknown edge in the equation, and bit
+# `parity_bit` (one past the last edge) for its right-hand side. Its lowest bit
+# is its pivot, which no other row has. Determined edges are substituted out,
+# so the rows only ever mention unknown edges.
+
+# Whether propagate_constraints runs apply_xor_rules; off only to measure what
+# it saves (see bench_solver --xor).
+XOR_RULES = True
+
+# Whether the pair rules also take every pair of edges the equations relate
+# (xor_relations), as well as the units apply_xor_rules sets; off only to
+# measure what that adds.
+XOR_PAIRS = True
+
+
+def xor_insert(rows, row, parity_bit):
+    """Add the equation `row` to `rows`, a reduced basis, keeping it reduced.
+    False if it contradicts them (reduces to 0 = 1)."""
+    for other in rows:
+        if row & other & -other:
+            row ^= other
+    if row == 0:
+        return True
+    if row == parity_bit:
+        return False
+    pivot = row & -row
+    for (i, other) in enumerate(rows):
+        if other & pivot:
+            rows[i] = other ^ row
+    rows.append(row)
+    return True
+
+
+def xor_assign(rows, e, filled, parity_bit):
+    """Substitute a newly determined edge into `rows`. False on a contradiction."""
+    bit = 1 << e
+    flip = bit | (parity_bit if filled else 0)
+    pivot_row = None
+    for (i, row) in enumerate(rows):
+        if row & bit:
+            if row & -row == bit:
+                pivot_row = i
+            rows[i] = row ^ flip
+    if pivot_row is None:
+        return True
+    # That row lost its pivot, so it goes back in under a new one.
+    return xor_insert(rows, rows.pop(pivot_row), parity_bit)
+
+
+def xor_units(rows, parity_bit):
+    """[(edge, filled)] for each edge the system pins down on its own. In a
+    reduced basis, those are exactly the rows of a single edge."""
+    units = []
+    for row in rows:
+        edges = row & ~parity_bit
+        if edges & (edges - 1) == 0:
+            units.append((edges.bit_length() - 1, bool(row & parity_bit)))
+    return units
+
+
+def xor_relations(rows, parity_bit):
+    """{(e1, e2, kind)}, e1 < e2 and kind one of RELATION_KINDS, from which
+    every relation between two edges that the system pins down follows. Two
+    pivots are related just when their rows agree but for the pivots (and
+    perhaps the parity); each such group is given as each edge's relation to
+    the first, since a ParityRelation closes the rest, and all its pairs would
+    be quadratic in a group that can run to dozens of edges."""
+    by_rest = {}
+    for row in rows:
+        pivot = row & -row
+        by_rest.setdefault(row & ~parity_bit & ~pivot, []).append(row)
+    relations = set()
+    for (rest, group) in by_rest.items():
+        if not rest:
+            continue  # Units, not relations.
+        if rest & (rest - 1) == 0:
+            # A row of two edges: pivot XOR rest.
+            group = group + [rest]
+        for (row1, row2) in zip(group[:1] * (len(group) - 1), group[1:]):
+            (e1, e2) = sorted(((row1 & -row1).bit_length() - 1, (row2 & -row2).bit_length() - 1))
+            odd = bool((row1 ^ row2) & parity_bit)
+            relations.add((e1, e2, RELATION_KINDS[0] if odd else RELATION_KINDS[1]))
+    return relations
+
+
+def xor_equations(mesh):
+    """The vertex and clue parity equations over the mesh's unknown edges, with
+    the determined ones substituted out, reduced: (rows, ekeys, parity_bit),
+    where bit e of a row is edge ekeys[e]. None if they contradict each other."""
+    ekeys = list(mesh.edges())
+    index = {edge_id(ekey): e for (e, ekey) in enumerate(ekeys)}
+    parity_bit = 1 << len(ekeys)
+
+    def equation(edge_keys, odd):
+        row = parity_bit if odd else 0
+        for ekey in edge_keys:
+            guess = mesh.edge_attribute(ekey, 'guess')
+            if guess == 'unknown':
+                row ^= 1 << index[edge_id(ekey)]
+            elif guess == 'filledIn':
+                row ^= parity_bit
+        return row
+
+    rows = []
+    for vkey in mesh.vertices():
+        row = equation([(vkey, nbr) for nbr in mesh.vertex_neighbors(vkey)], False)
+        if not xor_insert(rows, row, parity_bit):
+            return None
+    for fkey in mesh.faces():
+        clue = mesh.face_attribute(fkey, 'clue')
+        if clue is not None and not xor_insert(rows, equation(mesh.face_halfedges(fkey), clue % 2),
+                                               parity_bit):
+            return None
+    return (rows, ekeys, parity_bit)
+
+
+def apply_xor_rules(mesh):
+    """Apply the parity equations, all at once (one pass).
+
+    Builds the vertex and clue parity equations (xor_equations) and sets every
+    edge they pin down. Subsumes nothing and is subsumed by nothing: a vertex
+    equation alone is weaker than the vertex rule, but sums of many reach edges
+    no local rule can. The pairs of edges they pin down go to the pair rules
+    instead: see apply_pair_rules.
+
+    Returns (ok, changed) -- same convention as the other rule families.
+    """
+    system = xor_equations(mesh)
+    if system is None:
+        return False, False
+    (rows, ekeys, parity_bit) = system
+    units = xor_units(rows, parity_bit)
+    for (e, filled) in units:
+        mesh.edge_attribute(ekeys[e], 'guess', 'filledIn' if filled else 'ruledOut')
+    return True, bool(units)
+
+
 class EdgePairing(ParityRelation):
     """Which pairs of edges must agree, and which must disagree.
 
@@ -841,6 +1615,10 @@ def pair_forced_by(pairing, clauses, edge, guess):
     must take the other state.
     """
     known = {}
+    # Edges whose parity group is already queued: the rest of the group would
+    # only queue the same states again, so each group is walked once, not once
+    # per member. (The parity equations make some groups large.)
+    walked = set()
     queue = [(edge_id(edge), guess)]
     while queue:
         (current, current_guess) = queue.pop()
@@ -850,7 +1628,10 @@ def pair_forced_by(pairing, clauses, edge, guess):
             continue
         known[current] = current_guess
         # Everything tied to it by parity, then everything its state implies.
-        queue.extend(pairing.forced_by(current, current_guess).items())
+        if current not in walked:
+            forced = pairing.forced_by(current, current_guess)
+            walked.update(forced)
+            queue.extend(forced.items())
         queue.extend(clauses.implications(current, current_guess))
     return known
 
@@ -858,7 +1639,8 @@ def pair_forced_by(pairing, clauses, edge, guess):
 def apply_pair_rules(mesh):
     """Apply edge-pair reasoning: build the pair constraints, then use them.
 
-    Four steps. First the emitters read pairs off the vertex and clue arithmetic.
+    Four steps. First the emitters read pairs off the vertex and clue arithmetic,
+    and xor_relations off the parity equations.
     Then any pair that collected both an at-least-one and an at-most-one is
     promoted to "exactly one" -- the seam where two rule families feed each other,
     since the two clauses often come from different faces, or from a face and a
@@ -885,6 +1667,8 @@ def apply_pair_rules(mesh):
     The stores are built from scratch on every call and thrown away, exactly as
     apply_color_rules does with its FaceColoring, so save_state stays a plain
     list of edge guesses and backtracking has no constraint database to unwind.
+    (SolverBoard, which has a trail to unwind them by, keeps its stores between
+    calls instead.)
 
     Returns (ok, changed) -- same convention as the other rule families.
     """
@@ -895,6 +1679,16 @@ def apply_pair_rules(mesh):
         return (False, False)
     if not emit_face_pairs(mesh, pairing, clauses):
         return (False, False)
+    # The parity equations tie pairs together that no one vertex or face does,
+    # through their sums; apply_xor_rules has already set their units.
+    if XOR_RULES and XOR_PAIRS:
+        system = xor_equations(mesh)
+        if system is None:
+            return (False, False)
+        (rows, ekeys, parity_bit) = system
+        for (e1, e2, kind) in sorted(xor_relations(rows, parity_bit)):
+            if not pairing.relate(ekeys[e1], ekeys[e2], kind == 'exactly one'):
+                return (False, False)
 
     for (edge1, edge2) in clauses.exactly_one_pairs():
         if not pairing.exactly_one(edge1, edge2):
@@ -914,10 +1708,19 @@ def apply_pair_rules(mesh):
     candidates = set(pairing.parent) | {edge for (edge, _guess) in clauses.implies}
 
     changed = False
+    # Supposing one edge of a parity group supposes every other, each in its
+    # tied state, and the walk from any of them is the same walk: so one edge
+    # per group is tested.
+    tried = set()
     for ekey in sorted(candidates):
         # Earlier deductions in this same scan may have settled it already.
         if mesh.edge_attribute(ekey, 'guess') != 'unknown':
             continue
+        if ekey in pairing.parent:
+            (root, _opposite) = pairing.representative(ekey)
+            if root in tried:
+                continue
+            tried.add(root)
         impossible = [guess for guess in ('filledIn', 'ruledOut')
                       if pair_forced_by(pairing, clauses, ekey, guess) is None]
         if len(impossible) == 2:
@@ -1174,8 +1977,16 @@ def propagate_with_lookahead(mesh, clues, num_clues, depth=1):
     suppositions, which is where it starts to feel like guessing rather than
     solving. So depth doubles as our difficulty dial.
 
+    And when both suppositions survive, whatever they agree on holds either
+    way. An edge both leave in the same state is set so; an edge that follows
+    this one in both (or goes against it in both) is tied to it, so that
+    whichever of the two is settled first settles the other. It is the same
+    case analysis, at no extra cost: the player who notices that "either way,
+    this edge is out". COMMON_CONSEQUENCES = False turns it off.
+
     Everything here is sound by construction: it only ever concludes the
-    negation of a supposition that provably breaks a rule. That makes it a
+    negation of a supposition that provably breaks a rule, or what follows
+    from both of an edge's states alike. That makes it a
     useful oracle for checking hand-written patterns (set up the pattern's
     premises, ask what lookahead forces, compare) -- but it does not replace
     them. Logically it subsumes apply_pattern_rules, yet a player recognises a
@@ -1184,43 +1995,93 @@ def propagate_with_lookahead(mesh, clues, num_clues, depth=1):
     reasoning; this is the deliberate case analysis after a stall.
 
     Returns False if the position is contradictory, True otherwise. Edge
-    states are left at whatever was deduced.
+    states are left at whatever was deduced -- in the board's `guesses`, if
+    given a SolverBoard rather than a mesh.
     """
+    if isinstance(mesh, SolverBoard):
+        return mesh.propagate_with_lookahead(depth)
+
     if not propagate_constraints(mesh, clues, num_clues):
         return False
     if depth <= 0:
         return True
 
     # Keep sweeping: each forced edge may unlock others.
+    ekeys = list(mesh.edges())
+    # Edges the suppositions showed to move with another, both or neither or
+    # exactly one of them: once either is known, so is the other.
+    tied = EdgePairing()
     progress = True
     while progress:
         progress = False
-        for ekey in list(mesh.edges()):
+        for ekey in ekeys:
             if mesh.edge_attribute(ekey, 'guess') != 'unknown':
                 continue
 
             forced = None
+            outcomes = []
+            saved = save_state(mesh)
             for (supposition, opposite) in (('filledIn', 'ruledOut'),
                                             ('ruledOut', 'filledIn')):
-                saved = save_state(mesh)
                 mesh.edge_attribute(ekey, 'guess', supposition)
                 survived = propagate_with_lookahead(mesh, clues, num_clues, depth - 1)
+                outcomes.append(mesh.edges_attribute('guess'))
                 restore_state(mesh, saved)
                 if not survived:
                     forced = opposite
                     break
 
             if forced is not None:
-                mesh.edge_attribute(ekey, 'guess', forced)
-                # The new fact may cascade, and may even expose a
+                deduced = {ekey: forced}
+            elif COMMON_CONSEQUENCES:
+                # Both survive, so whatever both conclude holds either way.
+                deduced = {}
+                for (other, was, if_filled, if_ruled_out) in zip(ekeys, saved, *outcomes):
+                    if other == ekey or was != 'unknown' or 'unknown' in (if_filled,
+                                                                          if_ruled_out):
+                        continue
+                    if if_filled == if_ruled_out:
+                        deduced[other] = if_filled
+                    elif not tied.relate(ekey, other, if_filled == 'ruledOut'):
+                        return False
+            else:
+                deduced = {}
+
+            if deduced:
+                for (other, guess) in deduced.items():
+                    mesh.edge_attribute(other, 'guess', guess)
+                # The new facts may cascade, and may even expose a
                 # contradiction, in which case the whole position is dead.
-                if not propagate_constraints(mesh, clues, num_clues):
+                if not settle_tied(mesh, clues, num_clues, tied):
                     return False
                 progress = True
 
     return True
 
 
+def settle_tied(mesh, clues, num_clues, tied):
+    """propagate_constraints, and then set every unknown edge `tied`, an
+    EdgePairing, relates to a known one, over again until neither changes
+    anything. False on a contradiction."""
+    while True:
+        if not propagate_constraints(mesh, clues, num_clues):
+            return False
+        changed = False
+        for ekey in list(tied.parent):
+            guess = mesh.edge_attribute(ekey, 'guess')
+            if guess == 'unknown':
+                continue
+            for (other, guess2) in tied.forced_by(ekey, guess).items():
+                current = mesh.edge_attribute(other, 'guess')
+                if current == 'unknown':
+                    mesh.edge_attribute(other, 'guess', guess2)
+                    changed = True
+                elif current != guess2:
+                    return False
+        if not changed:
+            return True
+
+
 def solvable_by_deduction(mesh, clues, num_clues, depth=1):
     """Can this clue set be solved by reasoning alone, with no guessing?
 
@@ -1232,9 +2093,11 @@ def solvable_by_deduction(mesh, clues, num_clues, depth=1):
     determined entirely by sound rules admits no other solution, so anything
     solvable by deduction is automatically unique. The converse fails badly --
     most minimal-clue puzzles are unique but need search.
+
+    Takes a mesh or a SolverBoard, like solution_is_unique; the board is the
+    one to use when asking many times over, as cut_clues does.
     """
-    for ekey in mesh.edges():
-        mesh.edge_attribute(ekey, 'guess', 'unknown')
+    reset_guesses(mesh)
     apply_clues(clues, num_clues, mesh)
 
     if not propagate_with_lookahead(mesh, clues, num_clues, depth):
@@ -1353,6 +2216,8 @@ def apply_clue_rules(mesh):
 
 def is_complete_solution(mesh):
     """Check if all edges have been determined (no 'unknown' edges remain)."""
+    if isinstance(mesh, SolverBoard):
+        return mesh.is_complete_solution()
     for ekey in mesh.edges():
         if mesh.edge_attribute(ekey, 'guess') == 'unknown':
             return False
@@ -1368,6 +2233,9 @@ def is_valid_loop(mesh):
       (other vertices have 0)
     - The filled edges form a single connected component (one cycle, not several)
     """
+    if isinstance(mesh, SolverBoard):
+        return mesh.is_valid_loop()
+
     # We can do this with less code using networkx, e.g. using nx.is_connected():
     #   G = nx.Graph()  # build from filled edges
     #   if G.number_of_edges() == 0: return False
@@ -1386,6 +2254,12 @@ def is_valid_loop(mesh):
             adj.setdefault(v1, []).append(v2)
             adj.setdefault(v2, []).append(v1)
 
+    return is_one_cycle(adj)
+
+
+def is_one_cycle(adj):
+    """The second half of is_valid_loop, shared with SolverBoard: given each
+    vertex's filled neighbours, is that one cycle through all of them?"""
     # No filled edges at all -> not a loop.
     if not adj:
         return False
@@ -1445,22 +2319,2100 @@ def select_edge_for_branching(mesh):
     instances, which dominate total time. Those are bounded instead by
     solution_is_unique's time_budget. So we keep the cheap naive pick.
 
-    Returns an edge key or None if no unknown edges exist.
+    Returns an edge key or None if no unknown edges exist. On a SolverBoard
+    the "key" is the edge's index, which is what set_guess takes there.
     """
+    if isinstance(mesh, SolverBoard):
+        return mesh.select_edge_for_branching()
     for ekey in mesh.edges():
         if mesh.edge_attribute(ekey, 'guess') == 'unknown':
             return ekey
     return None
 
 
+def weighted_branching(board):
+    """The weighted score select_edge_for_branching's note describes: the
+    unknown edge with the most pull from what is already settled around it.
+
+    Per endpoint, +20 if a filled edge ends there with nothing to continue
+    it yet, and +1 per determined edge; per clued face beside it, +6 if the
+    clue is one short of the face's sides, +4 for a 0, else +1. Ties go to
+    the first edge. Takes a SolverBoard.
+    """
+    guesses = board.guesses
+    best = None
+    best_score = -1
+    for (e, state) in enumerate(guesses):
+        if state != UNKNOWN:
+            continue
+        score = 0
+        for v in board.edge_vertices[e]:
+            determined = [guesses[x] for x in board.vertex_edges[v] if guesses[x] != UNKNOWN]
+            if determined.count(FILLED) == 1:
+                score += 20
+            score += len(determined)
+        for f in board.edge_clued_faces[e]:
+            clue = board.clues[f]
+            score += 6 if clue == board.face_sides[f] - 1 else 4 if clue == 0 else 1
+        if score > best_score:
+            (best, best_score) = (e, score)
+    return best
+
+
+def chain_branching(board):
+    """Chain following: an unknown edge at the end of an open chain, so that
+    the search grows the loop it has; the first unknown edge if there is no
+    chain. Takes a SolverBoard, after propagate_constraints."""
+    guesses = board.guesses
+    if board.open_ends:
+        for e in board.vertex_edges[min(board.open_ends)]:
+            if guesses[e] == UNKNOWN:
+                return e
+    return board.select_edge_for_branching()
+
+
+def random_branching(seed=None):
+    """A branching function that picks an unknown edge at random, from a
+    generator seeded with `seed`. Takes a SolverBoard."""
+    rng = random.Random(seed)
+
+    def pick(board):
+        unknown = [e for (e, state) in enumerate(board.guesses) if state == UNKNOWN]
+        return rng.choice(unknown) if unknown else None
+    return pick
+
+
+# The branching strategies solution_is_unique_portfolio races, by name. Each
+# makes a function of a SolverBoard, for solution_is_unique's `branching`:
+# made afresh for each search, so that 'random' starts every one from the same
+# seed, however many searches the process has run before.
+BRANCHING = {
+    'naive': lambda: select_edge_for_branching,
+    'weighted': lambda: weighted_branching,
+    'chain': lambda: chain_branching,
+    'random': lambda: random_branching(0),
+}
+
+
 def save_state(mesh):
     """Save the current state of all edge guesses.
-    It's a list of all edge guesses, in the same order as the mesh edges."""
+    It's a list of all edge guesses, in the same order as the mesh edges.
+
+    On a SolverBoard it is a checkpoint on the board's trail instead: O(1) to
+    take, and restore_state then undoes only what changed since. See
+    SolverBoard.checkpoint."""
+    if isinstance(mesh, SolverBoard):
+        return mesh.save_state()
     return mesh.edges_attribute('guess')
 
 
 def restore_state(mesh, state):
     """Restore edge guesses to a saved state.
-    state is a list of all edge guesses, in the same order as the mesh edges."""
+    state is a list of all edge guesses, in the same order as the mesh edges
+    -- or, on a SolverBoard, a checkpoint to roll the trail back to."""
+    if isinstance(mesh, SolverBoard):
+        mesh.restore_state(state)
+        return
     for ekey, guess in zip(mesh.edges(), state):
         mesh.edge_attribute(ekey, 'guess', guess)
+
+
+def reset_guesses(mesh):
+    """Every edge back to 'unknown', on a mesh or a SolverBoard."""
+    if isinstance(mesh, SolverBoard):
+        mesh.reset()
+        return
+    for ekey in mesh.edges():
+        mesh.edge_attribute(ekey, 'guess', 'unknown')
+
+
+def unknown_edges(mesh):
+    """The edges still 'unknown', as edge_id keys, on a mesh or a SolverBoard."""
+    if isinstance(mesh, SolverBoard):
+        return {edge_id(mesh.edge_keys[e]) for (e, state) in enumerate(mesh.guesses)
+                if state == UNKNOWN}
+    return {edge_id(ekey) for ekey in mesh.edges()
+            if mesh.edge_attribute(ekey, 'guess') == 'unknown'}
+
+
+def set_guess(mesh, ekey, guess):
+    """Set one edge's 'guess', on a mesh or a SolverBoard. For a board, `ekey`
+    is the edge's index (what select_edge_for_branching returns there), while
+    `guess` is still the state's name."""
+    if isinstance(mesh, SolverBoard):
+        mesh.assign(ekey, BOARD_STATES[guess])
+    else:
+        mesh.edge_attribute(ekey, 'guess', guess)
+
+
+# --- The array-backed engine ---
+#
+# Everything above reads and writes edge states through COMPAS attributes: one
+# dict lookup on a string, behind COMPAS's attribute machinery, per edge per rule
+# per round. That states the rules clearly, and it is how the tests exercise
+# them, but clue minimization makes millions of those lookups. A SolverBoard holds
+# the same position as integer-indexed arrays and runs the same rules over them,
+# in the same order, so the two engines reach the same conclusions by the same
+# route. The public entry points -- solution_is_unique, solvable_by_deduction,
+# propagate_with_lookahead, propagate_constraints -- take either; the rule
+# functions above that take a mesh are the reference the board is tested against.
+
+# Edge states on a SolverBoard. Small ints, so a whole position fits in a
+# bytearray, and a determined state's opposite is 3 - state.
+UNKNOWN = 0
+FILLED = 1
+RULED_OUT = 2
+
+# The mesh engine's name for each board state, indexed by state, and back.
+GUESS_NAMES = ('unknown', 'filledIn', 'ruledOut')
+BOARD_STATES = {name: state for (state, name) in enumerate(GUESS_NAMES)}
+
+# The pair rules reason about LITERALS, an edge in a determined state. On the
+# board a literal is one int, 2 * edge + 1 for filled and 2 * edge for ruled
+# out, so its edge is literal >> 1 and its negation is literal ^ 1.
+
+
+# The two kinds of pair fact a SolverBoard holds in its pairing, rather than
+# among its clauses.
+RELATION_KINDS = ('exactly one', 'both or neither')
+
+
+def literal(edge, state):
+    """The literal saying edge `edge` is in `state` (FILLED or RULED_OUT)."""
+    return (edge << 1) | (state == FILLED)
+
+
+class TrailedColoring:
+    """A FaceColoring over face indices that can be rolled back: the board's,
+    kept up to date as edges are decided instead of rebuilt from every edge.
+
+    Path compression would rewrite parents all over the forest, and undoing
+    that would cost as much as it saved. So there is none: unions attach the
+    smaller group under the larger, which keeps every tree O(log F) deep
+    without it, and a union changes exactly one parent -- the attached root's.
+    Undoing one is setting that parent back and trimming the larger group's
+    member list to its old length.
+
+    Each union is logged with the trail position of the edge that caused it,
+    so that rolling the board back to a mark undoes exactly the unions made at
+    or after it.
+    """
+
+    def __init__(self, num_faces):
+        self.parent = list(range(num_faces))
+        # 1 where a face is the OPPOSITE color of its parent.
+        self.flipped = bytearray(num_faces)
+        # root -> every face in its group. A non-root keeps the list it had as
+        # a root, which is still exactly its own group's.
+        self.members = [[f] for f in range(num_faces)]
+        # One (cause, attached root, new parent) per union, in order.
+        self.log = []
+
+    def find(self, f):
+        """(root, opposite) for a face, as ParityRelation._find, minus the
+        compression."""
+        parent = self.parent
+        flipped = self.flipped
+        opposite = 0
+        while parent[f] != f:
+            opposite ^= flipped[f]
+            f = parent[f]
+        return (f, opposite)
+
+    def relate(self, face1, face2, opposite, cause):
+        """Record that the faces are opposite colors, or the same. Returns the
+        root just attached under another, None if they were already related,
+        or False on a contradiction."""
+        (root1, opposite1) = self.find(face1)
+        (root2, opposite2) = self.find(face2)
+        if root1 == root2:
+            return None if (opposite1 ^ opposite2) == opposite else False
+        if len(self.members[root1]) < len(self.members[root2]):
+            (root1, root2) = (root2, root1)
+        self.parent[root2] = root1
+        self.flipped[root2] = opposite1 ^ opposite ^ opposite2
+        self.members[root1].extend(self.members[root2])
+        self.log.append((cause, root2, root1))
+        return root2
+
+    def undo(self, mark):
+        """Undo every union caused at trail position `mark` or later."""
+        log = self.log
+        while log and log[-1][0] >= mark:
+            (_cause, root2, root1) = log.pop()
+            self.parent[root2] = root2
+            self.flipped[root2] = 0
+            del self.members[root1][-len(self.members[root2]):]
+
+    def clear(self):
+        """Every face back in a group of its own."""
+        self.undo(0)
+
+
+class SolverBoard:
+    """A grid's topology as integer-indexed arrays, and one position on it: the
+    array-backed engine.
+
+    Edges, vertices and faces are numbered from 0 in the mesh's own iteration
+    order, and every per-vertex and per-face list keeps the mesh's order too. So
+    the board visits things in the order the mesh engine does, and its rules fire
+    in the same sequence -- which is what lets the tests hold the two engines to
+    identical results, not merely equivalent ones. An edge's number is its
+    position in mesh.edges(); `edge_keys` maps back, and edge() looks one up.
+
+    The topology is read from the mesh once, here. The mesh isn't kept, so
+    nothing the board does can change it.
+
+        edge_vertices[e]   the edge's two vertices
+        edge_faces[e]      its two faces, -1 for a side with none (an open rim)
+        vertex_edges[v]    the edges at a vertex, in vertex_neighbors order
+        vertex_faces[v]    the faces around a vertex
+        face_edges[f]      a face's edges, in face_halfedges order
+        face_corners[f]    one (vertex, own, others, away) per vertex of the face:
+                           the face's edges there, the vertex's other edges, and
+                           the face's edges not touching that vertex -- what
+                           face_edges_at_vertex would otherwise recompute for
+                           every pattern rule, every round
+        corner_at          the same, by (face, vertex)
+        edge_far_edges[e]  for each face of the edge, that face's edges touching
+                           neither end of it (Rule D's "away" edges)
+        face_borders[f]    (edge, face across it) for each of a face's edges
+                           that has a face on both sides
+
+    The position is `guesses`, a bytearray of UNKNOWN, FILLED and RULED_OUT, and
+    `clues`, one clue or None per face. Methods take and return edge indices.
+
+    Every change to `guesses` is recorded on `trail`, the undo stack, so that
+    backtracking costs only what changed rather than a copy of every edge. See
+    checkpoint and rollback. The face coloring lives as long as the board does,
+    in `coloring`, and is rolled back with it.
+
+    propagate_constraints remembers the fixed points it reaches, in `memo`, an
+    LRU cache of at most `memo_size` entries keyed by the clues and a Zobrist
+    hash of the position; `memo_hits` and `memo_misses` say how it is doing.
+    """
+
+    def __init__(self, mesh):
+        self.edge_keys = list(mesh.edges())
+        self.edge_index = {edge_id(ekey): e for (e, ekey) in enumerate(self.edge_keys)}
+        self.vertex_keys = list(mesh.vertices())
+        vertex_index = {vkey: v for (v, vkey) in enumerate(self.vertex_keys)}
+        self.face_keys = list(mesh.faces())
+        self.face_index = {fkey: f for (f, fkey) in enumerate(self.face_keys)}
+
+        self.edge_vertices = [(vertex_index[u], vertex_index[v])
+                              for (u, v) in self.edge_keys]
+        self.edge_faces = [tuple(-1 if fkey is None else self.face_index[fkey]
+                                 for fkey in mesh.edge_faces(ekey))
+                           for ekey in self.edge_keys]
+        self.vertex_edges = [tuple(self.edge((vkey, nbr))
+                                   for nbr in mesh.vertex_neighbors(vkey))
+                             for vkey in self.vertex_keys]
+        self.vertex_faces = [tuple(self.face_index[fkey]
+                                   for fkey in mesh.vertex_faces(vkey)
+                                   if fkey is not None)
+                             for vkey in self.vertex_keys]
+        self.face_edges = [tuple(self.edge(ekey) for ekey in mesh.face_halfedges(fkey))
+                           for fkey in self.face_keys]
+        self.face_sides = [len(mesh.face_vertices(fkey)) for fkey in self.face_keys]
+        self.face_neighbors = [frozenset(self.face_index[nbr]
+                                         for nbr in mesh.face_neighbors(fkey))
+                               for fkey in self.face_keys]
+
+        self.face_corners = []
+        self.corner_at = {}
+        for (f, fkey) in enumerate(self.face_keys):
+            corners = []
+            for vkey in mesh.face_vertices(fkey):
+                v = vertex_index[vkey]
+                own = tuple(e for e in self.vertex_edges[v] if f in self.edge_faces[e])
+                others = tuple(e for e in self.vertex_edges[v] if f not in self.edge_faces[e])
+                away = tuple(e for e in self.face_edges[f] if v not in self.edge_vertices[e])
+                corners.append((v, own, others, away))
+                self.corner_at[(f, v)] = (own, others, away)
+            self.face_corners.append(tuple(corners))
+
+        self.edge_far_edges = []
+        for (e, (p, q)) in enumerate(self.edge_vertices):
+            self.edge_far_edges.append(tuple(
+                tuple(other for other in self.face_edges[f]
+                      if p not in self.edge_vertices[other]
+                      and q not in self.edge_vertices[other])
+                for f in self.edge_faces[e] if f >= 0))
+
+        # The corners again, by vertex: (face, own, others) for each face there.
+        self.vertex_corners = [[] for _ in self.vertex_keys]
+        for (f, corners) in enumerate(self.face_corners):
+            for (v, own, others, _away) in corners:
+                self.vertex_corners[v].append((f, own, others))
+
+        self.vertex_pair_edge = {(min(p, q), max(p, q)): e
+                                 for (e, (p, q)) in enumerate(self.edge_vertices)}
+
+        # Each face's (edge, face across it), for the edges that have one.
+        self.face_borders = [tuple((e, face2 if face1 == f else face1)
+                                   for e in self.face_edges[f]
+                                   for (face1, face2) in (self.edge_faces[e],)
+                                   if face1 >= 0 and face2 >= 0)
+                             for f in range(len(self.face_keys))]
+
+        self.guesses = bytearray(len(self.edge_keys))
+        self.trail = []
+        self.choices_memo = {}
+        self.coloring = TrailedColoring(len(self.face_keys))
+        self.colored_to = 0
+        self.parity_bit = 1 << len(self.edge_keys)
+        self.vertex_equations = None  # The clue-free basis, made when first wanted.
+        # Passes of the propagate_constraints loop, ever: with the search's node
+        # count, a measure of work that machine load can't skew.
+        self.rounds = 0
+        # Suppositions propagate_with_lookahead has tried, ever.
+        self.probes = 0
+        # A random 64-bit key per edge and state, 0 for UNKNOWN; a position's
+        # hash is the XOR of its edges' keys. hashes[i] is the hash after the
+        # first i changes on the trail, extended as far as it is wanted.
+        rng = random.Random(0)
+        self.zobrist_keys = [(0, rng.getrandbits(64), rng.getrandbits(64))
+                             for _ in self.edge_keys]
+        self.hashes = [0]
+        self.memo = OrderedDict()
+        self.memo_size = PROPAGATION_MEMO
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.apply_clues((), 0)
+
+    def __getstate__(self):
+        """What pickling carries: everything but the propagation memo, which
+        may hold thousands of positions, none of which the copy needs."""
+        state = self.__dict__.copy()
+        state['memo'] = OrderedDict()
+        return state
+
+    def edge(self, ekey):
+        """The index of the edge with this key, in either orientation."""
+        return self.edge_index[edge_id(ekey)]
+
+    def guess(self, ekey):
+        """The mesh engine's name for an edge's state, looked up by edge key.
+        For tests and reports; the rules read `guesses` directly."""
+        return GUESS_NAMES[self.guesses[self.edge(ekey)]]
+
+    def reset(self):
+        """Every edge back to UNKNOWN, and the trail emptied. In place, so
+        anything holding `guesses` keeps seeing the live position."""
+        self.guesses[:] = bytes(len(self.guesses))
+        self.trail.clear()
+        del self.hashes[1:]
+        self.coloring.clear()
+        self.colored_to = 0
+        self._unsettle()
+
+    def assign(self, e, state):
+        """Set an unknown edge to `state`, on the trail. The rules do the same
+        inline, appending to `trail` themselves, since this is the innermost
+        loop of everything."""
+        self.guesses[e] = state
+        self.trail.append(e)
+
+    def checkpoint(self):
+        """A mark to roll back to: how long the trail is now."""
+        return len(self.trail)
+
+    def rollback(self, mark):
+        """Undo every change made since checkpoint() returned `mark`.
+
+        Rules only ever turn an UNKNOWN edge into a determined one, so undoing
+        a change is always setting it back to UNKNOWN, and the trail needs to
+        hold only which edge changed. Marks nest: rolling back to one leaves it
+        valid, which is what the search relies on when it tries the second
+        branch from the same point as the first.
+
+        Costs one step per edge changed since the mark -- usually a handful --
+        where restoring a saved copy costs one per edge on the board.
+        """
+        guesses = self.guesses
+        trail = self.trail
+        for e in trail[mark:]:
+            guesses[e] = UNKNOWN
+        if self.paired_to > mark:
+            self._stale_pair_items(trail[mark:self.paired_to])
+            self.paired_to = mark
+        del trail[mark:]
+        del self.hashes[mark + 1:]
+        self.coloring.undo(mark)
+        self.colored_to = min(self.colored_to, mark)
+        self._undo_loops(mark)
+        self._undo_equations(mark)
+
+        # Propagation's bookkeeping goes back with it: to the last fixed point
+        # at or before the mark, from where any changes still on the trail
+        # past it will be queued afresh.
+        settled = self.settled
+        while settled and settled[-1] > mark:
+            settled.pop()
+        self.queued_to = settled[-1] if settled else 0
+        self.dirty_vertices.clear()
+        self.dirty_faces.clear()
+
+    def _unsettle(self):
+        """Forget every fixed point, stored pair and tracked chain: the next
+        propagate_constraints starts with a full sweep. For when the clues or
+        the whole position change."""
+        self.settled = []
+        self.queued_to = 0
+        self.dirty_vertices = set()
+        self.dirty_faces = set()
+        self._forget_pairs()
+        self._forget_loops()
+        self._forget_equations()
+
+    def apply_clues(self, clues, num_clues):
+        """The board's apply_clues: the first num_clues (face, num_walls) pairs
+        become the clues, and every other face has none."""
+        self.clues = [None] * len(self.face_keys)
+        for (fkey, num_walls) in itertools.islice(clues, num_clues):
+            self.clues[self.face_index[fkey]] = num_walls
+        self.clued_faces = [f for (f, clue) in enumerate(self.clues) if clue is not None]
+        # What is_minus_one_face asks, answered once per clue set.
+        self.minus_one = [clue is not None and clue == sides - 1
+                          for (clue, sides) in zip(self.clues, self.face_sides)]
+        # What Rules A and B want of a face's two edges at a settled corner:
+        # FILLED for a -1 face (A), RULED_OUT for a clue of 1 (B), UNKNOWN for
+        # a face neither rule speaks about.
+        self.corner_target = [FILLED if minus_one else
+                              RULED_OUT if clue == 1 else UNKNOWN
+                              for (clue, minus_one) in zip(self.clues, self.minus_one)]
+        # The clued faces on each edge: the ones its change puts on the queue.
+        self.edge_clued_faces = [tuple(f for f in faces if f >= 0 and self.clues[f] is not None)
+                                 for faces in self.edge_faces]
+        # The clues' part of a memo key; None as -1, so that it hashes the
+        # same in every process a board is pickled to.
+        self.clue_key = hash(tuple(-1 if clue is None else clue for clue in self.clues))
+        self._unsettle()
+
+    def save_state(self):
+        return self.checkpoint()
+
+    def restore_state(self, state):
+        self.rollback(state)
+
+    def is_complete_solution(self):
+        return UNKNOWN not in self.guesses
+
+    def is_valid_loop(self):
+        adj = {}
+        for (e, guess) in enumerate(self.guesses):
+            if guess == FILLED:
+                (v1, v2) = self.edge_vertices[e]
+                adj.setdefault(v1, []).append(v2)
+                adj.setdefault(v2, []).append(v1)
+        return is_one_cycle(adj)
+
+    def select_edge_for_branching(self):
+        """The first unknown edge, as select_edge_for_branching picks on a mesh."""
+        e = self.guesses.find(UNKNOWN)
+        return None if e < 0 else e
+
+    def _set_edges(self, edges, state):
+        """The board's _set_edges: set each unknown edge to `state`."""
+        guesses = self.guesses
+        changed = False
+        for e in edges:
+            current = guesses[e]
+            if current == UNKNOWN:
+                guesses[e] = state
+                self.trail.append(e)
+                changed = True
+            elif current != state:
+                return (False, changed)
+        return (True, changed)
+
+    def position_hash(self):
+        """The Zobrist hash of the position, brought up to date from the trail."""
+        hashes = self.hashes
+        keys = self.zobrist_keys
+        guesses = self.guesses
+        h = hashes[-1]
+        for e in self.trail[len(hashes) - 1:]:
+            h ^= keys[e][guesses[e]]
+            hashes.append(h)
+        return h
+
+    def propagate_constraints(self):
+        """_propagate, through the memo: a position propagated before, under
+        the same clues, gets the same edges set, or the same contradiction,
+        without running a rule. Probes in a different order, and every dive of
+        solution_is_unique_restarts, keep arriving at positions already seen.
+
+        Keyed by the pre-propagation position's Zobrist hash, so a hit costs
+        the changes since the last hash plus the edges it sets. The hash is 64
+        bits, so a collision -- two positions taken for one -- is a chance in
+        2**64 per pair; no position is stored to rule it out.
+        """
+        if not self.memo_size:
+            return self._propagate()
+        memo = self.memo
+        trail = self.trail
+        key = (self.clue_key, self.position_hash())
+        found = memo.get(key)
+        if found is not None:
+            memo.move_to_end(key)
+            self.memo_hits += 1
+            if found is False:
+                return self._dead_end()
+            for (e, state) in found:
+                self.assign(e, state)
+            if not self.settled or self.settled[-1] != len(trail):
+                self.settled.append(len(trail))
+            return True
+        self.memo_misses += 1
+        start = len(trail)
+        ok = self._propagate()
+        guesses = self.guesses
+        memo[key] = tuple((e, guesses[e]) for e in trail[start:]) if ok else False
+        if len(memo) > self.memo_size:
+            memo.popitem(last=False)
+        return ok
+
+    def _propagate(self):
+        """propagate_constraints, on the board, driven by what changed.
+
+        The mesh engine re-sweeps every vertex and every clued face each round,
+        though a round after the first usually follows from a handful of new
+        edges. Here each change queues only what it can affect: its two
+        vertices (for the vertex rule, and Rules A and B at the corners there)
+        and its clued faces (for the clue rule). The local rules then run on
+        the queue alone, and their own changes queue the next round. So a
+        round costs O(changes), not O(E).
+
+        The changes come from the trail, which already records every one of
+        them: `queued_to` is how far along it we have queued. And `settled`
+        lists the trail lengths at which propagation last reached a fixed
+        point, so that after a rollback we know the position there needs no
+        fresh look -- only whatever is left on the trail past it.
+
+        With nothing settled -- new clues, or a rollback past the first fixed
+        point -- everything is owed a look, and Rules C and D, which read only
+        the clues, get their one run.
+
+        Coloring is no longer rationed as it is on the mesh: the board's
+        coloring is kept up to date change by change (see _color_changes), so
+        it costs next to nothing and runs every round, ahead of the local
+        rules. Edge pairs still come last, once everything else has stalled,
+        and any deduction they make sends us back to the rest.
+        """
+        trail = self.trail
+        if not self.settled:
+            self.dirty_vertices.update(range(len(self.vertex_edges)))
+            self.dirty_faces.update(self.clued_faces)
+            for rule in (self.apply_rule_d, self.apply_rule_c):
+                if not rule()[0]:
+                    return self._dead_end()
+
+        while True:
+            self.rounds += 1
+            if not (self._color_changes() and self._xor_changes() and self._loop_changes()):
+                return self._dead_end()
+            self._queue_changes()
+            if self.dirty_vertices or self.dirty_faces:
+                vertices = self.dirty_vertices
+                faces = self.dirty_faces
+                self.dirty_vertices = set()
+                self.dirty_faces = set()
+                if not (self._vertex_rules(vertices) and self._clue_rules(faces)
+                        and all(self._corner_rules(v) for v in vertices)):
+                    return self._dead_end()
+                continue  # Whatever they changed is queued at the top.
+
+            (ok, changed_pair) = self.apply_pair_rules()
+            if not ok:
+                return self._dead_end()
+            if not changed_pair:
+                if not self.settled or self.settled[-1] != len(trail):
+                    self.settled.append(len(trail))
+                return True
+
+    def _queue_changes(self):
+        """Queue what each change on the trail since the last call can affect."""
+        trail = self.trail
+        edge_vertices = self.edge_vertices
+        edge_clued_faces = self.edge_clued_faces
+        dirty_vertices = self.dirty_vertices
+        dirty_faces = self.dirty_faces
+        for e in trail[self.queued_to:]:
+            dirty_vertices.update(edge_vertices[e])
+            dirty_faces.update(edge_clued_faces[e])
+        self.queued_to = len(trail)
+
+    def _dead_end(self):
+        """Propagation found a contradiction: drop the queues, which describe a
+        position the caller is about to roll back, and report it."""
+        self.dirty_vertices.clear()
+        self.dirty_faces.clear()
+        return False
+
+    def _vertex_rules(self, vertices):
+        """The vertex rule at each of these vertices. False on a contradiction."""
+        return all(self._vertex_rule(v) for v in vertices)
+
+    def _clue_rules(self, faces):
+        """The clue rule at each of these clued faces. False on a contradiction."""
+        return all(self._clue_rule(f) for f in faces)
+
+    def _vertex_rule(self, v):
+        """apply_vertex_rules at one vertex. False on a contradiction."""
+        guesses = self.guesses
+        f = 0
+        unknown = []
+        for e in self.vertex_edges[v]:
+            g = guesses[e]
+            if g == FILLED:
+                f += 1
+            elif g == UNKNOWN:
+                unknown.append(e)
+        u = len(unknown)
+
+        if f > 2 or (f == 1 and u == 0):
+            return False
+
+        if f == 2 and u >= 1:
+            for e in unknown:
+                guesses[e] = RULED_OUT
+            self.trail.extend(unknown)
+        elif f == 1 and u == 1:
+            guesses[unknown[0]] = FILLED
+            self.trail.append(unknown[0])
+        elif f == 0 and u == 1:
+            guesses[unknown[0]] = RULED_OUT
+            self.trail.append(unknown[0])
+        return True
+
+    def _clue_rule(self, fc):
+        """apply_clue_rules at one clued face. False on a contradiction."""
+        guesses = self.guesses
+        n = self.clues[fc]
+        f = 0
+        unknown = []
+        for e in self.face_edges[fc]:
+            g = guesses[e]
+            if g == FILLED:
+                f += 1
+            elif g == UNKNOWN:
+                unknown.append(e)
+        u = len(unknown)
+
+        if f > n or f + u < n:
+            return False
+
+        if f == n and u >= 1:
+            for e in unknown:
+                guesses[e] = RULED_OUT
+            self.trail.extend(unknown)
+        elif f + u == n and u >= 1:
+            for e in unknown:
+                guesses[e] = FILLED
+            self.trail.extend(unknown)
+        return True
+
+    def _corner_rules(self, v):
+        """Rules A and B at every corner around one vertex, which is where
+        their premise lives: all the vertex's other edges ruled out. False on a
+        contradiction."""
+        guesses = self.guesses
+        corner_target = self.corner_target
+        for (f, own, others) in self.vertex_corners[v]:
+            target = corner_target[f]
+            if target == UNKNOWN or len(own) != 2:
+                continue
+            if any(guesses[e] != RULED_OUT for e in others):
+                continue
+            if not self._set_edges(own, target)[0]:
+                return False
+        return True
+
+    def _sweep(self, rule, items):
+        """Run a one-item rule over every item: the (ok, changed) form the
+        mesh engine's rule functions have, for callers who want one pass of
+        one family rather than propagation."""
+        start = len(self.trail)
+        for item in items:
+            if not rule(item):
+                return (False, len(self.trail) > start)
+        return (True, len(self.trail) > start)
+
+    def apply_vertex_rules(self):
+        return self._sweep(self._vertex_rule, range(len(self.vertex_edges)))
+
+    def apply_clue_rules(self):
+        return self._sweep(self._clue_rule, self.clued_faces)
+
+    def apply_pattern_rules(self):
+        changed = False
+        for rule in (self.apply_rules_a_and_b, self.apply_rule_d, self.apply_rule_c):
+            (ok, did) = rule()
+            if not ok:
+                return (False, changed)
+            changed = changed or did
+        return (True, changed)
+
+    def apply_rules_a_and_b(self):
+        return self._sweep(self._corner_rules, range(len(self.vertex_edges)))
+
+    def apply_rule_d(self):
+        minus_one = self.minus_one
+        changed = False
+        for (e, (face1, face2)) in enumerate(self.edge_faces):
+            if face1 < 0 or face2 < 0:
+                continue
+            if not (minus_one[face1] and minus_one[face2]):
+                continue
+            for away in self.edge_far_edges[e]:
+                (ok, did) = self._set_edges(away, FILLED)
+                if not ok:
+                    return (False, changed)
+                changed = changed or did
+        return (True, changed)
+
+    def apply_rule_c(self):
+        minus_one = self.minus_one
+        changed = False
+        for (v, faces) in enumerate(self.vertex_faces):
+            minus_one_faces = [f for f in faces if minus_one[f]]
+            for i in range(len(minus_one_faces)):
+                for j in range(i + 1, len(minus_one_faces)):
+                    (face1, face2) = (minus_one_faces[i], minus_one_faces[j])
+                    if face2 in self.face_neighbors[face1]:
+                        continue
+                    (own1, _, away1) = self.corner_at[(face1, v)]
+                    (own2, _, away2) = self.corner_at[(face2, v)]
+                    elsewhere = [e for e in self.vertex_edges[v]
+                                 if e not in own1 and e not in own2]
+                    (ok, did) = self._set_edges(elsewhere, RULED_OUT)
+                    if not ok:
+                        return (False, changed)
+                    changed = changed or did
+                    for away in (away1, away2):
+                        (ok, did) = self._set_edges(away, FILLED)
+                        if not ok:
+                            return (False, changed)
+                        changed = changed or did
+        return (True, changed)
+
+    def apply_color_rules(self):
+        """apply_color_rules on the board: bring the coloring up to date with
+        the trail, and set whatever that forces."""
+        start = len(self.trail)
+        ok = self._color_changes()
+        return (ok, len(self.trail) > start)
+
+    def _color_changes(self):
+        """Relate the faces of each edge decided since the last call, and
+        decide any unknown edge whose faces that relates.
+
+        Only a union relates faces that weren't already, and it relates exactly
+        the attached group's faces to the other group's. So the unknown edges
+        it can force are among the attached group's borders -- the smaller
+        group's, by the union rule -- and nothing else needs a look. The edges
+        it forces go on the trail, and are related in turn when we reach them
+        (where, being already decided by the coloring, they change nothing).
+        False on a contradiction, leaving `colored_to` at the edge that found it.
+        """
+        trail = self.trail
+        guesses = self.guesses
+        edge_faces = self.edge_faces
+        face_borders = self.face_borders
+        coloring = self.coloring
+        find = coloring.find
+        i = self.colored_to
+        while i < len(trail):
+            e = trail[i]
+            (face1, face2) = edge_faces[e]
+            if face1 >= 0 and face2 >= 0:
+                attached = coloring.relate(face1, face2, guesses[e] == FILLED, i)
+                if attached is False:
+                    self.colored_to = i
+                    return False
+                if attached is not None:
+                    root = coloring.parent[attached]
+                    for f in coloring.members[attached]:
+                        (_root, opposite) = find(f)
+                        for (border, across) in face_borders[f]:
+                            if guesses[border] != UNKNOWN:
+                                continue
+                            (other_root, other_opposite) = find(across)
+                            if other_root == root:
+                                guesses[border] = (FILLED if opposite ^ other_opposite
+                                                   else RULED_OUT)
+                                trail.append(border)
+            i += 1
+        self.colored_to = i
+        return True
+
+    def apply_pair_rules(self):
+        """apply_pair_rules on the board, with the stores kept between calls.
+
+        The mesh engine re-emits every vertex's and every clued face's pairs on
+        each call, and probes every constrained edge both ways. Almost all of
+        that repeats the previous call. So here each vertex and clued face
+        keeps the pairs it last emitted, in `pair_facts`, and is asked again
+        only once one of its edges has changed -- forward on the trail, or
+        back in a rollback. The clauses are counted in `implies` and `kinds`,
+        so a pair that stops being emitted is retracted without a rebuild.
+
+        The probe of an edge reads nothing but the stores, and only the part of
+        them it walks. So an edge that survived both probes last time, none of
+        whose walked edges have had a pair added or retracted since, would
+        survive them again, and is skipped (`probed`). That is exact, not a
+        heuristic: the board still deduces what the mesh engine does.
+
+        The pairing is a plain ParityRelation over edge indices, which cannot
+        forget a relation. New relations are added to it; it is re-linked from
+        the held relations only when one has been retracted.
+        """
+        guesses = self.guesses
+        self._update_pair_facts()
+
+        pairing = self.pairing
+        if pairing is None:
+            pairing = ParityRelation()
+            new_relations = itertools.chain(self.relations, sorted(self.promoted))
+        else:
+            new_relations = self.new_relations
+        for (edge1, edge2, kind) in new_relations:
+            if not pairing.relate(edge1, edge2, kind == 'exactly one'):
+                self.pairing = None  # Half-built; start again next time.
+                return (False, False)
+        self.pairing = pairing
+        self.new_relations = []
+
+        (ok, changed) = self.apply_substitution(pairing)
+        if not ok:
+            return (False, changed)
+        if changed:
+            return (True, True)
+
+        implies = self.implies
+        probed = self.probed
+        candidates = set(pairing.parent) | set(lit >> 1 for lit in implies)
+        changed = False
+        tried = set()   # As there: one edge per parity group is tested.
+        for e in sorted(candidates):
+            if guesses[e] != UNKNOWN:
+                continue
+            if e in pairing.parent:
+                (root, _opposite) = pairing.representative(e)
+                if root in tried:
+                    continue
+                tried.add(root)
+            if e in probed:
+                continue
+            walks = [self.pair_forced_by(pairing, implies, e, state)
+                     for state in (FILLED, RULED_OUT)]
+            impossible = [state for (state, walk) in zip((FILLED, RULED_OUT), walks)
+                          if walk is None]
+            if len(impossible) == 2:
+                return (False, changed)
+            if impossible:
+                (ok, did) = self._set_edges([e], 3 - impossible[0])
+                if not ok:
+                    return (False, changed)
+                changed = changed or did
+            else:
+                probed[e] = True
+                for walk in walks:
+                    for other in walk:
+                        self.probe_watch.setdefault(other, set()).add(e)
+        return (True, changed)
+
+    def _forget_equations(self):
+        """Start the parity equations afresh from the clues. The next
+        propagate_constraints substitutes the whole trail into them."""
+        parity_bit = self.parity_bit
+        if self.vertex_equations is None:
+            self.vertex_equations = []
+            for edges in self.vertex_edges:
+                xor_insert(self.vertex_equations, sum(1 << e for e in edges), parity_bit)
+        self.equations = list(self.vertex_equations)
+        # False if the clues' parities alone contradict the vertices'.
+        self.equations_ok = all(
+            xor_insert(self.equations,
+                       sum(1 << e for e in self.face_edges[f])
+                       | (parity_bit if self.clues[f] % 2 else 0), parity_bit)
+            for f in self.clued_faces)
+        # (trail position, equations before it) for each batch substituted.
+        self.equations_log = []
+        self.equated_to = 0
+
+    def _undo_equations(self, mark):
+        """Put the equations back as they were before trail position `mark`."""
+        log = self.equations_log
+        while self.equated_to > mark:
+            (self.equated_to, self.equations) = log.pop()
+
+    def apply_xor_rules(self):
+        """apply_xor_rules on the board: bring the equations up to date with
+        the trail, and set whatever they pin down."""
+        start = len(self.trail)
+        ok = self._xor_changes()
+        return (ok, len(self.trail) > start)
+
+    def _xor_changes(self):
+        """apply_xor_rules, kept up to date: substitute each edge decided since
+        the last call into the reduced equations, then decide every edge they
+        pin down. Each substitution costs one pass over the equations, not a
+        fresh elimination. False on a contradiction."""
+        if not XOR_RULES:
+            return True
+        if not self.equations_ok:
+            return False
+        trail = self.trail
+        if self.equated_to < len(trail):
+            self.equations_log.append((self.equated_to, list(self.equations)))
+            guesses = self.guesses
+            equations = self.equations
+            parity_bit = self.parity_bit
+            for i in range(self.equated_to, len(trail)):
+                e = trail[i]
+                if not xor_assign(equations, e, guesses[e] == FILLED, parity_bit):
+                    self.equated_to = i + 1
+                    return False
+            self.equated_to = len(trail)
+        for (e, filled) in xor_units(self.equations, self.parity_bit):
+            if self.guesses[e] == UNKNOWN:
+                self.assign(e, FILLED if filled else RULED_OUT)
+        return True
+
+    def _forget_loops(self):
+        """Start the chain tracker afresh: every vertex alone, nothing filled.
+        The next propagate_constraints replays the whole trail into it."""
+        num_vertices = len(self.vertex_edges)
+        # For a chain's end, the vertex at its other end; an unfilled vertex is
+        # a chain of no edges whose two ends are itself; -1 inside a chain.
+        self.chain_end = list(range(num_vertices))
+        # For a chain's end, how many edges the chain has.
+        self.chain_size = [0] * num_vertices
+        # Filled edges on each face, and the clue each face still wants met.
+        self.face_filled = [0] * len(self.face_keys)
+        # [filled edges, open chains, closed loops, clued faces not yet met]
+        self.loop_counts = [0, 0, 0, sum(1 for f in self.clued_faces if self.clues[f])]
+        # The ends of every open chain of one edge or more.
+        self.open_ends = set()
+        # One (cause, list, index, old value) per write, to undo by, or
+        # (cause, None, vertex, added) for a change to open_ends.
+        self.loop_log = []
+        self.looped_to = 0
+
+    def _loop_write(self, cause, values, index, value):
+        self.loop_log.append((cause, values, index, values[index]))
+        values[index] = value
+
+    def _open_end(self, cause, v, added):
+        (self.open_ends.add if added else self.open_ends.discard)(v)
+        self.loop_log.append((cause, None, v, added))
+
+    def _undo_loops(self, mark):
+        """Undo every write the tracker made for trail position `mark` or later."""
+        log = self.loop_log
+        while log and log[-1][0] >= mark:
+            (_cause, values, index, old) = log.pop()
+            if values is None:
+                (self.open_ends.discard if old else self.open_ends.add)(index)
+            else:
+                values[index] = old
+        self.looped_to = min(self.looped_to, mark)
+
+    def _loop_changes(self):
+        """apply_loop_rules, kept up to date change by change.
+
+        Each filled edge on the trail joins the chains at its two ends, the
+        ends' `chain_end` entries tracking the join (and logged, so a rollback
+        can undo it, as TrailedColoring's unions are). A join that meets itself
+        closes a loop. After each join the new chain's closing edge is checked,
+        and when the filled edges go from one piece to two, so is the old
+        piece's, which was until then the only one and so allowed to close.
+        False on a contradiction.
+        """
+        trail = self.trail
+        guesses = self.guesses
+        chain_end = self.chain_end
+        chain_size = self.chain_size
+        counts = self.loop_counts
+        write = self._loop_write
+        i = self.looped_to
+        while i < len(trail):
+            e = trail[i]
+            if guesses[e] != FILLED:
+                i += 1
+                continue
+            (a, b) = self.edge_vertices[e]
+            pieces = counts[1] + counts[2]
+            write(i, counts, 0, counts[0] + 1)
+            for f in self.edge_faces[e]:
+                if f >= 0:
+                    self._count_face(i, f, 1)
+            (end_a, end_b) = (chain_end[a], chain_end[b])
+            if counts[2] or end_a < 0 or end_b < 0:
+                # On top of a closed loop, or a branch (the vertex rule's).
+                self.looped_to = i
+                return False
+
+            if end_a == b:
+                # The chain's own two ends: a loop closes.
+                write(i, chain_end, a, -1)
+                write(i, chain_end, b, -1)
+                self._open_end(i, a, False)
+                self._open_end(i, b, False)
+                write(i, counts, 1, counts[1] - 1)
+                write(i, counts, 2, counts[2] + 1)
+                if chain_size[a] + 1 < counts[0]:
+                    self.looped_to = i
+                    return False
+                # The whole solution, then: nothing else can be filled.
+                unknown = [x for x in range(len(guesses)) if guesses[x] == UNKNOWN]
+                for x in unknown:
+                    guesses[x] = RULED_OUT
+                trail.extend(unknown)
+                i += 1
+                continue
+
+            (size_a, size_b) = (chain_size[a], chain_size[b])
+            size = size_a + size_b + 1
+            for (v, v_size) in ((a, size_a), (b, size_b)):
+                if v_size:
+                    write(i, chain_end, v, -1)  # An end no longer.
+                    self._open_end(i, v, False)
+            write(i, chain_end, end_a, end_b)
+            write(i, chain_end, end_b, end_a)
+            write(i, chain_size, end_a, size)
+            write(i, chain_size, end_b, size)
+            self._open_end(i, end_a, True)
+            self._open_end(i, end_b, True)
+            write(i, counts, 1, counts[1] + 1 - (size_a > 0) - (size_b > 0))
+
+            if pieces == 1 and counts[1] == 2:
+                for v in list(self.open_ends):
+                    self._rule_out_closing(v)
+            else:
+                self._rule_out_closing(end_a)
+            i += 1
+        self.looped_to = i
+        return True
+
+    def _count_face(self, cause, f, step):
+        """Add `step` filled edges to face f, keeping count of unmet clues."""
+        clue = self.clues[f]
+        was_met = self.face_filled[f] == clue
+        self._loop_write(cause, self.face_filled, f, self.face_filled[f] + step)
+        if clue is not None and was_met != (self.face_filled[f] == clue):
+            counts = self.loop_counts
+            self._loop_write(cause, counts, 3, counts[3] + (1 if was_met else -1))
+
+    def _rule_out_closing(self, v):
+        """Rule out the edge joining the ends of v's chain, if there is one, it
+        is unknown, and closing it would not make the whole solution."""
+        other = self.chain_end[v]
+        e = self.vertex_pair_edge.get((min(v, other), max(v, other)))
+        if e is None or self.guesses[e] != UNKNOWN:
+            return
+        if self.chain_size[v] < self.loop_counts[0] or not self._closing_meets_clues(e):
+            self.guesses[e] = RULED_OUT
+            self.trail.append(e)
+
+    def _closing_meets_clues(self, e):
+        """closing_meets_clues: would filling e leave no clue unmet?"""
+        unmet = self.loop_counts[3]
+        for f in self.edge_faces[e]:
+            if f < 0 or self.clues[f] is None:
+                continue
+            filled = self.face_filled[f]
+            unmet += (filled == self.clues[f]) - (filled + 1 == self.clues[f])
+        return unmet == 0
+
+    def _forget_pairs(self):
+        """Drop every stored pair: each vertex and clued face is asked afresh
+        next time. For when the clues or the whole position change."""
+        # Pair items: vertex v is item v, clued face f is item V + f, and the
+        # parity equations are item V + F.
+        self.pair_facts = {}
+        self.pair_stale = set(range(len(self.vertex_edges)))
+        self.pair_stale.update(len(self.vertex_edges) + f for f in self.clued_faces)
+        # The equations the parity item last emitted from; None to ask again.
+        self.paired_equations = None
+        self.paired_to = 0
+        # (edge1, edge2, kind) -> how many items emit that relation.
+        self.relations = {}
+        # Pairs holding both clause kinds, as exactly-one relations.
+        self.promoted = set()
+        self.new_relations = []
+        self.pairing = None
+        # literal -> {literal it forces: how many items emit that clause}.
+        self.implies = {}
+        # (edge1, edge2) -> [at most one count, at least one count].
+        self.kinds = {}
+        # Edges that survived both probes, and for each edge, the probed edges
+        # whose walks passed through it.
+        self.probed = {}
+        self.probe_watch = {}
+
+    def _stale_pair_items(self, edges):
+        """Mark the items on these edges for asking again."""
+        num_vertices = len(self.vertex_edges)
+        stale = self.pair_stale
+        for e in edges:
+            stale.update(self.edge_vertices[e])
+            stale.update(num_vertices + f for f in self.edge_clued_faces[e])
+
+    def _update_pair_facts(self):
+        """Re-emit the pairs of every item an edge change has touched, and
+        retract or add whatever differs from what it emitted before."""
+        self._stale_pair_items(self.trail[self.paired_to:])
+        self.paired_to = len(self.trail)
+        num_vertices = len(self.vertex_edges)
+        xor_item = num_vertices + len(self.face_keys)
+        # The equations change with any edge, not just the item's own, so the
+        # parity item is asked again whenever they differ from last time.
+        if XOR_RULES and XOR_PAIRS and self.equations != self.paired_equations:
+            self.pair_stale.add(xor_item)
+        changed_edges = set()
+        for item in sorted(self.pair_stale):
+            if item < num_vertices:
+                facts = self._emit_vertex_pairs(item)
+            elif item < xor_item:
+                facts = self._emit_face_pairs(item - num_vertices)
+            else:
+                self.paired_equations = list(self.equations)
+                facts = tuple(sorted(xor_relations(self.equations, self.parity_bit)))
+            old = self.pair_facts.get(item, ())
+            if facts == old:
+                continue
+            self.pair_facts[item] = facts
+            (old_set, new_set) = (set(old), set(facts))
+            for fact in old:
+                if fact not in new_set:
+                    self._count_fact(fact, -1)
+                    changed_edges.update(fact[:2])
+            for fact in facts:
+                if fact not in old_set:
+                    self._count_fact(fact, 1)
+                    changed_edges.update(fact[:2])
+        self.pair_stale.clear()
+
+        # Every probe that walked through a changed edge must be asked again.
+        for edge in changed_edges:
+            for e in self.probe_watch.pop(edge, ()):
+                self.probed.pop(e, None)
+
+    def _count_fact(self, fact, step):
+        """Add (step 1) or retract (step -1) one emitted pair.
+
+        A fact is (edge1, edge2, kind), edge1 < edge2, where kind is 'exactly
+        one' or 'both or neither' for a relation, and FILLED or RULED_OUT for an
+        at-most-one or at-least-one clause -- the clause's premise, the state
+        neither edge may be in while the other is.
+        """
+        (edge1, edge2, kind) = fact
+        if kind in RELATION_KINDS:
+            count = self.relations.get(fact, 0) + step
+            if count:
+                self.relations[fact] = count
+            else:
+                del self.relations[fact]
+            if step > 0 and count == 1:
+                self.new_relations.append(fact)
+            elif count == 0:
+                self.pairing = None
+            return
+
+        lit1 = literal(edge1, kind)
+        lit2 = literal(edge2, kind)
+        for (premise, conclusion) in ((lit1, lit2 ^ 1), (lit2, lit1 ^ 1)):
+            forced = self.implies.setdefault(premise, {})
+            count = forced.get(conclusion, 0) + step
+            if count:
+                forced[conclusion] = count
+            else:
+                del forced[conclusion]
+                if not forced:
+                    del self.implies[premise]
+
+        held = self.kinds.setdefault((edge1, edge2), [0, 0])
+        was_both = held[0] > 0 and held[1] > 0
+        held[kind == RULED_OUT] += step
+        is_both = held[0] > 0 and held[1] > 0
+        if held == [0, 0]:
+            del self.kinds[(edge1, edge2)]
+        promotion = (edge1, edge2, 'exactly one')
+        if is_both and not was_both:
+            self.promoted.add(promotion)
+            self.new_relations.append(promotion)
+        elif was_both and not is_both:
+            self.promoted.discard(promotion)
+            self.pairing = None
+
+    def _emit_vertex_pairs(self, v):
+        """emit_vertex_pairs at one vertex, as a tuple of facts."""
+        guesses = self.guesses
+        f = 0
+        unknown = []
+        for e in self.vertex_edges[v]:
+            g = guesses[e]
+            if g == FILLED:
+                f += 1
+            elif g == UNKNOWN:
+                unknown.append(e)
+        u = len(unknown)
+        unknown.sort()
+        if (f, u) == (1, 2):
+            return ((unknown[0], unknown[1], 'exactly one'),)
+        if (f, u) == (0, 2):
+            return ((unknown[0], unknown[1], 'both or neither'),)
+        if f == 1 and u > 2:
+            return tuple((edge1, edge2, FILLED)
+                         for (edge1, edge2) in itertools.combinations(unknown, 2))
+        return ()
+
+    def _emit_face_pairs(self, fc):
+        """emit_face_pairs at one clued face, as a tuple of facts."""
+        guesses = self.guesses
+        f = 0
+        unknown = []
+        for e in self.face_edges[fc]:
+            g = guesses[e]
+            if g == FILLED:
+                f += 1
+            elif g == UNKNOWN:
+                unknown.append(e)
+        u = len(unknown)
+        deficit = self.clues[fc] - f
+        if u < 2:
+            return ()
+        unknown.sort()
+        facts = []
+        if deficit == 1:
+            facts.extend((edge1, edge2, FILLED)
+                         for (edge1, edge2) in itertools.combinations(unknown, 2))
+        if deficit == u - 1:
+            facts.extend((edge1, edge2, RULED_OUT)
+                         for (edge1, edge2) in itertools.combinations(unknown, 2))
+        return tuple(facts)
+
+    def apply_substitution(self, pairing):
+        guesses = self.guesses
+        changed = False
+        for fc in self.clued_faces:
+            filled = 0
+            unknown = []
+            for e in self.face_edges[fc]:
+                g = guesses[e]
+                if g == FILLED:
+                    filled += 1
+                elif g == UNKNOWN:
+                    unknown.append(e)
+            if not unknown:
+                continue
+            (ok, did) = self._resolve_groups(pairing, unknown, {self.clues[fc] - filled})
+            if not ok:
+                return (False, changed)
+            changed = changed or did
+
+        for edges in self.vertex_edges:
+            filled = 0
+            unknown = []
+            for e in edges:
+                g = guesses[e]
+                if g == FILLED:
+                    filled += 1
+                elif g == UNKNOWN:
+                    unknown.append(e)
+            if not unknown:
+                continue
+            (ok, did) = self._resolve_groups(pairing, unknown, {0 - filled, 2 - filled})
+            if not ok:
+                return (False, changed)
+            changed = changed or did
+        return (True, changed)
+
+    def _resolve_groups(self, pairing, unknown, targets):
+        groups = pair_groups(pairing, unknown)
+        values = tuple((len(same), len(opposite)) for (same, opposite) in groups)
+        # feasible_choices depends only on these small counts, and the same
+        # handful recur at every vertex and face of every round, so remember
+        # its answers.
+        key = (values, tuple(sorted(targets)))
+        choices = self.choices_memo.get(key, False)
+        if choices is False:
+            choices = self.choices_memo[key] = feasible_choices(values, targets)
+        if choices is None:
+            return (False, False)
+
+        changed = False
+        for ((same, opposite), feasible) in zip(groups, choices):
+            if not feasible:
+                return (False, changed)
+            if len(feasible) > 1:
+                continue
+            state = FILLED if next(iter(feasible)) else RULED_OUT
+            for (edges, guess) in ((same, state), (opposite, 3 - state)):
+                (ok, did) = self._set_edges(edges, guess)
+                if not ok:
+                    return (False, changed)
+                changed = changed or did
+        return (True, changed)
+
+    @staticmethod
+    def pair_forced_by(pairing, implies, edge, state):
+        """pair_forced_by over board literals: every edge the pairing and the
+        clauses together force, given this edge's state, as a dict of edge ->
+        literal, or None if the supposition is impossible."""
+        known = {}
+        walked = set()   # As there: each parity group is walked once.
+        queue = [literal(edge, state)]
+        while queue:
+            lit = queue.pop()
+            current = lit >> 1
+            if current in known:
+                if known[current] != lit:
+                    return None  # Both states forced for one edge.
+                continue
+            known[current] = lit
+            if current not in walked:
+                bit = lit & 1
+                group = pairing.group(current)
+                walked.update(other for (other, _opposite) in group)
+                queue.extend((other << 1) | (bit ^ opposite) for (other, opposite) in group)
+            queue.extend(implies.get(lit, ()))
+        return known
+
+    def propagate_with_lookahead(self, depth=1):
+        """propagate_with_lookahead on the board: suppose each unknown edge
+        both ways, `depth` suppositions deep, and keep what both agree on.
+
+        The edges are taken round and round, and the work ends once a whole
+        round has passed with nothing deduced -- but a supposition isn't tried
+        again where its answer is already known. A supposition that survives
+        reaches a fixed point, and every literal in that fixed point would
+        survive too, propagating to no more than it: so each is remembered,
+        with how long the trail was, as surviving until something set since
+        falls outside the fixed point (see _survives). After a round with no
+        deduction that is most of them, and every literal a probe implies is
+        spared its own probe.
+
+        What both of an edge's suppositions agree on wants their exact fixed
+        points, though, which a literal spared by another's probe doesn't
+        have: only a bound on it. So rounds take what they can from the fixed
+        points they have, and once one deduces nothing, a last round probes
+        the spared literals too -- those whose bounds share an unknown edge
+        with the other supposition's, without which the fixed points can't.
+        Anything it deduces starts the rounds again.
+
+        After a deduction, the unknown edges at the vertices it changed are
+        tried first, before the round resumes: a deduction's neighbors are the
+        likeliest to be forced next. Neither changes what is concluded, only
+        how soon; LOOKAHEAD_CACHE = False turns both off. `probes` counts the
+        suppositions tried.
+        """
+        if not self.propagate_constraints():
+            return False
+        if depth <= 0:
+            return True
+
+        guesses = self.guesses
+        trail = self.trail
+        num_edges = len(guesses)
+        # literal -> (trail length, {edge: state}, literal probed): a surviving
+        # probe's fixed point, how far the trail went when it was made, and
+        # which literal it was made for -- another's, if it only bounds this.
+        survivors = {}
+        tied = ParityRelation()  # As in propagate_with_lookahead on a mesh.
+        if not self._batch_settle(tied):
+            return False
+        nearby = []  # Edges by the last deduction, to try before the round.
+        e = 0
+        quiet = 0  # Edges the round has passed since the last deduction.
+        # Whether to probe a literal spared by another's probe, for the exact
+        # fixed point common consequences want: only in a last round, once a
+        # round without has deduced nothing.
+        exact = not LOOKAHEAD_CACHE
+        while quiet < num_edges or not exact:
+            if quiet >= num_edges:
+                (quiet, exact) = (0, True)
+            if nearby:
+                x = nearby.pop()
+            else:
+                (x, e) = (e, e + 1 if e + 1 < num_edges else 0)
+                quiet += 1
+            if guesses[x] != UNKNOWN:
+                continue
+
+            deduced = None
+            found = []
+            for supposition in (FILLED, RULED_OUT):
+                lit = literal(x, supposition)
+                known = survivors.get(lit)
+                if not self._survives(known):
+                    known = self._probe(x, supposition, depth, survivors)
+                    if known is None:
+                        deduced = [(x, 3 - supposition)]
+                        break
+                found.append((supposition, known))
+
+            if deduced is None and COMMON_CONSEQUENCES:
+                if any(known[2] != literal(x, supposition) for (supposition, known) in found):
+                    if not (exact and self._overlap(x, found[0][1][1], found[1][1][1])):
+                        continue
+                    found = [(supposition, known if known[2] == literal(x, supposition) else
+                              self._probe(x, supposition, depth, survivors))
+                             for (supposition, known) in found]
+                deduced = []
+                (if_filled, if_ruled_out) = (found[0][1][1], found[1][1][1])
+                for (y, state) in if_filled.items():
+                    other = if_ruled_out.get(y)
+                    if other is None or y == x or guesses[y] != UNKNOWN:
+                        continue
+                    if state == other:
+                        deduced.append((y, state))
+                    elif not tied.relate(x, y, state == RULED_OUT):
+                        return False
+
+            if deduced:
+                start = len(trail)
+                for (y, state) in deduced:
+                    self.assign(y, state)
+                if not (self._settle_tied(tied, start) and self._batch_settle(tied)):
+                    return False
+                (quiet, exact) = (0, not LOOKAHEAD_CACHE)
+                if LOOKAHEAD_CACHE:
+                    vertex_edges = self.vertex_edges
+                    nearby = [y for changed in trail[start:]
+                              for v in self.edge_vertices[changed]
+                              for y in vertex_edges[v] if guesses[y] == UNKNOWN]
+                    nearby.reverse()  # Popped from the end: nearest first.
+
+        return True
+
+    def batch_probe(self, edges):
+        """Suppose each of these unknown edges filled, and each ruled out, all
+        at once, bit-sliced, and run the vertex and clue rules on every
+        supposition together to a fixed point.
+
+        Each supposition is a lane: bit 2i of a mask is edges[i] supposed
+        FILLED, bit 2i + 1 it supposed RULED_OUT. Every edge's state is two
+        masks, the lanes in which it is filled and those in which it is ruled
+        out, so a rule evaluated on masks is evaluated in every lane at once:
+        a vertex's "at least two filled" is a running OR of ANDs over its
+        edges' masks, whatever the number of lanes. Python ints are as wide as
+        they need to be, so there are as many lanes as suppositions, not 64.
+
+        Returns (filled, ruled_out, dead): each edge's two masks at the fixed
+        point, and the lanes that met a contradiction. Only the local rules
+        run, so a lane that survives here may not survive propagate_constraints
+        -- but one that dies here is a supposition that fails.
+        """
+        guesses = self.guesses
+        full = (1 << 2 * len(edges)) - 1
+        filled = [full if g == FILLED else 0 for g in guesses]
+        ruled_out = [full if g == RULED_OUT else 0 for g in guesses]
+        for (i, e) in enumerate(edges):
+            filled[e] |= 1 << 2 * i
+            ruled_out[e] |= 2 << 2 * i
+        vertex_edges = self.vertex_edges
+        face_edges = self.face_edges
+        clues = self.clues
+        dead = 0
+        vertices = {v for e in edges for v in self.edge_vertices[e]}
+        faces = {f for e in edges for f in self.edge_clued_faces[e]}
+        while vertices or faces:
+            changed = []
+            for v in vertices:
+                # Lanes with at least one, two, three filled; one, two unknown.
+                f1 = f2 = f3 = u1 = u2 = 0
+                for e in vertex_edges[v]:
+                    m = filled[e]
+                    f3 |= f2 & m
+                    f2 |= f1 & m
+                    f1 |= m
+                    m = full & ~(m | ruled_out[e])
+                    u2 |= u1 & m
+                    u1 |= m
+                dead |= f3 | (f1 & ~f2 & ~u1)
+                live = full & ~dead
+                rule_out = ((f2 & ~f3) | (~f1 & ~u2)) & u1 & live
+                fill = f1 & ~f2 & u1 & ~u2 & live
+                if rule_out or fill:
+                    self._force_lanes(vertex_edges[v], full, fill, rule_out,
+                                      filled, ruled_out, changed)
+            for fc in faces:
+                n = clues[fc]
+                # at_least[k]: the lanes with at least k filled; could_be[k],
+                # with at least k not ruled out.
+                at_least = [full] + [0] * (n + 1)
+                could_be = [full] + [0] * (n + 1)
+                unknown = 0
+                for e in face_edges[fc]:
+                    m = filled[e]
+                    not_out = full & ~ruled_out[e]
+                    unknown |= not_out & ~m
+                    for k in range(n + 1, 0, -1):
+                        at_least[k] |= at_least[k - 1] & m
+                        could_be[k] |= could_be[k - 1] & not_out
+                dead |= at_least[n + 1] | (full & ~could_be[n])
+                live = full & ~dead
+                rule_out = at_least[n] & ~at_least[n + 1] & unknown & live
+                fill = could_be[n] & ~could_be[n + 1] & unknown & live
+                if rule_out or fill:
+                    self._force_lanes(face_edges[fc], full, fill, rule_out,
+                                      filled, ruled_out, changed)
+            vertices = {v for e in changed for v in self.edge_vertices[e]}
+            faces = {f for e in changed for f in self.edge_clued_faces[e]}
+        return (filled, ruled_out, dead)
+
+    @staticmethod
+    def _force_lanes(edges, full, fill, rule_out, filled, ruled_out, changed):
+        """In batch_probe, fill these edges in the lanes of `fill` and rule
+        them out in those of `rule_out`, wherever they are unknown, and list
+        each edge that changed in `changed`."""
+        for e in edges:
+            unknown = full & ~(filled[e] | ruled_out[e])
+            if unknown & (fill | rule_out):
+                filled[e] |= unknown & fill
+                ruled_out[e] |= unknown & rule_out
+                changed.append(e)
+
+    def _batch_deductions(self, tied):
+        """What batch_probe concludes about every unknown edge, as (edge,
+        state) pairs: the opposite of each supposition that fails, and, with
+        COMMON_CONSEQUENCES, whatever both an edge's surviving suppositions
+        set alike -- the local rules' fixed point being part of the full one,
+        that holds either way too. Edges one follows or opposes in both are
+        related in `tied`. None if some edge can be neither state."""
+        guesses = self.guesses
+        edges = [e for (e, g) in enumerate(guesses) if g == UNKNOWN]
+        if not edges:
+            return []
+        (filled, ruled_out, dead) = self.batch_probe(edges)
+        deduced = []
+        for (i, e) in enumerate(edges):
+            lanes = (dead >> 2 * i) & 3
+            if lanes == 3:
+                return None
+            if lanes:
+                deduced.append((e, RULED_OUT if lanes == 1 else FILLED))
+        if not COMMON_CONSEQUENCES:
+            return deduced
+
+        # The even bit of each edge whose two lanes both survive.
+        both_live = ((1 << 2 * len(edges)) - 1) // 3 & ~dead & ~(dead >> 1)
+        for y in edges:
+            (m_filled, m_ruled_out) = (filled[y], ruled_out[y])
+            if m_filled & (m_filled >> 1) & both_live:
+                deduced.append((y, FILLED))
+            if m_ruled_out & (m_ruled_out >> 1) & both_live:
+                deduced.append((y, RULED_OUT))
+            for (lanes, opposite) in ((m_filled & (m_ruled_out >> 1) & both_live, False),
+                                      (m_ruled_out & (m_filled >> 1) & both_live, True)):
+                while lanes:
+                    low = lanes & -lanes
+                    x = edges[(low.bit_length() - 1) >> 1]
+                    if x != y and not tied.relate(x, y, opposite):
+                        return None
+                    lanes ^= low
+        return deduced
+
+    def _batch_settle(self, tied):
+        """Set what _batch_deductions finds, propagate, and again until it
+        finds nothing new. False on a contradiction."""
+        if not BATCH_PROBES:
+            return True
+        guesses = self.guesses
+        trail = self.trail
+        while True:
+            deduced = self._batch_deductions(tied)
+            if deduced is None:
+                return False
+            start = len(trail)
+            for (y, state) in deduced:
+                if guesses[y] == UNKNOWN:
+                    self.assign(y, state)
+                elif guesses[y] != state:
+                    return False
+            if len(trail) == start:
+                return True
+            if not self._settle_tied(tied, start):
+                return False
+
+    def _probe(self, x, supposition, depth, survivors):
+        """Suppose edge x is in `supposition` and look `depth` - 1 deep, for
+        propagate_with_lookahead. The fixed point, remembered in `survivors`
+        for every literal in it, or None if the supposition fails."""
+        guesses = self.guesses
+        trail = self.trail
+        self.probes += 1
+        mark = self.checkpoint()
+        self.assign(x, supposition)
+        found = None
+        if self.propagate_with_lookahead(depth - 1):
+            found = (mark, {y: guesses[y] for y in trail[mark:]}, literal(x, supposition))
+            if LOOKAHEAD_CACHE:
+                for (y, state) in found[1].items():
+                    survivors[literal(y, state)] = found
+        self.rollback(mark)
+        return found
+
+    def _survives(self, found):
+        """Whether a probe remembered in propagate_with_lookahead still
+        survives: whether everything set since it was made is in its fixed
+        point. The position then, grown by facts the fixed point already
+        holds, still propagates to that fixed point. Anything else set since
+        might change that, however far away, since the loop, parity and pair
+        rules reach across the whole board."""
+        if found is None:
+            return False
+        (length, fixed, _lit) = found
+        guesses = self.guesses
+        return all(fixed.get(y) == guesses[y] for y in self.trail[length:])
+
+    def _overlap(self, x, fixed1, fixed2):
+        """Whether two fixed points of edge x's suppositions both determine
+        some other edge still unknown."""
+        guesses = self.guesses
+        if len(fixed2) < len(fixed1):
+            (fixed1, fixed2) = (fixed2, fixed1)
+        return any(y in fixed2 and guesses[y] == UNKNOWN and y != x for y in fixed1)
+
+    def _settle_tied(self, tied, start):
+        """propagate_constraints, and then set every unknown edge `tied`
+        relates to one set since trail position `start`, over again until
+        neither changes anything. False on a contradiction."""
+        guesses = self.guesses
+        trail = self.trail
+        parent = tied.parent
+        while True:
+            if not self.propagate_constraints():
+                return False
+            end = len(trail)
+            for y in trail[start:end]:
+                if y not in parent:
+                    continue
+                for (z, opposite) in tied.group(y):
+                    state = 3 - guesses[y] if opposite else guesses[y]
+                    if guesses[z] == UNKNOWN:
+                        self.assign(z, state)
+                    elif guesses[z] != state:
+                        return False
+            if len(trail) == end:
+                return True
+            start = end
+
+
+class BitBoard(SolverBoard):
+    """A SolverBoard that also holds its position as two bitmasks over edge
+    indices, `filled` and `ruled_out`, and runs the vertex and clue rules on
+    them: the bitset engine.
+
+    Each vertex and face has an incidence mask, so where the board counts a
+    vertex's filled edges in a loop, this is one `(mask & filled).bit_count()`.
+    And a whole position is two ints, so checkpoint() snapshots it for nothing,
+    and rollback() to a snapshot restores the masks in O(1) whatever was
+    undone.
+
+    Everything else -- the trail, coloring, pairs, lookahead -- is the board's.
+    `guesses` stays the authority; the masks follow the trail, folded in by
+    _sync() before any mask is read, so they can never see a stale position.
+    """
+
+    def __init__(self, mesh):
+        super().__init__(mesh)
+        self.vertex_masks = [sum(1 << e for e in edges) for edges in self.vertex_edges]
+        self.face_masks = [sum(1 << e for e in edges) for edges in self.face_edges]
+        self.all_edges = (1 << len(self.edge_keys)) - 1
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.filled = 0
+        self.ruled_out = 0
+        self.synced_to = 0
+        # (mark, filled, ruled_out) for each live checkpoint, innermost last.
+        self.snapshots = []
+
+    def _sync(self):
+        """Fold the trail's changes since the last call into the masks."""
+        trail = self.trail
+        guesses = self.guesses
+        for e in trail[self.synced_to:]:
+            if guesses[e] == FILLED:
+                self.filled |= 1 << e
+            else:
+                self.ruled_out |= 1 << e
+        self.synced_to = len(trail)
+
+    def checkpoint(self):
+        mark = super().checkpoint()
+        self._sync()
+        if not self.snapshots or self.snapshots[-1][0] != mark:
+            self.snapshots.append((mark, self.filled, self.ruled_out))
+        return mark
+
+    def rollback(self, mark):
+        snapshots = self.snapshots
+        while snapshots and snapshots[-1][0] > mark:
+            snapshots.pop()
+        if snapshots and snapshots[-1][0] == mark:
+            (_mark, self.filled, self.ruled_out) = snapshots[-1]
+        else:
+            # A mark from before the last reset, or never snapshotted: clear
+            # the undone edges' bits one by one.
+            undone = 0
+            for e in self.trail[mark:self.synced_to]:
+                undone |= 1 << e
+            self.filled &= ~undone
+            self.ruled_out &= ~undone
+        self.synced_to = min(self.synced_to, mark)
+        super().rollback(mark)
+
+    def is_complete_solution(self):
+        self._sync()
+        return (self.filled | self.ruled_out) == self.all_edges
+
+    def select_edge_for_branching(self):
+        self._sync()
+        unknown = self.all_edges & ~(self.filled | self.ruled_out)
+        return (unknown & -unknown).bit_length() - 1 if unknown else None
+
+    def _set_mask(self, edges, state):
+        """Set every edge in the mask `edges`, all known to be unknown, to
+        `state`, on the trail. The masks catch up at the next _sync()."""
+        guesses = self.guesses
+        trail = self.trail
+        while edges:
+            low = edges & -edges
+            e = low.bit_length() - 1
+            guesses[e] = state
+            trail.append(e)
+            edges ^= low
+
+    def _vertex_rules(self, vertices):
+        """The vertex rule at each of these vertices. False on a contradiction."""
+        return all(self._vertex_rule(v) for v in vertices)
+
+    def _clue_rules(self, faces):
+        """The clue rule at each of these clued faces. False on a contradiction."""
+        return all(self._clue_rule(f) for f in faces)
+
+    def _vertex_rule(self, v):
+        self._sync()
+        mask = self.vertex_masks[v]
+        f = (mask & self.filled).bit_count()
+        unknown = mask & ~(self.filled | self.ruled_out)
+        u = unknown.bit_count()
+
+        if f > 2 or (f == 1 and u == 0):
+            return False
+        if f == 2 and u >= 1:
+            self._set_mask(unknown, RULED_OUT)
+        elif f == 1 and u == 1:
+            self._set_mask(unknown, FILLED)
+        elif f == 0 and u == 1:
+            self._set_mask(unknown, RULED_OUT)
+        return True
+
+    def _clue_rule(self, fc):
+        self._sync()
+        n = self.clues[fc]
+        mask = self.face_masks[fc]
+        f = (mask & self.filled).bit_count()
+        unknown = mask & ~(self.filled | self.ruled_out)
+        u = unknown.bit_count()
+
+        if f > n or f + u < n:
+            return False
+        if f == n and u >= 1:
+            self._set_mask(unknown, RULED_OUT)
+        elif f + u == n and u >= 1:
+            self._set_mask(unknown, FILLED)
+        return True
+
+
+# How many queued vertices (or clued faces) make a VectorBoard evaluate them in
+# bulk rather than one at a time. numpy's fixed cost per call is worth paying
+# only past this: `bench_solver.py --all --crossover` put the break-even at
+# about 200 items, numpy losing on gp12's 181 and winning on zonaD6's 197 and
+# etI's 305. Below it -- every round but a full sweep's first, in practice --
+# the scalar rules run.
+BULK_THRESHOLD = 200
+
+
+class VectorBoard(SolverBoard):
+    """A SolverBoard that evaluates the vertex and clue rules for a whole queue
+    at once with numpy: the vectorized engine.
+
+    Each vertex's edges are a row of `vertex_matrix`, and each face's of
+    `face_matrix`, padded to the longest row with a sentinel edge that reads as
+    ruled out and so counts as neither filled nor unknown. Indexing the
+    position by a block of rows gives every item's edge states in one array,
+    from which the filled and unknown counts, the contradictions and the forced
+    edges all come by whole-array operations.
+
+    All the items see the position as it was before any of them fired, where
+    the scalar rules see each other's deductions as they go. Both reach the
+    same fixed point, since the rules are monotone; the bulk pass just takes an
+    extra round. Two items forcing one edge both ways is a contradiction either
+    way.
+
+    Needs numpy, and is only registered as an engine where numpy imports.
+    """
+
+    def __init__(self, mesh):
+        super().__init__(mesh)
+        sentinel = len(self.edge_keys)
+        self.vertex_matrix = self._padded(self.vertex_edges, sentinel)
+        self.face_matrix = self._padded(self.face_edges, sentinel)
+        # The position, plus the sentinel's state, as numpy sees it.
+        self.states = np.full(sentinel + 1, RULED_OUT, dtype=np.uint8)
+
+    @staticmethod
+    def _padded(rows, sentinel):
+        matrix = np.full((len(rows), max(map(len, rows))), sentinel, dtype=np.intp)
+        for (i, row) in enumerate(rows):
+            matrix[i, :len(row)] = row
+        return matrix
+
+    def apply_clues(self, clues, num_clues):
+        super().apply_clues(clues, num_clues)
+        self.clue_vector = np.array([-1 if clue is None else clue for clue in self.clues],
+                                    dtype=np.intp)
+
+    def _vertex_rules(self, vertices):
+        if len(vertices) < BULK_THRESHOLD:
+            return super()._vertex_rules(vertices)
+        rows = np.fromiter(vertices, dtype=np.intp, count=len(vertices))
+        (edges, filled, unknown) = self._counts(self.vertex_matrix, rows)
+        u = unknown.sum(axis=1)
+        if ((filled > 2) | ((filled == 1) & (u == 0))).any():
+            return False
+        fill = (filled == 1) & (u == 1)
+        rule_out = ((filled == 2) & (u >= 1)) | ((filled == 0) & (u == 1))
+        return self._force(edges, unknown, fill, rule_out)
+
+    def _clue_rules(self, faces):
+        if len(faces) < BULK_THRESHOLD:
+            return super()._clue_rules(faces)
+        rows = np.fromiter(faces, dtype=np.intp, count=len(faces))
+        (edges, filled, unknown) = self._counts(self.face_matrix, rows)
+        n = self.clue_vector[rows]
+        u = unknown.sum(axis=1)
+        if ((filled > n) | (filled + u < n)).any():
+            return False
+        rule_out = (filled == n) & (u >= 1)
+        fill = (filled + u == n) & (u >= 1)
+        return self._force(edges, unknown, fill, rule_out)
+
+    def _counts(self, matrix, rows):
+        """(edges, filled, unknown) for these rows of an incidence matrix: the
+        rows' edges, each row's filled count, and which of its edges are
+        unknown."""
+        self.states[:-1] = np.frombuffer(self.guesses, dtype=np.uint8)
+        edges = matrix[rows]
+        states = self.states[edges]
+        return (edges, (states == FILLED).sum(axis=1), states == UNKNOWN)
+
+    def _force(self, edges, unknown, fill, rule_out):
+        """Set the unknown edges of the `fill` rows FILLED and those of the
+        `rule_out` rows RULED_OUT, on the trail. False if some edge is in
+        both."""
+        to_fill = np.unique(edges[fill][unknown[fill]])
+        to_rule_out = np.unique(edges[rule_out][unknown[rule_out]])
+        if np.intersect1d(to_fill, to_rule_out, assume_unique=True).size:
+            return False
+        guesses = self.guesses
+        for (forced, state) in ((to_fill.tolist(), FILLED),
+                                (to_rule_out.tolist(), RULED_OUT)):
+            for e in forced:
+                guesses[e] = state
+            self.trail.extend(forced)
+        return True
+
+
+# The engines, by name, each as what to pass the public functions in place of a
+# mesh: 'mesh' is the mesh itself, the reference engine, 'board' the
+# array-backed one, 'bits' the board with bitmask local rules, and 'numpy' the
+# board with vectorized ones, where numpy is installed.
+ENGINES = {
+    'mesh': lambda mesh: mesh,
+    'board': SolverBoard,
+    'bits': BitBoard,
+}
+if np is not None:
+    ENGINES['numpy'] = VectorBoard
+
+
+class Solver:
+    """One grid's solver, built once and asked about any number of clue sets.
+
+    The free functions above take a mesh or a board and a clue set on every
+    call, and on a mesh they write 'guess' and 'clue' into it as they go, so
+    two questions can't share one. A Solver holds its own engine, built from
+    the mesh once: on a board engine, the topology index SolverBoard builds
+    (face_edges_at_vertex's corners included), which later calls reuse and
+    nothing writes to. The mesh is not kept and is never touched again. The
+    'mesh' engine is the exception: it is the mesh, and does what the free
+    functions do to it.
+
+    Picklable on a board engine, and cheaply so -- the board leaves its
+    propagation memo behind (see SolverBoard.__getstate__) -- so a Solver can
+    be handed to worker processes whole, each of which then asks its own copy.
+    """
+
+    def __init__(self, mesh, engine='board'):
+        self.engine = engine
+        self.board = ENGINES[engine](mesh)
+
+    def deduce(self, clues, depth=1):
+        """solvable_by_deduction for these (face, num_walls) clues."""
+        return solvable_by_deduction(self.board, clues, len(clues), depth)
+
+    def is_unique(self, clues, solution, **options):
+        """solution_is_unique for these clues and this solution, a loop of
+        vertex keys; `options` are solution_is_unique's keyword arguments."""
+        return solution_is_unique(clues, len(clues), solution, self.board, None, **options)
+
+    def solve(self, clues, time_budget=None):
+        """A loop meeting these clues, as a list of vertex keys in order around
+        it, like the solutions in a puzzles file; or None if there is none, or
+        time_budget seconds weren't enough to find one."""
+        deadline = None if time_budget is None else time.monotonic() + time_budget
+        board = self.board
+        reset_guesses(board)
+        apply_clues(clues, len(clues), board)
+
+        def search():
+            """True once the position is a solution; None when out of time."""
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            if not propagate_constraints(board, clues, len(clues)):
+                return False
+            if is_complete_solution(board):
+                return is_valid_loop(board)
+            edge = select_edge_for_branching(board)
+            if edge is None:
+                return False
+            saved = save_state(board)
+            for guess in ('filledIn', 'ruledOut'):
+                set_guess(board, edge, guess)
+                found = search()
+                if found is not False:
+                    return found
+                restore_state(board, saved)
+            return False
+
+        return self._loop() if search() else None
+
+    def _loop(self):
+        """The filled edges of a complete position, walked as a vertex loop."""
+        board = self.board
+        if isinstance(board, SolverBoard):
+            edges = [board.edge_keys[e] for (e, state) in enumerate(board.guesses)
+                     if state == FILLED]
+        else:
+            edges = [ekey for ekey in board.edges()
+                     if board.edge_attribute(ekey, 'guess') == 'filledIn']
+        neighbors = {}
+        for (u, v) in edges:
+            neighbors.setdefault(u, []).append(v)
+            neighbors.setdefault(v, []).append(u)
+        loop = [edges[0][0]]
+        previous = None
+        while True:
+            (a, b) = neighbors[loop[-1]]
+            following = b if a == previous else a
+            if following == loop[0]:
+                return loop
+            previous = loop[-1]
+            loop.append(following)
+
+    def prefixes(self, clues, depth=1):
+        """A PrefixDeduction of these clues on this Solver's engine. It keeps
+        its position on the engine between calls, so it is the only thing to
+        ask the Solver while in use."""
+        return PrefixDeduction(self.board, clues, depth)
+
+
+class PrefixDeduction:
+    """solvable_by_deduction for the prefixes of one clue list, each
+    warm-started from the last one found wanting.
+
+    Called with n, answers for the first n clues, as solvable_by_deduction(
+    mesh, clues, n, depth) would -- but not from a blank board. Everything
+    deduced from a prefix still holds once clues are added to it, so the
+    position deduced for the longest prefix known to fail is kept, and a
+    longer prefix starts there: only what its added clues change is worked
+    out. A shorter prefix can't fail to fail, and is answered without looking.
+
+    That suits both min_prefix_satisfying, whose probes fail upward from the
+    low end, and asking n = 1, 2, 3... in turn, where every call adds a clue to
+    the last: one pass, each step paying only for what its clue adds.
+
+    The positions of the failing prefixes are kept too, each on top of the one
+    before, and they are what keeping() answers for any subset of the clues
+    from: the deductions a clue can have justified are exactly those made since
+    it was added. See keeping.
+
+    The clue list may grow between calls, for a caller that picks each next
+    clue by what the last prefix left undeduced: after a call that fails, the
+    position is that prefix's, until the next call.
+
+    Takes a mesh or a SolverBoard, and works it between calls; nothing else
+    should use it meanwhile.
+    """
+
+    def __init__(self, mesh, clues, depth=1):
+        self.mesh = mesh
+        self.clues = clues
+        self.depth = depth
+        # The longest prefix known to fail.
+        self.failed = 0
+        reset_guesses(mesh)
+        # (n, the position deduced from the first n clues) for failing
+        # prefixes, shortest first; each was deduced from the one before it.
+        self.bases = [(0, save_state(mesh))]
+
+    def __call__(self, num_clues):
+        if num_clues <= self.failed:
+            return False
+        mesh = self.mesh
+        restore_state(mesh, self.bases[-1][1])
+        apply_clues(self.clues, num_clues, mesh)
+        if not propagate_with_lookahead(mesh, self.clues, num_clues, self.depth):
+            # Contradictory clues: no longer prefix does better. The position
+            # is no use to them, though, so keep the one before it.
+            self.failed = len(self.clues)
+            return False
+        if is_complete_solution(mesh) and is_valid_loop(mesh):
+            return True
+        self.failed = num_clues
+        self.bases.append((num_clues, save_state(mesh)))
+        return False
+
+    def keeping(self, kept):
+        """Whether the clues at these indices, ascending, are solvable by
+        deduction.
+
+        The truth maintenance for dropping clues. Whatever was deduced before a
+        clue was added can't depend on it, so leaving clues out retracts only
+        what was deduced since the first of them went in: the start is the
+        position of the longest failing prefix that `kept` holds whole, and from
+        there the rest of `kept` is worked out afresh. A position kept for a
+        longer prefix is dropped on the way, being built on a clue left out --
+        so it pays to drop clues from the end of the list first, as prune_clues
+        in genSliPuzzles does.
+        """
+        whole = next((i for (i, k) in enumerate(kept) if i != k), len(kept))
+        bases = self.bases
+        while bases[-1][0] > whole:
+            bases.pop()
+        mesh = self.mesh
+        restore_state(mesh, bases[-1][1])
+        clues = [self.clues[k] for k in kept]
+        apply_clues(clues, len(clues), mesh)
+        return (propagate_with_lookahead(mesh, clues, len(clues), self.depth)
+                and is_complete_solution(mesh) and is_valid_loop(mesh))
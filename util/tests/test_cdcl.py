@@ -0,0 +1,135 @@
+"""Unit tests for cdcl.py, the clause-learning uniqueness search.
+
+Its answers are held to slisolver's own: the same questions on the same small
+meshes, and the stored puzzles on the all-triangle solids it exists for.
+"""
+import json
+from pathlib import Path
+
+import pytest
+from compas.datastructures import Mesh
+
+from cdcl import ClauseSolver, luby, solution_is_unique
+from slisolver import FILLED, SolverBoard
+import slisolver
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+@pytest.fixture
+def cube():
+    """Unit cube: faces 0 bottom [0,3,2,1], 1 top [4,5,6,7], 2 front
+    [0,1,5,4], 3 right, 4 back [2,3,7,6], 5 left."""
+    vertices = [
+        [0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+        [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1],
+    ]
+    faces = [
+        [0, 3, 2, 1], [4, 5, 6, 7], [0, 1, 5, 4],
+        [1, 2, 6, 5], [2, 3, 7, 6], [3, 0, 4, 7],
+    ]
+    return Mesh.from_vertices_and_faces(vertices, faces)
+
+
+def load(stem):
+    """(mesh, puzzles file) for a grid in data/."""
+    grid = json.loads((REPO_ROOT / 'data' / f'{stem}.json').read_text())
+    mesh = Mesh.from_vertices_and_faces(grid['vertices'], grid['faces'])
+    return (mesh, json.loads((REPO_ROOT / 'data' / f'{stem}-puzzles.json').read_text()))
+
+
+def clue_list(puzzle):
+    return [(face, n) for (face, n) in enumerate(puzzle['clues']) if n != -1]
+
+
+def test_luby_sequence():
+    assert [luby(i) for i in range(1, 16)] == [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+
+
+class TestClauseSolver:
+
+    def test_every_loop_on_the_cube(self, cube):
+        """With no clues, blocking each model in turn lists every cycle of the
+        cube's graph, of which there are 28 -- so each model was a single loop,
+        and none came up twice."""
+        solver = ClauseSolver(cube)
+        models = set()
+        while solver.solve():
+            model = frozenset(solver.model())
+            assert model not in models
+            models.add(model)
+            solver.block(model)
+        assert len(models) == 28
+
+    def test_a_model_meets_the_clues(self, cube):
+        solver = ClauseSolver(cube)
+        solver.apply_clues([(2, 3), (0, 1)], 2)
+        assert solver.solve()
+        board = SolverBoard(cube)
+        for e in solver.model():
+            board.assign(e, FILLED)
+        assert board.is_valid_loop()
+        assert sum(board.guesses[e] == FILLED for e in board.face_edges[2]) == 3
+        assert sum(board.guesses[e] == FILLED for e in board.face_edges[0]) == 1
+
+    def test_two_separate_loops_are_not_a_model(self, cube):
+        solver = ClauseSolver(cube)
+        solver.apply_clues([(0, 4), (1, 4)], 2)
+        assert not solver.solve()
+
+
+class TestSolutionIsUnique:
+    """The cube cases slisolver's own tests ask of its search."""
+
+    @pytest.mark.parametrize(('clues', 'solution', 'unique'), [
+        ([(0, 4), (1, 0)], [0, 3, 2, 1], True),
+        ([(2, 0)], [2, 3, 7, 6], True),
+        ([(0, 4), (1, 4)], [0, 3, 2, 1], False),
+        ([], [0, 3, 2, 1], False),
+    ])
+    @pytest.mark.parametrize('directed', [False, True])
+    def test_agrees_with_the_search(self, cube, clues, solution, unique, directed):
+        assert solution_is_unique(clues, len(clues), solution, cube, None,
+                                  directed=directed) is unique
+        assert slisolver.solution_is_unique(clues, len(clues), solution, cube, None) is unique
+
+    def test_directed_refuses_a_known_loop_that_breaks_a_clue(self, cube):
+        assert solution_is_unique([(2, 0)], 1, [0, 3, 2, 1], cube, None, directed=True) is False
+
+    def test_exhausted_time_budget_returns_false(self, cube):
+        assert solution_is_unique([(0, 4), (1, 0)], 2, [0, 3, 2, 1], cube, None,
+                                  time_budget=0) is False
+
+    def test_exhausted_node_budget_returns_false(self):
+        """The cube's cases need no decisions at all, so a puzzle that does."""
+        (mesh, data) = load('dtC')
+        puzzle = data['puzzles'][0]
+        clues = clue_list(puzzle)
+        assert solution_is_unique(clues, len(clues), puzzle['solution'], mesh, None,
+                                  node_budget=0) is False
+
+
+@pytest.mark.parametrize('stem', ['dtC', 'dtD', 'dbD'])
+def test_all_triangle_puzzles_are_unique(stem):
+    """The solids genLoosePuzzle.py exists for: the stored puzzles, and the same
+    with a few clues dropped, which admit other loops."""
+    (mesh, data) = load(stem)
+    for puzzle in data['puzzles']:
+        clues = clue_list(puzzle)
+        assert solution_is_unique(clues, len(clues), puzzle['solution'], mesh, None,
+                                  time_budget=20)
+        fewer = clues[::2]
+        assert solution_is_unique(fewer, len(fewer), puzzle['solution'], mesh, None,
+                                  time_budget=20) \
+            == slisolver.solution_is_unique(fewer, len(fewer), puzzle['solution'],
+                                            SolverBoard(mesh), None, time_budget=20)
+
+
+def test_proves_gp12_display_puzzle_in_budget():
+    """The one stored puzzle the data/ sweep skips, since chronological search
+    exceeds 300 s on it (see SKIP_UNIQUENESS in test_data_puzzles.py)."""
+    (mesh, data) = load('gp12')
+    puzzle = data['displayPuzzles'][0]
+    clues = clue_list(puzzle)
+    assert solution_is_unique(clues, len(clues), puzzle['solution'], mesh, None,
+                              time_budget=20)
@@ -21,7 +21,7 @@ import pytest
 from compas.datastructures import Mesh
 
 import grid_topology
-from slisolver import solution_is_unique
+from slisolver import solution_is_unique, solution_is_unique_parallel
 
 DATA_DIR = Path(__file__).resolve().parent.parent.parent / 'data'
 
@@ -37,11 +37,8 @@ TIME_BUDGET_SECONDS = 300
 # solution BY DEDUCTION, which implies uniqueness, and it discards any clue set
 # whose check times out rather than shipping it unproven.
 SKIP_UNIQUENESS = {
-    # 210 edges, the largest grid we have; the three playable puzzles on it pass
-    # in well under the budget, but re-proving this one from its stored clues
-    # runs long. Raising the budget for the whole sweep to cover one case would
-    # cost more than it's worth.
-    'gp12-display0': 'the check exceeds the time budget on a 210-edge grid',
+    # Empty since the parity equations (slisolver.apply_xor_rules): gp12-display0,
+    # 210 edges, used to exceed the budget here and now takes under a second.
 }
 
 
@@ -99,6 +96,19 @@ def test_puzzle_solution_is_unique(grid_path, puzzles_path, key, index):
                     f'(or exceeded the {TIME_BUDGET_SECONDS}s time budget)')
 
 
+@pytest.mark.slow
+def test_the_hardest_puzzle_is_unique_in_parallel():
+    """gp12-display0, the one puzzle the sweep above once had to skip, proved
+    by solution_is_unique_parallel across every CPU -- its acceptance case,
+    and a check of the work-stealing search on the biggest tree in data/."""
+    grid = json.loads((DATA_DIR / 'gp12.json').read_text())
+    mesh = Mesh.from_vertices_and_faces(grid['vertices'], grid['faces'])
+    puzzle = json.loads((DATA_DIR / 'gp12-puzzles.json').read_text())['displayPuzzles'][0]
+    clues = [(face, n) for (face, n) in enumerate(puzzle['clues']) if n != -1]
+    assert solution_is_unique_parallel(clues, len(clues), puzzle['solution'], mesh, None,
+                                       time_budget=TIME_BUDGET_SECONDS)
+
+
 def loop_edges(solution):
     """A loop's edges, as frozensets so direction and starting point don't
     matter."""
@@ -8,6 +8,9 @@ Strategy:
 """
 import json
 import os
+import random
+import time
+from pathlib import Path
 
 # Select a non-interactive matplotlib backend BEFORE importing genSliPuzzles
 # (which imports matplotlib.pyplot), so the tests can't try to open a GUI
@@ -18,16 +21,22 @@ import pytest
 from compas.datastructures import Mesh
 
 import genSliPuzzles
+import slisolver
 from genSliPuzzles import (
     LOOKAHEAD_DEPTH,
     RegionColoring,
     blue,
     cut_clues,
+    first_prefix_satisfying,
     min_prefix_satisfying,
+    prune_clues,
     red,
+    undetermined_regions,
 )
 from slisolver import solvable_by_deduction
 
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+
 
 # --- helpers ---
 
@@ -130,6 +139,71 @@ class TestMinPrefixSatisfying:
         assert len(calls) <= 15, f"took {len(calls)} probes: {calls}"
 
 
+class TestFirstPrefixSatisfying:
+
+    def test_threshold_in_middle(self):
+        (pred, calls) = threshold_predicate(6)
+        assert first_prefix_satisfying(pred, 10) == 6
+        assert calls == [1, 2, 3, 4, 5, 6]
+
+    def test_never_satisfied_returns_none(self):
+        (pred, _) = threshold_predicate(float('inf'))
+        assert first_prefix_satisfying(pred, 10) is None
+
+    def test_n_total_zero_returns_none(self):
+        (pred, calls) = threshold_predicate(1)
+        assert first_prefix_satisfying(pred, 0) is None
+        assert calls == []
+
+
+class TestPruneClues:
+
+    class Needing:
+        """A fake PrefixDeduction: solvable whenever the clues kept include
+        every one of `needed`."""
+
+        def __init__(self, needed):
+            self.needed = set(needed)
+            self.calls = []
+
+        def keeping(self, kept):
+            self.calls.append(list(kept))
+            return self.needed <= set(kept)
+
+    def test_keeps_only_what_is_needed(self):
+        solvable = self.Needing({1, 4, 7})
+        assert prune_clues(solvable, 8) == [1, 4, 7]
+
+    def test_one_check_per_clue_but_the_last(self):
+        solvable = self.Needing({0, 2, 5})
+        prune_clues(solvable, 6)
+        assert len(solvable.calls) == 5
+
+    def test_the_last_clues_are_tried_first(self):
+        solvable = self.Needing({0, 1, 2, 3})
+        prune_clues(solvable, 4)
+        assert solvable.calls == [[0, 1, 3], [0, 2, 3], [1, 2, 3]]
+
+
+class TestUndeterminedRegions:
+
+    # A strip of four squares, 0-1-2-3, sharing edges 'ab', 'bc' and 'cd'.
+    FACE_EDGES = {0: ['a0', 'a1', 'a2', 'ab'], 1: ['ab', 'b1', 'b2', 'bc'],
+                  2: ['bc', 'c1', 'c2', 'cd'], 3: ['cd', 'd1', 'd2', 'd3']}
+
+    def test_faces_join_across_unknown_edges_only(self):
+        unknown = {'a0', 'ab', 'b1', 'c1', 'd1', 'd2'}
+        regions = undetermined_regions(self.FACE_EDGES, unknown)
+        assert regions == [{0, 1}, {3}, {2}]
+
+    def test_largest_by_unknown_edges_not_faces(self):
+        unknown = {'a0', 'ab', 'c1', 'cd', 'd1', 'd2', 'd3'}
+        assert undetermined_regions(self.FACE_EDGES, unknown)[0] == {2, 3}
+
+    def test_nothing_unknown_is_no_region(self):
+        assert undetermined_regions(self.FACE_EDGES, set()) == []
+
+
 # --- integration tests: cut_clues with the real solver on a cube ---
 
 # Vertex IDs of the cube's bottom face cycle, used as the known solution loop.
@@ -273,6 +347,7 @@ class TestDuplicateRejection:
         a cube with no puzzles recorded yet."""
         monkeypatch.setattr(genSliPuzzles, 'mesh', cube)
         monkeypatch.setattr(genSliPuzzles, 'symmetries_cache', None)
+        monkeypatch.setattr(genSliPuzzles, 'kept_by_census', {})
         monkeypatch.setattr(genSliPuzzles, 'puzzles_output', {'puzzles': []})
 
     def test_finds_the_cubes_48_symmetries(self):
@@ -299,19 +374,19 @@ class TestDuplicateRejection:
         assert not genSliPuzzles.same_puzzle_up_to_symmetry(opposite, adjacent)
 
     def test_already_generated_rejects_a_rotation_of_a_kept_puzzle(self):
-        genSliPuzzles.puzzles_output['puzzles'].append(
+        genSliPuzzles.keep_puzzle(
             {'clues': [2, 1, -1, -1, -1, -1], 'solution': [0, 1, 2, 3]})
         assert genSliPuzzles.already_generated([-1, -1, 2, -1, 1, -1]) is True
 
     def test_already_generated_accepts_a_genuinely_new_puzzle(self):
-        genSliPuzzles.puzzles_output['puzzles'].append(
+        genSliPuzzles.keep_puzzle(
             {'clues': [2, 1, -1, -1, -1, -1], 'solution': [0, 1, 2, 3]})
         assert genSliPuzzles.already_generated([2, -1, 1, -1, -1, -1]) is False
 
     def test_a_differing_census_skips_the_symmetry_scan(self, monkeypatch):
         """The census is the cheap pre-filter: when it differs, no symmetry could
-        relate the two, so the group is never even computed."""
-        genSliPuzzles.puzzles_output['puzzles'].append(
+        relate the two, so the candidate is never even hashed."""
+        genSliPuzzles.keep_puzzle(
             {'clues': [2, 1, -1, -1, -1, -1], 'solution': [0, 1, 2, 3]})
 
         def fail_if_called():
@@ -320,6 +395,48 @@ class TestDuplicateRejection:
 
         assert genSliPuzzles.already_generated([3, 3, 3, -1, -1, -1]) is False
 
+    def test_the_canonical_hash_names_the_puzzle_not_the_view(self):
+        """Every one of a puzzle's 48 images hashes alike, and a different
+        puzzle with the same census doesn't."""
+        puzzle = [2, 1, -1, -1, -1, -1]
+        images = []
+        for sigma in genSliPuzzles.face_symmetries():
+            image = [-1] * 6
+            for fkey, clue in enumerate(puzzle):
+                image[sigma[fkey]] = clue
+            images.append(image)
+        assert {genSliPuzzles.canonical_hash(image) for image in images} == {
+            genSliPuzzles.canonical_hash(puzzle)}
+        assert (genSliPuzzles.canonical_hash([2, -1, 1, -1, -1, -1])
+                != genSliPuzzles.canonical_hash(puzzle))
+
+    def test_trailing_blanks_dont_change_the_hash(self):
+        """The format lets a clue list stop short of the last face."""
+        assert (genSliPuzzles.canonical_hash([2, 1])
+                == genSliPuzzles.canonical_hash([2, 1, -1, -1, -1, -1]))
+
+    def test_a_stored_hash_is_used_rather_than_recomputed(self):
+        """What lets an --existing top-up skip hashing the puzzles it keeps. The
+        stored value here is made up, so matching it proves it was read."""
+        genSliPuzzles.keep_puzzle(
+            {'clues': [2, 1, -1, -1, -1, -1], 'solution': [0, 1, 2, 3],
+             'canonical': 'made-up'})
+        assert genSliPuzzles.already_generated([2, -1, 1, -1, -1, -1],
+                                               'made-up') is True
+
+    def test_a_kept_puzzle_without_a_hash_gets_one(self):
+        kept = {'clues': [2, 1, -1, -1, -1, -1], 'solution': [0, 1, 2, 3]}
+        genSliPuzzles.keep_puzzle(kept)
+        assert kept['canonical'] == genSliPuzzles.canonical_hash(kept['clues'])
+
+    def test_the_check_looks_up_the_index_not_the_lists(self, monkeypatch):
+        """Which is what keeps it from growing with the number of puzzles kept:
+        with the lists emptied behind its back, the index still knows."""
+        genSliPuzzles.keep_puzzle(
+            {'clues': [2, 1, -1, -1, -1, -1], 'solution': [0, 1, 2, 3]})
+        monkeypatch.setattr(genSliPuzzles, 'puzzles_output', {'puzzles': []})
+        assert genSliPuzzles.already_generated([-1, -1, 2, -1, 1, -1]) is True
+
 
 class TestBackendCanDisplay:
     """What gates the progress redraws. Getting this wrong either wastes most of
@@ -367,28 +484,21 @@ class TestCutClues:
         walls = num_walls_by_face(cube, BOTTOM_LOOP)
         assert walls == {0: 4, 1: 0, 2: 1, 3: 1, 4: 1, 5: 1}
 
-    def test_high_info_ordering_needs_two_clues(self, cube_with_bottom_loop):
-        """Bottom clue (4) first, top clue (0) second: two clues.
+    def test_high_info_ordering_needs_one_clue(self, cube_with_bottom_loop):
+        """Bottom clue (4) first: one clue.
 
         The bottom's clue 4 forces all four bottom edges, and the vertex rule
-        then rules out the verticals — but that leaves the four top edges
-        undecided. Ruling them out needs "there must be only ONE loop", which
-        none of our propagation rules encode yet: the solver only checks it in
-        is_valid_loop, once an assignment is complete. Players DO reason with
-        it ("filling that would close the loop early, leaving clues
-        unsatisfied, so it must be ruled out"), so this is a gap in our rule
-        set rather than a fact that is off-limits — see the TODO about adding
-        it as a rule. For now the top's clue 0 settles those edges directly,
-        so the answer is 2.
-
-        Under the older, uniqueness-only test this ordering needed just 1
-        clue: the two-loop alternative was eliminated by is_valid_loop at the
-        end of a search, not by deduction. That is the difference this change
-        is about.
+        then rules out the verticals. That leaves the four top edges, which
+        the single-loop rule settles: the bottom is already a closed loop, so
+        it is the whole solution and nothing else can be filled. Players
+        reason this way all the time ("filling that would make a second
+        loop"). Before apply_loop_rules the solver only checked it in
+        is_valid_loop, once an assignment was complete, and this ordering
+        needed the top's clue 0 as well.
         """
         walls = num_walls_by_face(cube_with_bottom_loop, BOTTOM_LOOP)
         ordering = [(f, walls[f]) for f in [0, 1, 2, 3, 4, 5]]
-        assert cut_clues(cube_with_bottom_loop, ordering) == 2
+        assert cut_clues(cube_with_bottom_loop, ordering) == 1
 
     def test_result_is_deducible_and_minimal(self, cube_with_bottom_loop):
         """Whatever count cut_clues returns, that prefix must be solvable by
@@ -413,6 +523,172 @@ class TestCutClues:
         ordering = [(f, walls[f]) for f in [2, 3, 4, 5, 0, 1]]
         assert cut_clues(cube_with_bottom_loop, ordering) == 5
 
+    @pytest.mark.parametrize('engine', list(slisolver.ENGINES))
+    def test_every_engine_cuts_alike(self, cube_with_bottom_loop, monkeypatch, engine):
+        """--engine picks how fast cut_clues runs, never what it answers."""
+        walls = num_walls_by_face(cube_with_bottom_loop, BOTTOM_LOOP)
+        for order in ([0, 1, 2, 3, 4, 5], [2, 3, 4, 5, 0, 1]):
+            ordering = [(f, walls[f]) for f in order]
+            monkeypatch.setattr(genSliPuzzles, 'solver_engine', 'board')
+            expected = cut_clues(cube_with_bottom_loop, ordering)
+            monkeypatch.setattr(genSliPuzzles, 'solver_engine', engine)
+            assert cut_clues(cube_with_bottom_loop, ordering) == expected
+
+    def test_a_prefix_to_beat_is_only_looked_for_below_it(self, cube_with_bottom_loop):
+        walls = num_walls_by_face(cube_with_bottom_loop, BOTTOM_LOOP)
+        ordering = [(f, walls[f]) for f in [2, 3, 4, 5, 0, 1]]
+        assert cut_clues(cube_with_bottom_loop, ordering, to_beat=lambda: 6) == 5
+        assert cut_clues(cube_with_bottom_loop, ordering, to_beat=lambda: 5) is None
+
+    def test_a_straggler_gives_up_only_with_something_to_beat(self, cube_with_bottom_loop):
+        walls = num_walls_by_face(cube_with_bottom_loop, BOTTOM_LOOP)
+        ordering = [(f, walls[f]) for f in [2, 3, 4, 5, 0, 1]]
+        past = time.monotonic() - 1
+        assert cut_clues(cube_with_bottom_loop, ordering, to_beat=lambda: 6,
+                         deadline=past) is None
+        assert cut_clues(cube_with_bottom_loop, ordering, to_beat=lambda: 7,
+                         deadline=past) == 5
+
+    def test_cutting_linearly_cuts_alike(self, cube_with_bottom_loop, monkeypatch):
+        walls = num_walls_by_face(cube_with_bottom_loop, BOTTOM_LOOP)
+        for order in ([0, 1, 2, 3, 4, 5], [2, 3, 4, 5, 0, 1], [1, 2, 0, 3, 4, 5]):
+            ordering = [(f, walls[f]) for f in order]
+            expected = cut_clues(cube_with_bottom_loop, ordering)
+            monkeypatch.setattr(genSliPuzzles, 'CUT_LINEARLY', True)
+            assert cut_clues(cube_with_bottom_loop, ordering) == expected
+            monkeypatch.setattr(genSliPuzzles, 'CUT_LINEARLY', False)
+
+
+class TestGenerateMinimalClueset:
+
+    @pytest.fixture
+    def dodecahedron_with_a_loop(self):
+        """The dodecahedron of data/D.json, with its first puzzle's loop as
+        the established solution: each face's num_walls set from it."""
+        grid = json.loads((REPO_ROOT / 'data' / 'D.json').read_text())
+        mesh = Mesh.from_vertices_and_faces(grid['vertices'], grid['faces'])
+        solution = json.loads((REPO_ROOT / 'data' / 'D-puzzles.json').read_text()
+                              )['puzzles'][0]['solution']
+        for (fkey, walls) in num_walls_by_face(mesh, solution).items():
+            mesh.face_attribute(fkey, 'num_walls', walls)
+        return mesh
+
+    def test_the_clues_are_deducible(self, dodecahedron_with_a_loop):
+        random.seed(1)
+        clues = genSliPuzzles.generate_minimal_clueset(dodecahedron_with_a_loop,
+                                                       orderings=3, workers=1)
+        face_clues = [(f, n) for (f, n) in enumerate(clues) if n != -1]
+        assert solvable_by_deduction(dodecahedron_with_a_loop, face_clues, len(face_clues),
+                                     depth=LOOKAHEAD_DEPTH)
+
+    def test_pruned_clues_are_minimal(self, dodecahedron_with_a_loop, monkeypatch):
+        for prune in (False, True):
+            monkeypatch.setattr(genSliPuzzles, 'PRUNE_CLUES', prune)
+            random.seed(4)
+            clues = genSliPuzzles.generate_minimal_clueset(dodecahedron_with_a_loop,
+                                                           orderings=2, workers=1)
+            face_clues = [(f, n) for (f, n) in enumerate(clues) if n != -1]
+            dispensable = [solvable_by_deduction(dodecahedron_with_a_loop,
+                                                 face_clues[:i] + face_clues[i + 1:],
+                                                 len(face_clues) - 1, depth=LOOKAHEAD_DEPTH)
+                           for i in range(len(face_clues))]
+            if prune:
+                assert not any(dispensable)
+                assert len(face_clues) <= unpruned
+            unpruned = len(face_clues)
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_pruning_starts_from_the_failed_prefixes(self, dodecahedron_with_a_loop,
+                                                     monkeypatch, workers):
+        """Not from a blank board, for every check, as it would from a fresh
+        PrefixDeduction of the winning ordering."""
+        bases = []
+
+        def spy(solvable, num_clues):
+            bases.append([n for (n, _) in solvable.bases])
+            return prune_clues(solvable, num_clues)
+
+        monkeypatch.setattr(genSliPuzzles, 'PRUNE_CLUES', True)
+        monkeypatch.setattr(genSliPuzzles, 'prune_clues', spy)
+        random.seed(4)
+        try:
+            genSliPuzzles.generate_minimal_clueset(dodecahedron_with_a_loop,
+                                                   orderings=2, workers=workers)
+        finally:
+            genSliPuzzles.stop_cutting_pool()
+        [found] = bases
+        assert found[0] == 0 and len(found) > 1
+
+    def test_stall_placed_clues_are_deducible_and_minimal(self, dodecahedron_with_a_loop,
+                                                          monkeypatch):
+        monkeypatch.setattr(genSliPuzzles, 'clue_placement', 'stalls')
+        random.seed(5)
+        clues = genSliPuzzles.generate_minimal_clueset(dodecahedron_with_a_loop)
+        face_clues = [(f, n) for (f, n) in enumerate(clues) if n != -1]
+        assert solvable_by_deduction(dodecahedron_with_a_loop, face_clues, len(face_clues),
+                                     depth=LOOKAHEAD_DEPTH)
+        assert not any(solvable_by_deduction(dodecahedron_with_a_loop,
+                                             face_clues[:i] + face_clues[i + 1:],
+                                             len(face_clues) - 1, depth=LOOKAHEAD_DEPTH)
+                       for i in range(len(face_clues)))
+
+    def test_stall_placement_can_start_from_nothing(self, dodecahedron_with_a_loop):
+        random.seed(6)
+        placed = genSliPuzzles.place_clues(dodecahedron_with_a_loop, start=0)
+        assert solvable_by_deduction(dodecahedron_with_a_loop, placed, len(placed),
+                                     depth=LOOKAHEAD_DEPTH)
+
+    def test_more_orderings_need_no_more_clues(self, dodecahedron_with_a_loop):
+        counts = []
+        for orderings in (1, 6):
+            random.seed(2)
+            clues = genSliPuzzles.generate_minimal_clueset(dodecahedron_with_a_loop,
+                                                           orderings, workers=1)
+            counts.append(sum(n != -1 for n in clues))
+        assert counts[1] <= counts[0]
+
+    @pytest.mark.parametrize('seed', [3, 7])
+    def test_workers_find_the_same_clues(self, dodecahedron_with_a_loop, seed):
+        """The first of the shortest orderings wins a tie, not whichever worker
+        finishes first, so a fixed seed gives the same puzzle either way."""
+        found = []
+        for workers in (1, 2):
+            random.seed(seed)
+            found.append(genSliPuzzles.generate_minimal_clueset(dodecahedron_with_a_loop,
+                                                                orderings=6,
+                                                                workers=workers))
+        assert found[0] == found[1]
+        genSliPuzzles.stop_cutting_pool()
+
+    def test_calls_share_one_pool(self, dodecahedron_with_a_loop):
+        try:
+            pools = []
+            for seed in (3, 7):
+                random.seed(seed)
+                genSliPuzzles.generate_minimal_clueset(dodecahedron_with_a_loop,
+                                                       orderings=2, workers=2)
+                pools.append(genSliPuzzles.pool_cache[1])
+            assert pools[0] is pools[1]
+        finally:
+            genSliPuzzles.stop_cutting_pool()
+        assert genSliPuzzles.pool_cache is None
+
+    def test_a_worker_reports_a_tie_with_the_bound(self, dodecahedron_with_a_loop,
+                                                   monkeypatch):
+        """Without which an earlier ordering that only ties a later one finished
+        first would go unreported, and the later one would win."""
+        import multiprocessing
+        for name in ('_cutter_solver', '_cutter_bound', 'LOOKAHEAD_DEPTH',
+                     'CUT_LINEARLY', 'VERBOSITY'):
+            monkeypatch.setattr(genSliPuzzles, name, getattr(genSliPuzzles, name))
+        random.seed(8)
+        ordering = genSliPuzzles.random_face_ordering(dodecahedron_with_a_loop)
+        needed = genSliPuzzles.cut_clues(dodecahedron_with_a_loop, ordering)
+        genSliPuzzles._start_cutter(genSliPuzzles.grid_solver(dodecahedron_with_a_loop),
+                                    multiprocessing.Value('i', needed), LOOKAHEAD_DEPTH,
+                                    False, genSliPuzzles.VERBOSITY)
+        assert genSliPuzzles._cut_in_worker(ordering)[0] == needed
+
 
 class TestDisplayPuzzles:
     """Display puzzles go in their own list, but they are still puzzles: they
@@ -429,21 +705,24 @@ class TestDisplayPuzzles:
         mesh and output, so point them at a cube with nothing kept yet."""
         monkeypatch.setattr(genSliPuzzles, 'mesh', cube)
         monkeypatch.setattr(genSliPuzzles, 'symmetries_cache', None)
+        monkeypatch.setattr(genSliPuzzles, 'kept_by_census', {})
         monkeypatch.setattr(genSliPuzzles, 'puzzles_output', {'gridId': 'C',
                                                              'puzzles': []})
         monkeypatch.setattr(genSliPuzzles, 'display_puzzles', [])
 
     def test_display_puzzles_count_as_generated_too(self, cube):
         """A second display puzzle mustn't repeat the first one either, so
-        already_generated has to see both lists."""
-        genSliPuzzles.display_puzzles.append(
-            {'clues': [4, -1, -1, -1, -1, -1], 'solution': BOTTOM_LOOP})
+        keep_puzzle files display puzzles in the same index."""
+        genSliPuzzles.keep_puzzle(
+            {'clues': [4, -1, -1, -1, -1, -1], 'solution': BOTTOM_LOOP},
+            display=True)
+        assert genSliPuzzles.display_puzzles
         assert genSliPuzzles.already_generated([4, -1, -1, -1, -1, -1]) is True
 
     def test_a_display_puzzle_must_differ_from_a_playable_one(self, cube):
         """And the other direction: display puzzles are generated last, so what
         they have to avoid is the playable list."""
-        genSliPuzzles.puzzles_output['puzzles'].append(
+        genSliPuzzles.keep_puzzle(
             {'clues': [2, 1, -1, -1, -1, -1], 'solution': BOTTOM_LOOP})
         # The same puzzle rotated a quarter turn (see TestDuplicateRejection).
         assert genSliPuzzles.already_generated([-1, -1, 2, -1, 1, -1]) is True
@@ -484,8 +763,11 @@ class TestLoadExistingPuzzles:
     """--existing=FILE keeps everything the file holds, both lists alike."""
 
     @pytest.fixture(autouse=True)
-    def empty_output(self, monkeypatch):
+    def empty_output(self, cube, monkeypatch):
         monkeypatch.setattr(genSliPuzzles, 'grid_id', 'C')
+        monkeypatch.setattr(genSliPuzzles, 'mesh', cube)
+        monkeypatch.setattr(genSliPuzzles, 'symmetries_cache', None)
+        monkeypatch.setattr(genSliPuzzles, 'kept_by_census', {})
         monkeypatch.setattr(genSliPuzzles, 'puzzles_output', {'gridId': 'C',
                                                              'puzzles': []})
         monkeypatch.setattr(genSliPuzzles, 'display_puzzles', [])
@@ -506,15 +788,31 @@ class TestLoadExistingPuzzles:
                    {'gridId': 'C', 'puzzles': [playable],
                     'displayPuzzles': [display]})
         genSliPuzzles.load_existing_puzzles()
-        assert genSliPuzzles.puzzles_output['puzzles'] == [playable]
-        assert genSliPuzzles.display_puzzles == [display]
+        assert [p['clues'] for p in genSliPuzzles.puzzles_output['puzzles']] == [
+            playable['clues']]
+        assert [p['clues'] for p in genSliPuzzles.display_puzzles] == [
+            display['clues']]
+
+    def test_every_kept_puzzle_leaves_with_a_canonical_hash(
+            self, tmp_path, monkeypatch):
+        """So the NEXT top-up of the file finds them all hashed already. A hash
+        the file came with is kept as it stands."""
+        unhashed = {'clues': [4, -1, -1, -1, -1, -1], 'solution': BOTTOM_LOOP}
+        hashed = {'clues': [-1, 0, -1, -1, -1, -1], 'solution': BOTTOM_LOOP,
+                  'canonical': 'from-the-file'}
+        self.write(tmp_path, monkeypatch,
+                   {'gridId': 'C', 'puzzles': [unhashed],
+                    'displayPuzzles': [hashed]})
+        genSliPuzzles.load_existing_puzzles()
+        assert genSliPuzzles.puzzles_output['puzzles'] == [
+            dict(unhashed, canonical=genSliPuzzles.canonical_hash(
+                unhashed['clues']))]
+        assert genSliPuzzles.display_puzzles == [hashed]
 
     def test_kept_display_puzzles_count_as_already_generated(
-            self, cube, tmp_path, monkeypatch):
-        """Or a new one could repeat the one being kept. already_generated reads
-        both lists, so adopting into display_puzzles is what makes this work."""
-        monkeypatch.setattr(genSliPuzzles, 'mesh', cube)
-        monkeypatch.setattr(genSliPuzzles, 'symmetries_cache', None)
+            self, tmp_path, monkeypatch):
+        """Or a new one could repeat the one being kept. Adopting it through
+        keep_puzzle files it where already_generated will look."""
         display = {'clues': [4, -1, -1, -1, -1, -1], 'solution': BOTTOM_LOOP}
         self.write(tmp_path, monkeypatch,
                    {'gridId': 'C', 'puzzles': [], 'displayPuzzles': [display]})
@@ -588,6 +886,15 @@ class TestDisplayOptions:
         with pytest.raises(SystemExit):
             self.run_args(monkeypatch, bad, 'data/cube.json')
 
+    def test_engine_choice(self, monkeypatch):
+        monkeypatch.setattr(genSliPuzzles, 'solver_engine', 'board')
+        self.run_args(monkeypatch, '--engine=mesh', 'data/cube.json')
+        assert genSliPuzzles.solver_engine == 'mesh'
+
+    def test_an_unknown_engine_is_refused(self, monkeypatch):
+        with pytest.raises(SystemExit):
+            self.run_args(monkeypatch, '--engine=abacus', 'data/cube.json')
+
     def test_an_unknown_option_is_still_refused(self, monkeypatch):
         """The new options are parsed by prefix, so make sure that didn't turn
         into "anything starting with -- is fine"."""
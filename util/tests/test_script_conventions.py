@@ -31,7 +31,7 @@ EXPECTED_SHEBANG = '#!/usr/bin/env python3'
 
 # Libraries: imported, never run. No shebang, not executable.
 LIBRARIES = {'grid_topology.py', 'grid_checks.py', 'polyhedron_shape.py',
-             'slisolver.py'}
+             'slisolver.py', 'cdcl.py'}
 
 
 def scripts():
@@ -6,6 +6,7 @@ Strategy:
     invokes the function under test.
 """
 import json
+import pickle
 import time
 from pathlib import Path
 
@@ -14,13 +15,23 @@ from compas.datastructures import Mesh
 
 REPO_ROOT = Path(__file__).resolve().parent.parent.parent
 
+import slisolver
 from slisolver import (
+    BRANCHING,
+    BitBoard,
+    ENGINES,
+    FILLED,
+    GUESS_NAMES,
+    RULED_OUT,
+    UNKNOWN,
     EdgeClauses,
     EdgePairing,
     FaceColoring,
     ParityRelation,
     apply_clue_rules,
     apply_clues,
+    apply_loop_rules,
+    apply_xor_rules,
     apply_color_rules,
     apply_pair_rules,
     apply_substitution,
@@ -36,11 +47,31 @@ from slisolver import (
     apply_vertex_rules,
     is_complete_solution,
     is_valid_loop,
+    known_guesses,
+    literal,
+    matches,
     propagate_constraints,
+    reset_guesses,
     restore_state,
     save_state,
+    Solver,
+    SolverBoard,
+    VectorBoard,
+    TrailedColoring,
+    face_edges_at_vertex,
+    propagate_with_lookahead,
     select_edge_for_branching,
+    search_piece,
     solution_is_unique,
+    solution_is_unique_parallel,
+    solution_is_unique_portfolio,
+    solution_is_unique_restarts,
+    solvable_by_deduction,
+    unknown_edges,
+    xor_assign,
+    xor_insert,
+    xor_relations,
+    xor_units,
 )
 
 
@@ -726,9 +757,10 @@ class TestPropagateConstraints:
         # Verticals (ruled out by vertex rule once each face-0 vertex has f=2):
         for e in [(0, 4), (1, 5), (2, 6), (3, 7)]:
             assert cube.edge_attribute(e, 'guess') == 'ruledOut'
-        # Top (no constraint reaches here, stays unknown):
+        # Top (ruled out by the single-loop rule: the bottom is a closed loop,
+        # so it is the whole solution):
         for e in [(4, 5), (5, 6), (6, 7), (7, 4)]:
-            assert cube.edge_attribute(e, 'guess') == 'unknown'
+            assert cube.edge_attribute(e, 'guess') == 'ruledOut'
 
     # 4. Vertex-rule fires first, then a clue rule fires using the new
     #    state, then vertex rules cascade further. Verifies multi-round
@@ -845,6 +877,189 @@ class TestSolutionIsUnique:
         result = solution_is_unique(clues, 0, solution, cube, None)
         assert result is False
 
+    def test_directed_agrees_on_a_unique_puzzle(self, cube):
+        clues = [(0, 4), (1, 0)]
+        assert solution_is_unique(clues, len(clues), [0, 3, 2, 1], cube, None,
+                                  directed=True) is True
+
+    def test_directed_finds_another_loop(self, cube):
+        assert solution_is_unique([], 0, [0, 3, 2, 1], cube, None,
+                                  directed=True) is False
+
+    def test_directed_refuses_a_known_loop_that_breaks_a_clue(self, cube):
+        # The back 4-cycle IS the only solution of a 0 on the front, but the
+        # bottom 4-cycle doesn't meet that clue, so it can't be unique.
+        clues = [(2, 0)]
+        assert solution_is_unique(clues, len(clues), [0, 3, 2, 1], cube, None,
+                                  directed=True) is False
+        assert solution_is_unique(clues, len(clues), [2, 3, 7, 6], cube, None,
+                                  directed=True) is True
+
+    def test_directed_refuses_a_known_loop_off_the_grid(self, cube):
+        # 0-2 is a diagonal of the bottom face, not an edge.
+        clues = [(0, 4), (1, 0)]
+        assert solution_is_unique(clues, len(clues), [0, 2, 1], cube, None,
+                                  directed=True) is False
+
+
+class TestNodeBudget:
+    """node_budget and stats: the search measured in nodes, which come out
+    the same on any machine."""
+
+    @pytest.mark.parametrize('search', [solution_is_unique, solution_is_unique_restarts])
+    def test_budget_of_exactly_the_nodes_needed(self, dodecahedron, dodec_puzzle, search):
+        (clues, solution) = dodec_puzzle
+        # Without its second clue, which leaves it unique but no longer settled
+        # at the first node, so there is a search to count.
+        clues = clues[:1] + clues[2:]
+        stats = {}
+        assert search(clues, len(clues), solution, SolverBoard(dodecahedron), None,
+                      stats=stats)
+        assert stats['nodes'] > 1 and stats['rounds'] >= stats['nodes']
+        assert search(clues, len(clues), solution, SolverBoard(dodecahedron), None,
+                      node_budget=stats['nodes'])
+        assert not search(clues, len(clues), solution, SolverBoard(dodecahedron), None,
+                          node_budget=stats['nodes'] - 1)
+
+
+class TestSolutionIsUniqueParallel:
+    """The parallel search gives solution_is_unique's answers, split or not."""
+
+    @pytest.mark.parametrize(('clues', 'solution', 'unique'), [
+        ([(0, 4), (1, 0)], [0, 3, 2, 1], True),
+        ([(0, 4), (1, 4)], [0, 3, 2, 1], False),
+        ([], [0, 3, 2, 1], False),
+    ])
+    def test_cube_in_one_piece(self, cube, clues, solution, unique):
+        assert solution_is_unique_parallel(clues, len(clues), solution, cube, None) is unique
+
+    @pytest.mark.parametrize('fraction', [1, 2])
+    def test_split_into_pieces(self, dodecahedron, dodec_puzzle, monkeypatch, fraction):
+        """Every other clue dropped admits other loops; all of them, one."""
+        monkeypatch.setattr(slisolver, 'SPLIT_NODES', 1)
+        (clues, solution) = dodec_puzzle
+        clues = clues[::fraction]
+        expected = solution_is_unique(clues, len(clues), solution, dodecahedron, None)
+        assert solution_is_unique_parallel(clues, len(clues), solution, dodecahedron, None,
+                                           workers=2) is expected
+
+    def test_exhausted_time_budget_returns_false(self, cube):
+        assert solution_is_unique_parallel([(0, 4), (1, 0)], 2, [0, 3, 2, 1], cube, None,
+                                           time_budget=0) is False
+
+    def test_search_piece_hands_back_what_it_has_not_searched(self, cube):
+        """Pieces handed back cover the rest of the tree: searching them finds
+        the cube's other loops, so with no clues there are two or more."""
+        board = SolverBoard(cube)
+        (found, pieces, out_of_time) = search_piece(board, [], None, node_limit=2)
+        assert not out_of_time and pieces
+        total = found
+        for piece in pieces:
+            total += search_piece(board, piece, None, node_limit=10 ** 6)[0]
+        assert total >= 2
+
+
+class TestSolutionIsUniqueRestarts:
+    """Restarted dives give solution_is_unique's answers, however short."""
+
+    @pytest.mark.parametrize(('clues', 'solution', 'unique'), [
+        ([(0, 4), (1, 0)], [0, 3, 2, 1], True),
+        ([(0, 4), (1, 4)], [0, 3, 2, 1], False),
+        ([], [0, 3, 2, 1], False),
+    ])
+    def test_cube(self, cube, clues, solution, unique):
+        assert solution_is_unique_restarts(clues, len(clues), solution, cube, None) is unique
+
+    @pytest.mark.parametrize('fraction', [1, 2, 3])
+    @pytest.mark.parametrize('seed', [0, 1])
+    def test_many_restarts(self, dodecahedron, dodec_puzzle, monkeypatch, fraction, seed):
+        """With dives of a node or two, the answer is put together from the
+        nogoods and loops of dozens of them."""
+        monkeypatch.setattr(slisolver, 'RESTART_NODES', 1)
+        (clues, solution) = dodec_puzzle
+        clues = clues[::fraction]
+        expected = solution_is_unique(clues, len(clues), solution, dodecahedron, None)
+        assert solution_is_unique_restarts(clues, len(clues), solution, dodecahedron, None,
+                                           seed=seed) is expected
+
+    def test_exhausted_time_budget_returns_false(self, cube):
+        assert solution_is_unique_restarts([(0, 4), (1, 0)], 2, [0, 3, 2, 1], cube, None,
+                                           time_budget=0) is False
+
+
+class TestSolutionIsUniquePortfolio:
+    """Every branching strategy, alone or raced, gives the same answers."""
+
+    @pytest.mark.parametrize('name', sorted(BRANCHING))
+    @pytest.mark.parametrize('fraction', [1, 2])
+    def test_each_strategy_agrees(self, dodecahedron, dodec_puzzle, name, fraction):
+        (clues, solution) = dodec_puzzle
+        clues = clues[::fraction]
+        expected = solution_is_unique(clues, len(clues), solution, dodecahedron, None)
+        assert solution_is_unique(clues, len(clues), solution, SolverBoard(dodecahedron),
+                                  None, branching=BRANCHING[name]()) is expected
+
+    def test_random_branching_repeats_itself(self, dodecahedron, dodec_puzzle):
+        """Each search gets its own generator, so the second search in a
+        process branches exactly as the first did."""
+        (clues, solution) = dodec_puzzle
+        clues = clues[::2]
+        runs = []
+        for _ in range(2):
+            stats = {}
+            solution_is_unique(clues, len(clues), solution, SolverBoard(dodecahedron), None,
+                               branching=BRANCHING['random'](), stats=stats)
+            runs.append(stats['nodes'])
+        assert runs[0] == runs[1]
+
+    @pytest.mark.parametrize(('clues', 'unique'), [
+        ([(0, 4), (1, 0)], True),
+        ([(0, 4), (1, 4)], False),
+    ])
+    def test_race_reports_the_winner(self, cube, clues, unique):
+        winners = []
+        answer = solution_is_unique_portfolio(clues, len(clues), [0, 3, 2, 1], cube, None,
+                                              report=lambda *won: winners.append(won))
+        assert answer is unique
+        [(name, won_answer, secs)] = winners
+        assert name in list(BRANCHING) + ['restarts', 'cdcl']
+        assert won_answer is unique and secs >= 0
+
+    def test_exhausted_time_budget_returns_false(self, cube):
+        assert solution_is_unique_portfolio([(0, 4), (1, 0)], 2, [0, 3, 2, 1], cube, None,
+                                            time_budget=0, strategies=['naive']) is False
+
+    def test_a_racer_that_crashes_doesnt_hang_the_race(self, cube):
+        """With no time budget, nothing else would end the wait."""
+        assert solution_is_unique_portfolio([(0, 4), (1, 0)], 2, [0, 3, 2, 1], cube, None,
+                                            strategies=['nosuch']) is False
+
+
+class TestKnownGuesses:
+    """known_guesses and matches: the known solution, edge by edge."""
+
+    def test_known_guesses_on_a_mesh(self, cube):
+        known = known_guesses(cube, [0, 3, 2, 1])
+        assert sorted(edge_id(ekey) for (ekey, guess) in known.items()
+                      if guess == 'filledIn') == [(0, 1), (0, 3), (1, 2), (2, 3)]
+        assert len(known) == 12
+
+    def test_known_guesses_on_a_board_are_by_index(self, cube):
+        board = SolverBoard(cube)
+        known = known_guesses(board, [0, 3, 2, 1])
+        assert known[board.edge((3, 0))] == 'filledIn'
+        assert known[board.edge((4, 5))] == 'ruledOut'
+
+    def test_matches(self, cube):
+        known = known_guesses(cube, [0, 3, 2, 1])
+        fill(cube, [(0, 1), (1, 2), (2, 3), (3, 0)])
+        for ekey in cube.edges():
+            if cube.edge_attribute(ekey, 'guess') == 'unknown':
+                cube.edge_attribute(ekey, 'guess', 'ruledOut')
+        assert matches(cube, known)
+        set_edge(cube, 4, 5, 'filledIn')
+        assert not matches(cube, known)
+
 
 # --- dodecahedron integration ---
 
@@ -1553,6 +1768,131 @@ class TestApplyColorRules:
         assert ok is False
 
 
+class TestXorEquations:
+    """The reduced parity equations under apply_xor_rules. Rows are ints: a bit
+    per edge, and PARITY for the right-hand side."""
+
+    PARITY = 1 << 8
+
+    def test_insert_keeps_pivots_unique(self):
+        rows = []
+        assert xor_insert(rows, 0b011, self.PARITY)
+        assert xor_insert(rows, 0b110 | self.PARITY, self.PARITY)
+        # Reduced: edge 1, the second row's pivot, is gone from the first.
+        assert sorted(rows) == sorted([0b101 | self.PARITY, 0b110 | self.PARITY])
+
+    def test_insert_reports_a_contradiction(self):
+        rows = [0b011]
+        assert not xor_insert(rows, 0b011 | self.PARITY, self.PARITY)
+        assert xor_insert(rows, 0b011, self.PARITY)  # Redundant, not wrong.
+        assert rows == [0b011]
+
+    def test_assign_finds_units(self):
+        # e0 ^ e1 = 0 and e1 ^ e2 = 1: fill e0, and e1 is filled, e2 not.
+        rows = []
+        xor_insert(rows, 0b011, self.PARITY)
+        xor_insert(rows, 0b110 | self.PARITY, self.PARITY)
+        assert xor_assign(rows, 0, True, self.PARITY)
+        assert sorted(xor_units(rows, self.PARITY)) == [(1, True), (2, False)]
+
+    def test_relations(self):
+        # e0 ^ e2 = 1 and e1 ^ e2 = 0, so e0 and e1 differ, and so on: two of
+        # the three pairs, from which the third follows.
+        rows = []
+        xor_insert(rows, 0b101 | self.PARITY, self.PARITY)
+        xor_insert(rows, 0b110, self.PARITY)
+        relations = xor_relations(rows, self.PARITY)
+        assert len(relations) == 2
+        closed = ParityRelation()
+        for (e1, e2, kind) in relations:
+            assert closed.relate(e1, e2, kind == 'exactly one')
+        assert closed.relation(0, 1) is True
+        assert closed.relation(0, 2) is True
+        assert closed.relation(1, 2) is False
+
+
+class TestApplyXorRules:
+    """Sums of vertex equations reach edges no vertex rule can."""
+
+    def test_the_edges_leaving_a_face_are_even(self, cube):
+        # The four vertical edges leave the bottom face's four vertices, so an
+        # even number of them is filled: with one filled and two ruled out,
+        # the fourth is filled, though no single vertex says so.
+        fill(cube, [(0, 4)])
+        set_edge(cube, 1, 5, 'ruledOut')
+        set_edge(cube, 2, 6, 'ruledOut')
+        assert apply_vertex_rules(cube) == (True, False)
+        assert apply_xor_rules(cube) == (True, True)
+        assert guess_of(cube, 3, 7) == 'filledIn'
+
+    def test_clue_parity(self, cube):
+        # A 1 on the bottom wants an odd number of its edges filled, but with
+        # every vertical edge ruled out, each bottom corner takes both of its
+        # bottom edges or neither, so the count is even.
+        fill(cube, [])
+        for (v1, v2) in [(0, 4), (1, 5), (2, 6), (3, 7)]:
+            set_edge(cube, v1, v2, 'ruledOut')
+        cube.face_attribute(0, 'clue', 1)
+        assert apply_xor_rules(cube)[0] is False
+
+    def test_board_rolls_its_equations_back(self, cube):
+        board = SolverBoard(cube)
+        board.assign(board.edge((0, 4)), FILLED)
+        board.assign(board.edge((1, 5)), RULED_OUT)
+        assert board._xor_changes()
+        mark = board.checkpoint()
+        equations = list(board.equations)
+        board.assign(board.edge((2, 6)), RULED_OUT)
+        assert board._xor_changes()
+        assert board.guess((3, 7)) == 'filledIn'
+        board.rollback(mark)
+        assert board.equations == equations
+        assert board.guess((3, 7)) == 'unknown'
+
+
+class TestApplyLoopRules:
+    """The single-loop rule over a cube. Face keys: 0 bottom, 1 top,
+    2 front, 3 right, 4 back, 5 left."""
+
+    def test_empty_board_deduces_nothing(self, cube):
+        fill(cube, [])
+        assert apply_loop_rules(cube) == (True, False)
+
+    def test_closing_a_chain_early_is_ruled_out(self, cube):
+        # Three bottom edges make a chain from 0 to 3, and (5,6) is filled
+        # elsewhere, so closing (0,3) would leave (5,6) off the loop.
+        fill(cube, [(0, 1), (1, 2), (2, 3), (5, 6)])
+        assert apply_loop_rules(cube) == (True, True)
+        assert guess_of(cube, 0, 3) == 'ruledOut'
+
+    def test_the_only_chain_may_close_if_that_meets_every_clue(self, cube):
+        fill(cube, [(0, 1), (1, 2), (2, 3)])
+        cube.face_attribute(0, 'clue', 4)
+        assert apply_loop_rules(cube) == (True, False)
+        assert guess_of(cube, 0, 3) == 'unknown'
+
+    def test_the_only_chain_may_not_close_on_an_unmet_clue(self, cube):
+        # Closing the bottom would finish the loop with the top's 1 unmet.
+        fill(cube, [(0, 1), (1, 2), (2, 3)])
+        cube.face_attribute(1, 'clue', 1)
+        assert apply_loop_rules(cube) == (True, True)
+        assert guess_of(cube, 0, 3) == 'ruledOut'
+
+    def test_a_closed_loop_is_the_whole_solution(self, cube):
+        fill(cube, [(0, 1), (1, 2), (2, 3), (3, 0)])
+        assert apply_loop_rules(cube) == (True, True)
+        for (v1, v2) in [(4, 5), (5, 6), (6, 7), (7, 4), (0, 4), (1, 5), (2, 6), (3, 7)]:
+            assert guess_of(cube, v1, v2) == 'ruledOut'
+
+    def test_a_closed_loop_beside_other_edges_is_a_contradiction(self, cube):
+        fill(cube, [(0, 1), (1, 2), (2, 3), (3, 0), (5, 6)])
+        assert apply_loop_rules(cube)[0] is False
+
+    def test_a_branch_is_a_contradiction(self, cube):
+        fill(cube, [(0, 1), (0, 3), (0, 4)])
+        assert apply_loop_rules(cube)[0] is False
+
+
 class TestApplyPatternRules:
     """Tier-1 clue patterns, stated in terms of a face's deficit (sides minus
     clue). Cube faces: 0 bottom, 1 top, 2 front, 3 right, 4 back, 5 left.
@@ -1731,3 +2071,942 @@ class TestApplyPatternRules:
                 continue
             assert (guess == 'filledIn') == (frozenset(e) in loop_edges), (
                 f"edge {tuple(e)} deduced {guess}, contradicting the solution")
+
+
+# --- SolverBoard: the array-backed engine ---
+
+def load_grid_and_puzzles(stem):
+    """(mesh, [(clues, solution)]) for a grid in data/."""
+    grid = json.loads((REPO_ROOT / 'data' / f'{stem}.json').read_text())
+    mesh = Mesh.from_vertices_and_faces(grid['vertices'], grid['faces'])
+    data = json.loads((REPO_ROOT / 'data' / f'{stem}-puzzles.json').read_text())
+    puzzles = [([(face, n) for face, n in enumerate(p['clues']) if n != -1],
+                p['solution'])
+               for p in data['puzzles']]
+    return (mesh, puzzles)
+
+
+def same_position(mesh, board):
+    """Every edge in the same state on the mesh and the board."""
+    return all(mesh.edge_attribute(ekey, 'guess') == board.guess(ekey)
+               for ekey in mesh.edges())
+
+
+class TestSolverBoardTopology:
+    """The index the board builds once: it must say what the mesh says."""
+
+    def test_edges_are_numbered_in_mesh_order(self, cube):
+        board = SolverBoard(cube)
+        assert board.edge_keys == list(cube.edges())
+        for (e, ekey) in enumerate(cube.edges()):
+            assert board.edge(ekey) == e
+            assert board.edge(tuple(reversed(ekey))) == e
+
+    def test_every_cube_vertex_has_three_edges(self, cube):
+        board = SolverBoard(cube)
+        assert [len(edges) for edges in board.vertex_edges] == [3] * 8
+
+    def test_every_cube_edge_has_two_faces(self, cube):
+        board = SolverBoard(cube)
+        assert all(f1 >= 0 and f2 >= 0 and f1 != f2 for (f1, f2) in board.edge_faces)
+
+    def test_face_edges_follow_the_face(self, cube):
+        board = SolverBoard(cube)
+        for fkey in cube.faces():
+            expected = [frozenset(h) for h in cube.face_halfedges(fkey)]
+            got = [frozenset(board.edge_keys[e]) for e in board.face_edges[fkey]]
+            assert got == expected
+
+    def test_corners_match_face_edges_at_vertex(self, octahedron):
+        board = SolverBoard(octahedron)
+        for fkey in octahedron.faces():
+            for (v, own, others, away) in board.face_corners[fkey]:
+                vkey = board.vertex_keys[v]
+                (mesh_own, mesh_others) = face_edges_at_vertex(octahedron, fkey, vkey)
+                assert [board.edge(e) for e in mesh_own] == list(own)
+                assert [board.edge(e) for e in mesh_others] == list(others)
+                assert all(vkey not in board.edge_keys[e] for e in away)
+                assert len(away) == 1  # A triangle's edge opposite the corner.
+
+    def test_the_board_never_touches_the_mesh(self, cube):
+        board = SolverBoard(cube)
+        solvable_by_deduction(board, [(0, 4), (1, 0)], 2)
+        assert board.is_complete_solution()
+        assert all(cube.edge_attribute(e, 'guess') is None for e in cube.edges())
+        assert all(cube.face_attribute(f, 'clue') is None for f in cube.faces())
+
+
+class TestSolverBoardRules:
+    """The board runs the mesh engine's rules. Each family on its own first,
+    then the whole loop on real puzzles, where the two must agree edge for edge."""
+
+    def test_vertex_rule(self, cube):
+        board = SolverBoard(cube)
+        board.guesses[board.edge((0, 1))] = FILLED
+        board.guesses[board.edge((0, 3))] = FILLED
+        assert board.apply_vertex_rules() == (True, True)
+        assert board.guess((0, 4)) == 'ruledOut'
+
+    def test_vertex_contradiction(self, cube):
+        board = SolverBoard(cube)
+        for nbr in (1, 3, 4):
+            board.guesses[board.edge((0, nbr))] = FILLED
+        assert board.apply_vertex_rules()[0] is False
+
+    def test_clue_rule(self, cube):
+        board = SolverBoard(cube)
+        board.apply_clues([(1, 0)], 1)
+        assert board.apply_clue_rules() == (True, True)
+        assert all(board.guess(e) == 'ruledOut' for e in cube.face_halfedges(1))
+
+    def test_rule_a(self, cube):
+        board = SolverBoard(cube)
+        board.apply_clues([(0, 3)], 1)
+        board.guesses[board.edge((0, 4))] = RULED_OUT
+        assert board.apply_pattern_rules() == (True, True)
+        assert board.guess((0, 1)) == 'filledIn'
+        assert board.guess((0, 3)) == 'filledIn'
+
+    def test_rule_c(self, octahedron):
+        board = SolverBoard(octahedron)
+        board.apply_clues([(0, 2), (2, 2)], 2)
+        assert board.apply_pattern_rules() == (True, True)
+        assert board.guess((2, 3)) == 'filledIn'
+        assert board.guess((4, 5)) == 'filledIn'
+
+    def test_color_rule_forces_the_third_edge(self, cube):
+        board = SolverBoard(cube)
+        board.assign(board.edge((0, 1)), FILLED)
+        board.assign(board.edge((0, 3)), FILLED)
+        assert board.apply_color_rules() == (True, True)
+        assert board.guess((0, 4)) == 'ruledOut'
+
+    def test_pair_rules_agree_with_the_mesh(self, octahedron):
+        """The position from TestApplyPairRules that no other family cracks."""
+        board = SolverBoard(octahedron)
+        for (fkey, clue) in ((0, 1), (4, 1)):
+            octahedron.face_attribute(fkey, 'clue', clue)
+        board.apply_clues([(0, 1), (4, 1)], 2)
+        fill(octahedron, [])
+        for (v1, v2) in ((0, 4), (0, 5), (1, 4), (1, 5)):
+            set_edge(octahedron, v1, v2, 'ruledOut')
+            board.guesses[board.edge((v1, v2))] = RULED_OUT
+        assert board.apply_pair_rules() == apply_pair_rules(octahedron)
+        assert same_position(octahedron, board)
+
+    @pytest.mark.parametrize('stem', ['D', 'aD', 'J84'])
+    def test_propagation_matches_the_mesh_engine(self, stem):
+        """From every stored puzzle's clues, and from a prefix of them too few
+        to finish it, both engines deduce the same position at depth 1."""
+        (mesh, puzzles) = load_grid_and_puzzles(stem)
+        board = SolverBoard(mesh)
+        for (clues, _solution) in puzzles:
+            for num_clues in (len(clues) * 2 // 3, len(clues)):
+                assert (solvable_by_deduction(board, clues, num_clues)
+                        == solvable_by_deduction(mesh, clues, num_clues))
+                assert same_position(mesh, board)
+
+    def test_open_rims_match_the_mesh_engine(self):
+        """A nanotube has edges with only one face, which the color and pattern
+        rules have to skip; the board marks the missing face -1 where the mesh
+        says None, and must skip the same edges."""
+        (mesh, puzzles) = load_grid_and_puzzles('nt55')
+        board = SolverBoard(mesh)
+        assert any(-1 in faces for faces in board.edge_faces)
+        for (clues, _solution) in puzzles:
+            assert solvable_by_deduction(board, clues, len(clues))
+            assert solvable_by_deduction(mesh, clues, len(clues))
+            assert same_position(mesh, board)
+
+
+class TestSolverBoardSearch:
+    """The public entry points, handed a board instead of a mesh."""
+
+    def test_unique_solution(self, cube):
+        board = SolverBoard(cube)
+        assert solution_is_unique([(0, 4), (1, 0)], 2, [0, 3, 2, 1], board, None)
+
+    def test_no_single_loop(self, cube):
+        board = SolverBoard(cube)
+        assert not solution_is_unique([(0, 4), (1, 4)], 2, [0, 3, 2, 1], board, None)
+
+    def test_no_clues_admits_multiple_solutions(self, cube):
+        board = SolverBoard(cube)
+        assert not solution_is_unique([], 0, [0, 3, 2, 1], board, None)
+
+    def test_exhausted_time_budget(self, cube):
+        board = SolverBoard(cube)
+        assert not solution_is_unique([(0, 4), (1, 0)], 2, [0, 3, 2, 1], board, None,
+                                      time_budget=0)
+
+    def test_dodecahedron_puzzle_is_unique(self, dodecahedron, dodec_puzzle):
+        (clues, solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        assert solution_is_unique(clues, len(clues), solution, board, None)
+
+    def test_lookahead_reaches_the_stored_solution(self, dodecahedron, dodec_puzzle):
+        (clues, solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        board.reset()
+        board.apply_clues(clues, len(clues))
+        assert propagate_with_lookahead(board, clues, len(clues), depth=1)
+        loop = {frozenset((solution[i], solution[(i + 1) % len(solution)]))
+                for i in range(len(solution))}
+        for (e, ekey) in enumerate(board.edge_keys):
+            assert board.guesses[e] != UNKNOWN
+            assert (board.guesses[e] == FILLED) == (frozenset(ekey) in loop)
+
+    @pytest.mark.parametrize('stem', ['D', 'aD', 'J84'])
+    def test_lookahead_skips_probes_it_has_answered(self, stem, monkeypatch):
+        """Remembering which suppositions survive changes how many are tried,
+        never what is deduced. (Without common consequences, which want some
+        of the spared probes back.)"""
+        (mesh, puzzles) = load_grid_and_puzzles(stem)
+        monkeypatch.setattr(slisolver, 'COMMON_CONSEQUENCES', False)
+        results = []
+        for cache in (True, False):
+            monkeypatch.setattr(slisolver, 'LOOKAHEAD_CACHE', cache)
+            board = SolverBoard(mesh)
+            positions = []
+            for (clues, _solution) in puzzles:
+                for num_clues in (len(clues) * 2 // 3, len(clues)):
+                    positions.append((solvable_by_deduction(board, clues, num_clues),
+                                      bytes(board.guesses)))
+            results.append((positions, board.probes))
+        ((cached, cached_probes), (plain, plain_probes)) = results
+        assert cached == plain
+        assert cached_probes < plain_probes
+
+    @pytest.mark.parametrize('stem', ['D', 'aD', 'J84'])
+    def test_common_consequences_only_add(self, stem, monkeypatch):
+        """Keeping what both suppositions agree on may deduce more, and never
+        anything the plain lookahead contradicts; on the mesh and the board
+        alike."""
+        (mesh, puzzles) = load_grid_and_puzzles(stem)
+        board = SolverBoard(mesh)
+        for (clues, _solution) in puzzles:
+            for num_clues in (len(clues) // 2, len(clues) * 2 // 3):
+                positions = []
+                for common in (False, True):
+                    monkeypatch.setattr(slisolver, 'COMMON_CONSEQUENCES', common)
+                    assert solvable_by_deduction(board, clues, num_clues) is False
+                    positions.append(bytes(board.guesses))
+                (plain, harvested) = positions
+                assert all(p == UNKNOWN or p == h for (p, h) in zip(plain, harvested))
+                assert solvable_by_deduction(mesh, clues, num_clues) is False
+                assert same_position(mesh, board)
+
+    @pytest.mark.parametrize('stem', ['D', 'aD', 'J84'])
+    def test_batch_probe_lanes_are_single_probes(self, stem):
+        """Each lane of batch_probe concludes no more than its supposition
+        propagated on its own, and dies only where that fails."""
+        (mesh, puzzles) = load_grid_and_puzzles(stem)
+        board = SolverBoard(mesh)
+        (clues, _solution) = puzzles[0]
+        board.apply_clues(clues, len(clues) * 2 // 3)
+        assert board.propagate_constraints()
+        edges = [e for (e, g) in enumerate(board.guesses) if g == UNKNOWN]
+        (filled, ruled_out, dead) = board.batch_probe(edges)
+        for (i, x) in enumerate(edges):
+            for (lane, state) in ((2 * i, FILLED), (2 * i + 1, RULED_OUT)):
+                mark = board.checkpoint()
+                board.assign(x, state)
+                survived = board.propagate_constraints()
+                if dead >> lane & 1:
+                    assert not survived
+                if survived:
+                    for y in range(len(board.guesses)):
+                        if filled[y] >> lane & 1:
+                            assert board.guesses[y] == FILLED
+                        if ruled_out[y] >> lane & 1:
+                            assert board.guesses[y] == RULED_OUT
+                board.rollback(mark)
+
+    @pytest.mark.parametrize('stem', ['D', 'aD', 'J84'])
+    def test_batch_probes_change_nothing_concluded(self, stem, monkeypatch):
+        (mesh, puzzles) = load_grid_and_puzzles(stem)
+        results = []
+        for batch in (True, False):
+            monkeypatch.setattr(slisolver, 'BATCH_PROBES', batch)
+            board = SolverBoard(mesh)
+            results.append([(solvable_by_deduction(board, clues, num_clues),
+                             bytes(board.guesses))
+                            for (clues, _solution) in puzzles
+                            for num_clues in (len(clues) // 2, len(clues))])
+        assert results[0] == results[1]
+
+    def test_tied_edges_settle_together(self, cube):
+        board = SolverBoard(cube)
+        assert board.propagate_constraints()
+        tied = ParityRelation()
+        tied.relate(board.edge((0, 1)), board.edge((5, 6)), True)
+        start = board.checkpoint()
+        board.assign(board.edge((0, 1)), FILLED)
+        assert board._settle_tied(tied, start)
+        assert board.guess((5, 6)) == 'ruledOut'
+
+    def test_tied_edges_settle_together_on_the_mesh(self, cube):
+        reset_guesses(cube)
+        tied = EdgePairing()
+        tied.exactly_one((0, 1), (5, 6))
+        set_edge(cube, 0, 1, 'filledIn')
+        assert slisolver.settle_tied(cube, [], 0, tied)
+        assert guess_of(cube, 5, 6) == 'ruledOut'
+
+    def test_a_remembered_probe_outlives_what_it_implied(self, cube):
+        board = SolverBoard(cube)
+        found = (0, {3: FILLED, 5: RULED_OUT}, literal(3, FILLED))
+        assert board._survives(found)
+        board.assign(5, RULED_OUT)
+        assert board._survives(found)
+        board.assign(7, FILLED)
+        assert not board._survives(found)
+        assert not board._survives(None)
+
+
+
+class TestSolverBoardTrail:
+    """Backtracking on the board undoes only what changed, from the trail."""
+
+    def test_rollback_undoes_changes_since_the_checkpoint(self, cube):
+        board = SolverBoard(cube)
+        board.assign(3, FILLED)
+        mark = board.checkpoint()
+        board.assign(5, RULED_OUT)
+        board.assign(7, FILLED)
+        board.rollback(mark)
+        assert board.guesses[3] == FILLED
+        assert board.guesses[5] == UNKNOWN
+        assert board.guesses[7] == UNKNOWN
+        assert board.trail == [3]
+
+    def test_a_mark_survives_being_rolled_back_to(self, cube):
+        """The search tries both branches from one checkpoint."""
+        board = SolverBoard(cube)
+        mark = board.checkpoint()
+        for state in (FILLED, RULED_OUT):
+            board.assign(0, state)
+            assert board.guesses[0] == state
+            board.rollback(mark)
+            assert board.guesses[0] == UNKNOWN
+
+    def test_marks_nest(self, cube):
+        board = SolverBoard(cube)
+        outer = board.checkpoint()
+        board.assign(0, FILLED)
+        inner = board.checkpoint()
+        board.assign(1, FILLED)
+        board.rollback(inner)
+        assert list(board.guesses[:2]) == [FILLED, UNKNOWN]
+        board.rollback(outer)
+        assert list(board.guesses[:2]) == [UNKNOWN, UNKNOWN]
+
+    def test_every_deduction_is_on_the_trail(self, dodecahedron, dodec_puzzle):
+        """Anything a rule sets without recording it could never be undone, and
+        would leak from one branch of the search into the next."""
+        (clues, _solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        board.apply_clues(clues, len(clues))
+        mark = board.checkpoint()
+        assert board.propagate_with_lookahead(depth=1)
+        assert sorted(board.trail) == [e for (e, g) in enumerate(board.guesses)
+                                       if g != UNKNOWN]
+        board.rollback(mark)
+        assert not any(board.guesses)
+
+    def test_save_and_restore_are_checkpoint_and_rollback(self, cube):
+        board = SolverBoard(cube)
+        saved = save_state(board)
+        board.assign(3, FILLED)
+        restore_state(board, saved)
+        assert board.guesses[3] == UNKNOWN
+
+    def test_reset_empties_the_trail(self, cube):
+        board = SolverBoard(cube)
+        board.assign(3, FILLED)
+        board.reset()
+        assert board.trail == []
+        assert not any(board.guesses)
+
+
+class TestSolverBoardQueues:
+    """Propagation on the board looks again only where something changed."""
+
+    def test_a_fixed_point_is_remembered(self, dodecahedron, dodec_puzzle):
+        (clues, _solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        board.apply_clues(clues, 3)
+        assert board.propagate_constraints()
+        assert board.settled == [len(board.trail)]
+        assert not board.dirty_vertices and not board.dirty_faces
+
+    def test_a_change_queues_only_its_neighborhood(self, dodecahedron):
+        board = SolverBoard(dodecahedron)
+        assert board.propagate_constraints()
+        e = board.select_edge_for_branching()
+        board.assign(e, FILLED)
+        board._queue_changes()
+        assert board.dirty_vertices == set(board.edge_vertices[e])
+        assert board.dirty_faces == set()  # No clues, so no clue rule to run.
+
+    def test_a_change_queues_its_clued_faces(self, dodecahedron, dodec_puzzle):
+        (clues, _solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        board.apply_clues(clues, len(clues))
+        board.settled = [0]  # Pretend the empty position is settled.
+        e = board.face_edges[board.clued_faces[0]][0]
+        board.assign(e, RULED_OUT)
+        board._queue_changes()
+        assert board.clued_faces[0] in board.dirty_faces
+        assert board.dirty_faces <= set(board.clued_faces)
+
+    def test_rollback_returns_to_the_last_fixed_point(self, dodecahedron, dodec_puzzle):
+        """The search assigns, propagates and rolls back, over and over; each
+        branch must start from the fixed point before it, not from scratch."""
+        (clues, _solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        board.apply_clues(clues, 3)
+        assert board.propagate_constraints()
+        mark = board.checkpoint()
+        board.assign(board.select_edge_for_branching(), FILLED)
+        board.propagate_constraints()
+        board.rollback(mark)
+        assert board.settled == [mark]
+        assert board.queued_to == mark
+        assert not board.dirty_vertices and not board.dirty_faces
+
+    def test_both_branches_match_the_mesh_engine(self, dodecahedron, dodec_puzzle):
+        """Propagating a guess from a remembered fixed point gets the same
+        position as propagating it on the mesh from scratch."""
+        (clues, _solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        board.apply_clues(clues, 3)
+        assert board.propagate_constraints()
+        mark = board.checkpoint()
+        e = board.select_edge_for_branching()
+        for state in (FILLED, RULED_OUT):
+            board.assign(e, state)
+            ok = board.propagate_constraints()
+            mesh = dodecahedron.copy()
+            reset_guesses(mesh)
+            apply_clues(clues, 3, mesh)
+            mesh.edge_attribute(board.edge_keys[e], 'guess', GUESS_NAMES[state])
+            assert propagate_constraints(mesh, clues, 3) == ok
+            if ok:
+                assert same_position(mesh, board)
+            board.rollback(mark)
+
+    def test_new_clues_start_a_full_sweep(self, dodecahedron, dodec_puzzle):
+        (clues, _solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        assert board.propagate_constraints()
+        board.apply_clues(clues, len(clues))
+        assert board.settled == []
+        assert board.propagate_constraints()
+        mesh = dodecahedron.copy()
+        reset_guesses(mesh)
+        apply_clues(clues, len(clues), mesh)
+        assert propagate_constraints(mesh, clues, len(clues))
+        assert same_position(mesh, board)
+
+
+class TestPropagationMemo:
+    """propagate_constraints remembers its fixed points by Zobrist hash."""
+
+    def test_the_hash_follows_the_trail(self, cube):
+        board = SolverBoard(cube)
+        assert board.position_hash() == 0
+        board.assign(3, FILLED)
+        board.assign(5, RULED_OUT)
+        expected = board.zobrist_keys[3][FILLED] ^ board.zobrist_keys[5][RULED_OUT]
+        assert board.position_hash() == expected
+        board.rollback(1)
+        assert board.position_hash() == board.zobrist_keys[3][FILLED]
+        board.reset()
+        assert board.position_hash() == 0
+
+    def test_the_hash_is_the_position_not_the_order(self, cube):
+        board = SolverBoard(cube)
+        board.assign(3, FILLED)
+        board.assign(5, RULED_OUT)
+        first = board.position_hash()
+        board.reset()
+        board.assign(5, RULED_OUT)
+        board.assign(3, FILLED)
+        assert board.position_hash() == first
+
+    def test_a_repeat_is_a_hit_with_the_same_result(self, dodecahedron, dodec_puzzle):
+        (clues, _solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        board.apply_clues(clues, 3)
+        assert board.propagate_constraints()
+        mark = board.checkpoint()
+        e = board.select_edge_for_branching()
+        results = []
+        for _ in range(2):
+            board.assign(e, FILLED)
+            ok = board.propagate_constraints()
+            results.append((ok, bytes(board.guesses)))
+            board.rollback(mark)
+        assert results[0] == results[1]
+        assert board.memo_hits == 1
+
+    def test_a_contradiction_is_remembered(self, cube):
+        board = SolverBoard(cube)
+        for nbr in (1, 3, 4):
+            board.assign(board.edge((0, nbr)), FILLED)
+        assert not board.propagate_constraints()
+        board.reset()
+        for nbr in (4, 1, 3):
+            board.assign(board.edge((0, nbr)), FILLED)
+        assert not board.propagate_constraints()
+        assert (board.memo_hits, board.memo_misses) == (1, 1)
+
+    def test_other_clues_miss(self, dodecahedron, dodec_puzzle):
+        (clues, _solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        for num_clues in (3, 4):
+            board.reset()
+            board.apply_clues(clues, num_clues)
+            assert board.propagate_constraints()
+        assert board.memo_hits == 0
+
+    def test_the_memo_is_bounded(self, dodecahedron):
+        board = SolverBoard(dodecahedron)
+        board.memo_size = 2
+        for e in range(4):
+            board.reset()
+            board.assign(e, FILLED)
+            board.propagate_constraints()
+        assert len(board.memo) == 2
+
+    @pytest.mark.parametrize('stem', ['D', 'aD', 'J84'])
+    def test_the_same_answers_without_it(self, stem):
+        (mesh, puzzles) = load_grid_and_puzzles(stem)
+        (board, plain) = (SolverBoard(mesh), SolverBoard(mesh))
+        plain.memo_size = 0
+        for (clues, solution) in puzzles:
+            for num_clues in (len(clues) // 2, len(clues)):
+                assert (solvable_by_deduction(board, clues, num_clues)
+                        == solvable_by_deduction(plain, clues, num_clues))
+                assert board.guesses == plain.guesses
+            assert solution_is_unique(clues, len(clues), solution, board, None)
+        assert board.memo_hits > 0 and not plain.memo
+
+
+class TestTrailedColoring:
+    """The board's coloring: a FaceColoring that can be rolled back."""
+
+    def test_relates_like_a_face_coloring(self):
+        coloring = TrailedColoring(4)
+        assert coloring.relate(0, 1, True, 0) is not None
+        assert coloring.relate(1, 2, True, 1) is not None
+        (root0, opposite0) = coloring.find(0)
+        (root2, opposite2) = coloring.find(2)
+        assert root0 == root2 and opposite0 == opposite2  # Opposite of opposite.
+        assert coloring.find(3) == (3, 0)
+
+    def test_agreement_and_contradiction(self):
+        coloring = TrailedColoring(3)
+        coloring.relate(0, 1, True, 0)
+        coloring.relate(1, 2, False, 1)
+        assert coloring.relate(0, 2, True, 2) is None
+        assert coloring.relate(0, 2, False, 2) is False
+
+    def test_undo_separates_what_was_joined_after_the_mark(self):
+        coloring = TrailedColoring(3)
+        coloring.relate(0, 1, True, 0)
+        coloring.relate(1, 2, True, 5)
+        coloring.undo(5)
+        assert coloring.find(0)[0] == coloring.find(1)[0]
+        assert coloring.find(2) == (2, 0)
+        assert sorted(coloring.members[coloring.find(0)[0]]) == [0, 1]
+        coloring.clear()
+        assert [coloring.find(f) for f in range(3)] == [(0, 0), (1, 0), (2, 0)]
+
+
+class TestSolverBoardColoring:
+    """The board keeps its coloring across propagation, rolled back with it."""
+
+    def test_rollback_forgets_the_colors(self, cube):
+        board = SolverBoard(cube)
+        mark = board.checkpoint()
+        board.assign(board.edge((0, 1)), FILLED)
+        board.assign(board.edge((0, 3)), FILLED)
+        assert board.apply_color_rules() == (True, True)
+        board.rollback(mark)
+        assert board.coloring.log == []
+        assert board.colored_to == 0
+        # The same edges ruled out now force the opposite.
+        board.assign(board.edge((0, 1)), RULED_OUT)
+        board.assign(board.edge((0, 3)), RULED_OUT)
+        assert board.apply_color_rules() == (True, True)
+        assert board.guess((0, 4)) == 'ruledOut'
+
+    def test_search_keeps_the_coloring_in_step(self, dodecahedron, dodec_puzzle):
+        """After lookahead's many probes and rollbacks, the coloring holds what
+        a fresh one built from the decided edges would."""
+        (clues, _solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        board.apply_clues(clues, 3)
+        assert board.propagate_with_lookahead(depth=1)
+        fresh = FaceColoring()
+        for (e, (face1, face2)) in enumerate(board.edge_faces):
+            if board.guesses[e] != UNKNOWN:
+                fresh.relate(face1, face2, board.guesses[e] == FILLED)
+        for face1 in range(len(board.face_keys)):
+            for face2 in range(face1):
+                (root1, opposite1) = board.coloring.find(face1)
+                (root2, opposite2) = board.coloring.find(face2)
+                ours = (opposite1 ^ opposite2) if root1 == root2 else None
+                assert ours == fresh.relation(face1, face2)
+
+
+class TestSolverBoardPairStore:
+    """The board keeps its pair stores between calls, retracting on rollback."""
+
+    @staticmethod
+    def fresh_facts(board):
+        """What every item would emit now, from scratch."""
+        num_vertices = len(board.vertex_edges)
+        facts = {v: board._emit_vertex_pairs(v) for v in range(num_vertices)}
+        facts.update((num_vertices + f, board._emit_face_pairs(f))
+                     for f in board.clued_faces)
+        facts[num_vertices + len(board.face_keys)] = tuple(
+            sorted(xor_relations(board.equations, board.parity_bit)))
+        return {item: held for (item, held) in facts.items() if held}
+
+    @staticmethod
+    def held_facts(board):
+        return {item: held for (item, held) in board.pair_facts.items() if held}
+
+    def test_stores_follow_the_position(self, dodecahedron, dodec_puzzle):
+        (clues, _solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        board.apply_clues(clues, 3)
+        assert board.propagate_constraints()
+        mark = board.checkpoint()
+        board.assign(board.select_edge_for_branching(), FILLED)
+        board.apply_pair_rules()
+        board.rollback(mark)
+        board.apply_pair_rules()
+        assert self.held_facts(board) == self.fresh_facts(board)
+
+    def test_clause_counts_match_the_held_facts(self, dodecahedron, dodec_puzzle):
+        """After a lookahead's worth of probes and rollbacks, the implication
+        counts are exactly what the held facts add up to."""
+        (clues, _solution) = dodec_puzzle
+        board = SolverBoard(dodecahedron)
+        board.apply_clues(clues, 3)
+        assert board.propagate_with_lookahead(depth=1)
+        board.apply_pair_rules()
+        implies = {}
+        for held in board.pair_facts.values():
+            for (edge1, edge2, kind) in held:
+                if kind in ('exactly one', 'both or neither'):
+                    continue
+                for (premise, conclusion) in ((literal(edge1, kind), literal(edge2, kind) ^ 1),
+                                              (literal(edge2, kind), literal(edge1, kind) ^ 1)):
+                    forced = implies.setdefault(premise, {})
+                    forced[conclusion] = forced.get(conclusion, 0) + 1
+        assert board.implies == implies
+
+    def test_a_retracted_pair_unprobes_what_walked_it(self, cube):
+        board = SolverBoard(cube)
+        board.apply_clues([(0, 1)], 1)
+        assert board.apply_pair_rules() == (True, False)
+        assert board.probed
+        probed = set(board.probed)
+        board.assign(board.face_edges[0][0], FILLED)
+        board._update_pair_facts()
+        assert not probed & set(board.probed)
+
+    def test_promotion_comes_and_goes(self, cube):
+        """Two unknowns on a face needing exactly one of them collect both
+        clause kinds, so they are promoted to an exactly-one relation, and
+        demoted when the face changes."""
+        board = SolverBoard(cube)
+        board.apply_clues([(0, 3)], 1)
+        (a, b, c, d) = board.face_edges[0]
+        board.assign(a, FILLED)
+        board.assign(b, FILLED)
+        board._update_pair_facts()
+        assert board.promoted == {(min(c, d), max(c, d), 'exactly one')}
+        mark = board.checkpoint()
+        board.assign(c, FILLED)
+        board._update_pair_facts()
+        assert board.promoted == set()
+        board.rollback(mark)
+        board._update_pair_facts()
+        assert board.promoted == {(min(c, d), max(c, d), 'exactly one')}
+
+
+class TestBitBoard:
+    """The bitset engine: the board, with its position mirrored in two masks."""
+
+    def test_masks_follow_the_trail(self, cube):
+        board = BitBoard(cube)
+        board.assign(3, FILLED)
+        board.assign(5, RULED_OUT)
+        board._sync()
+        assert (board.filled, board.ruled_out) == (1 << 3, 1 << 5)
+
+    def test_vertex_rule_counts_bits(self, cube):
+        board = BitBoard(cube)
+        board.assign(board.edge((0, 1)), FILLED)
+        board.assign(board.edge((0, 3)), FILLED)
+        assert board.apply_vertex_rules() == (True, True)
+        assert board.guess((0, 4)) == 'ruledOut'
+
+    def test_rollback_restores_the_snapshot(self, cube):
+        board = BitBoard(cube)
+        board.assign(3, FILLED)
+        mark = board.checkpoint()
+        assert board.snapshots[-1] == (mark, 1 << 3, 0)
+        board.assign(5, RULED_OUT)
+        board._sync()
+        board.rollback(mark)
+        assert (board.filled, board.ruled_out) == (1 << 3, 0)
+        board.assign(5, FILLED)
+        board._sync()
+        assert (board.filled, board.ruled_out) == (1 << 3 | 1 << 5, 0)
+
+    def test_rollback_without_a_snapshot(self, cube):
+        board = BitBoard(cube)
+        board.assign(3, FILLED)
+        board.assign(5, RULED_OUT)
+        board._sync()
+        board.rollback(1)
+        assert (board.filled, board.ruled_out) == (1 << 3, 0)
+
+    def test_completion_and_branching(self, cube):
+        board = BitBoard(cube)
+        assert board.select_edge_for_branching() == 0
+        for e in range(len(board.edge_keys)):
+            board.assign(e, RULED_OUT)
+        assert board.is_complete_solution()
+        assert board.select_edge_for_branching() is None
+
+    @pytest.mark.parametrize('stem', ['D', 'aD', 'J84'])
+    def test_propagation_matches_the_mesh_engine(self, stem):
+        (mesh, puzzles) = load_grid_and_puzzles(stem)
+        board = BitBoard(mesh)
+        for (clues, solution) in puzzles:
+            for num_clues in (len(clues) * 2 // 3, len(clues)):
+                assert (solvable_by_deduction(board, clues, num_clues)
+                        == solvable_by_deduction(mesh, clues, num_clues))
+                assert same_position(mesh, board)
+            assert solution_is_unique(clues, len(clues), solution, board, None)
+
+
+class TestVectorBoard:
+    """The numpy engine: the board, with its local rules run a queue at a time."""
+
+    @pytest.fixture(autouse=True)
+    def bulk_always(self, monkeypatch):
+        """Bulk evaluation for every queue, however short, so the small grids
+        here exercise it."""
+        monkeypatch.setattr(slisolver, 'BULK_THRESHOLD', 0)
+
+    def test_is_an_engine(self):
+        assert ENGINES['numpy'] is VectorBoard
+
+    def test_vertex_rule_in_bulk(self, cube):
+        board = VectorBoard(cube)
+        board.assign(board.edge((0, 1)), FILLED)
+        board.assign(board.edge((0, 3)), FILLED)
+        assert board.apply_vertex_rules() == (True, True)
+        assert board.guess((0, 4)) == 'ruledOut'
+
+    def test_clue_rule_in_bulk(self, cube):
+        board = VectorBoard(cube)
+        board.apply_clues([(1, 0)], 1)
+        assert board.apply_clue_rules() == (True, True)
+        assert all(board.guess(e) == 'ruledOut' for e in cube.face_halfedges(1))
+
+    def test_contradiction_in_bulk(self, cube):
+        board = VectorBoard(cube)
+        for nbr in (1, 3, 4):
+            board.assign(board.edge((0, nbr)), FILLED)
+        assert board.apply_vertex_rules()[0] is False
+
+    def test_two_items_forcing_one_edge_both_ways(self, cube):
+        """The bottom wants all its edges, the front none of them, and they
+        share one."""
+        board = VectorBoard(cube)
+        board.apply_clues([(0, 4), (2, 0)], 2)
+        assert board.apply_clue_rules()[0] is False
+
+    @pytest.mark.parametrize('stem', ['D', 'aD', 'J84'])
+    def test_propagation_matches_the_mesh_engine(self, stem):
+        (mesh, puzzles) = load_grid_and_puzzles(stem)
+        board = VectorBoard(mesh)
+        for (clues, _solution) in puzzles:
+            for num_clues in (len(clues) * 2 // 3, len(clues)):
+                assert (solvable_by_deduction(board, clues, num_clues)
+                        == solvable_by_deduction(mesh, clues, num_clues))
+                assert same_position(mesh, board)
+
+
+class TestSolverBoardLoops:
+    """The board's chain tracker: apply_loop_rules, kept up to date."""
+
+    def test_closing_a_chain_early_is_ruled_out(self, cube):
+        board = SolverBoard(cube)
+        for (v1, v2) in [(0, 1), (1, 2), (2, 3), (5, 6)]:
+            board.assign(board.edge((v1, v2)), FILLED)
+        assert board._loop_changes()
+        assert board.guess((0, 3)) == 'ruledOut'
+
+    def test_a_second_piece_stops_the_first_closing(self, cube):
+        """While the bottom chain is all there is, it may close; the moment
+        another edge is filled, it may not."""
+        board = SolverBoard(cube)
+        board.apply_clues([(0, 4)], 1)
+        for (v1, v2) in [(0, 1), (1, 2), (2, 3)]:
+            board.assign(board.edge((v1, v2)), FILLED)
+        assert board._loop_changes()
+        assert board.guess((0, 3)) == 'unknown'
+        board.assign(board.edge((5, 6)), FILLED)
+        assert board._loop_changes()
+        assert board.guess((0, 3)) == 'ruledOut'
+
+    def test_a_closed_loop_is_the_whole_solution(self, cube):
+        board = SolverBoard(cube)
+        for (v1, v2) in [(0, 1), (1, 2), (2, 3), (3, 0)]:
+            board.assign(board.edge((v1, v2)), FILLED)
+        assert board._loop_changes()
+        assert board.is_complete_solution() and board.is_valid_loop()
+
+    def test_a_closed_loop_beside_other_edges_is_a_contradiction(self, cube):
+        board = SolverBoard(cube)
+        for (v1, v2) in [(5, 6), (0, 1), (1, 2), (2, 3), (3, 0)]:
+            board.assign(board.edge((v1, v2)), FILLED)
+        assert not board._loop_changes()
+
+    def test_rollback_reopens_the_chain(self, cube):
+        board = SolverBoard(cube)
+        for (v1, v2) in [(0, 1), (1, 2), (2, 3)]:
+            board.assign(board.edge((v1, v2)), FILLED)
+        assert board._loop_changes()
+        mark = board.checkpoint()
+        board.assign(board.edge((3, 0)), FILLED)
+        assert board._loop_changes()
+        board.rollback(mark)
+        assert board.loop_counts[:3] == [3, 1, 0]
+        assert board.chain_end[0] == 3 and board.chain_end[3] == 0
+        assert board.open_ends == {0, 3}
+        assert board.guess((4, 5)) == 'unknown'
+
+
+class TestSolver:
+    """A Solver answers for one grid, any number of times, on its own board."""
+
+    @pytest.mark.parametrize('engine', ['board', 'mesh'])
+    def test_solve_finds_the_solution(self, dodecahedron, dodec_puzzle, engine):
+        (clues, solution) = dodec_puzzle
+        found = Solver(dodecahedron, engine).solve(clues)
+        assert set(found) == set(solution) and len(found) == len(solution)
+        assert Solver(dodecahedron, engine).is_unique(clues, found)
+
+    def test_solve_without_clues_is_some_loop(self, cube):
+        loop = Solver(cube).solve([])
+        assert loop and len(set(loop)) == len(loop)
+
+    def test_answers_match_the_free_functions(self, dodecahedron, dodec_puzzle):
+        (clues, solution) = dodec_puzzle
+        solver = Solver(dodecahedron)
+        for num_clues in range(len(clues) + 1):
+            assert (solver.deduce(clues[:num_clues])
+                    == solvable_by_deduction(dodecahedron, clues, num_clues))
+        assert solver.is_unique(clues, solution)
+
+    def test_the_mesh_is_left_alone(self, dodecahedron, dodec_puzzle):
+        (clues, solution) = dodec_puzzle
+        solver = Solver(dodecahedron)
+        solver.deduce(clues)
+        solver.is_unique(clues, solution)
+        solver.solve(clues)
+        assert all(dodecahedron.edge_attribute(ekey, 'guess') is None
+                   for ekey in dodecahedron.edges())
+
+    def test_pickles_without_its_memo(self, dodecahedron, dodec_puzzle):
+        (clues, solution) = dodec_puzzle
+        solver = Solver(dodecahedron)
+        assert solver.deduce(clues)
+        assert solver.board.memo
+        copy = pickle.loads(pickle.dumps(solver))
+        assert not copy.board.memo
+        assert copy.deduce(clues) and copy.is_unique(clues, solution)
+
+
+class TestPrefixDeduction:
+    """Each prefix answered as solvable_by_deduction would, warm-started from
+    the longest found wanting."""
+
+    @pytest.mark.parametrize('stem', ['D', 'aD'])
+    @pytest.mark.parametrize('order', ['upward', 'bisecting'])
+    def test_the_same_answers_as_from_blank(self, stem, order):
+        (mesh, puzzles) = load_grid_and_puzzles(stem)
+        board = SolverBoard(mesh)
+        for (clues, solution) in puzzles:
+            # The whole solution's clues, so that some prefix is deducible.
+            clues = clues_of(mesh, solution)
+            prefixes = Solver(mesh).prefixes(clues)
+            asked = (range(1, len(clues) + 1) if order == 'upward' else
+                     [len(clues) // 2, len(clues) // 4, 3 * len(clues) // 4,
+                      len(clues) // 3, len(clues)])
+            for num_clues in asked:
+                assert prefixes(num_clues) == solvable_by_deduction(board, clues, num_clues)
+
+    @pytest.mark.parametrize('engine', ['board', 'mesh'])
+    def test_a_longer_prefix_starts_where_a_shorter_failed(self, dodecahedron,
+                                                           dodec_puzzle, engine):
+        (_clues, solution) = dodec_puzzle
+        clues = clues_of(dodecahedron, solution)
+        prefixes = Solver(dodecahedron, engine).prefixes(clues)
+        assert not prefixes(2)
+        assert prefixes.failed == 2
+        assert prefixes(len(clues))
+        assert not prefixes(1)
+        assert prefixes.failed == 2
+
+    @pytest.mark.parametrize('engine', ['board', 'mesh'])
+    def test_keeping_answers_as_from_blank(self, dodecahedron, dodec_puzzle, engine):
+        (_clues, solution) = dodec_puzzle
+        clues = clues_of(dodecahedron, solution)
+        prefixes = Solver(dodecahedron, engine).prefixes(clues)
+        for num_clues in (2, 4, 6):
+            prefixes(num_clues)
+        for left_out in reversed(range(len(clues))):
+            kept = [i for i in range(len(clues)) if i != left_out]
+            subset = [clues[i] for i in kept]
+            assert prefixes.keeping(kept) == solvable_by_deduction(dodecahedron, subset,
+                                                                   len(subset))
+            # Only positions built without the clue left out are kept.
+            assert prefixes.bases[-1][0] <= left_out
+
+    @pytest.mark.parametrize('engine', ['board', 'mesh'])
+    def test_a_failed_prefix_leaves_its_position(self, dodecahedron, dodec_puzzle, engine):
+        (_clues, solution) = dodec_puzzle
+        clues = clues_of(dodecahedron, solution)
+        solver = Solver(dodecahedron, engine)
+        prefixes = solver.prefixes(clues)
+        assert not prefixes(3)
+        left = unknown_edges(solver.board)
+        assert solvable_by_deduction(dodecahedron, clues, 3) is False
+        assert left == unknown_edges(dodecahedron)
+        assert 0 < len(left) < len(list(dodecahedron.edges()))
+
+    def test_contradictory_clues_fail_every_prefix(self, cube):
+        # Two clues of 4 on opposite faces: two loops.
+        prefixes = Solver(cube).prefixes([(0, 4), (1, 4), (2, 0)])
+        assert not prefixes(2)
+        assert prefixes.failed == 3
+
+
+def clues_of(mesh, solution):
+    """(face, num_walls) for every face, for the loop `solution`."""
+    loop = {frozenset(edge) for edge in zip(solution, solution[1:] + solution[:1])}
+    return [(f, sum(frozenset(edge) in loop for edge in mesh.face_halfedges(f)))
+            for f in mesh.faces()]